@@ -0,0 +1,48 @@
+"""
+Background job endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.auth import get_current_active_user
+from app.models.user import User
+from app.models.generation_job import GenerationJob
+from app.schemas.job import GenerationJobResponse
+from app.services.job_service import job_runner
+import json
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=GenerationJobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get status, progress and (once completed) the sprint plan of a generation job"""
+    job = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id,
+        GenerationJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    # Prefer live in-memory progress while the job runs in this process
+    progress = job_runner.live_progress(job.id) or json.loads(job.progress_json or "{}")
+    
+    return GenerationJobResponse(
+        id=job.id,
+        project_id=job.project_id,
+        status=getattr(job.status, "value", job.status),
+        stage=progress.get("stage") or job.stage,
+        progress=progress,
+        result=json.loads(job.result_json) if job.result_json else None,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
@@ -0,0 +1,55 @@
+"""
+Runtime metrics endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.auth import get_current_active_user
+from app.models.user import User
+from app.models.project import Project
+from app.services.embedding_cache import get_embedding_cache
+from app.services.llm_cache import get_llm_cache
+from app.services.usage_meter import usage_rollups
+
+router = APIRouter()
+
+@router.get("/llm-cache")
+async def llm_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """LLM response cache hit/miss counters"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/embedding-cache")
+async def embedding_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Embedding cache hit/miss counters and embedding time saved"""
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/llm-usage")
+async def llm_usage(
+    project_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Stored LLM usage per provider, model and stage, for the current user or one of their projects"""
+    if project_id is None:
+        return {"scope": "user", "rollups": usage_rollups(db, "user", current_user.id)}
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.owner_id == current_user.id
+    ).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    return {"scope": "project", "rollups": usage_rollups(db, "project", project_id)}
@@ -3,25 +3,34 @@ Project endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Any
 from app.core.database import get_db
 from app.core.auth import get_current_active_user
 from app.models.user import User
 from app.models.project import Project, Epic, Story, Task
+from app.models.spec_section import SpecSection
 from app.schemas.project import (
     ProjectCreate, ProjectResponse,
     EpicResponse, StoryResponse, TaskResponse
 )
 from app.services.sprint_service import SprintService
+from app.services.container import get_sprint_service
+from app.services.job_service import job_runner
+from app.schemas.job import GenerationJobCreated
 from app.utils.file_parser import parse_uploaded_file
+from app.utils.spec_segmenter import segment_spec, diff_sections
 from app.utils.export import export_sprint_plan_to_pdf, export_sprint_plan_to_csv, format_for_jira
 from app.core.config import settings
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+import json
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+SSE_KEEPALIVE_SECONDS = 15
+
 """
 Note on routing:
 - We support BOTH \"/projects\" and \"/projects/\" to avoid 405 Method Not
@@ -100,16 +109,95 @@ async def upload_spec(
     project.spec_content = spec_content
     db.commit()
     
-    return {"message": "Spec uploaded successfully", "content_length": len(spec_content)}
+    result = {"message": "Spec uploaded successfully", "content_length": len(spec_content)}
+    
+    # Preview what an incremental regeneration would redo
+    previous_sections = (
+        db.query(SpecSection)
+        .filter(SpecSection.project_id == project_id)
+        .order_by(SpecSection.position)
+        .all()
+    )
+    if previous_sections:
+        diff = diff_sections(
+            [{"key": row.section_key, "hash": row.content_hash} for row in previous_sections],
+            segment_spec(spec_content)
+        )
+        result["spec_changes"] = {f"sections_{name}": len(sections) for name, sections in diff.items()}
+    
+    return result
+
+def _generation_error_to_http(error_msg: str) -> HTTPException:
+    """Map a sprint plan generation failure to a user-facing HTTP error"""
+    # Every LLM backend is failing fast behind an open circuit breaker
+    if "circuit open" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=error_msg
+        )
+    # Check for Ollama connection errors
+    elif "Could not connect to Ollama" in error_msg or "ConnectionError" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{error_msg}. Please ensure Ollama is running: 'ollama serve' and the model is pulled: 'ollama pull {settings.OLLAMA_MODEL}'"
+        )
+    # Check for model not found errors
+    elif "not found" in error_msg.lower() and "model" in error_msg.lower():
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{error_msg}. Run: ollama pull {settings.OLLAMA_MODEL}"
+        )
+    # Check for quota/rate limit errors (OpenAI)
+    elif "429" in error_msg or "quota" in error_msg.lower() or "insufficient_quota" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="OpenAI API quota exceeded. Please check your billing at https://platform.openai.com/account/billing or switch to Ollama (default, no tokens) by setting llm_provider=ollama"
+        )
+    # Check for API key errors (OpenAI)
+    elif "API key" in error_msg or "AuthenticationError" in error_msg or "401" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="OpenAI API key is invalid or not configured. Please check your OPENAI_API_KEY in the .env file, or use Ollama (default) by setting llm_provider=ollama"
+        )
+    elif "Pinecone" in error_msg:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pinecone configuration error. Sprint plan generation will continue without velocity prediction."
+        )
+    else:
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate sprint plan: {error_msg}"
+        )
 
-@router.post("/{project_id}/generate-sprint-plan")
+@router.post("/{project_id}/generate-sprint-plan", status_code=status.HTTP_202_ACCEPTED)
 async def generate_sprint_plan(
     project_id: int,
+    response: Response,
     llm_provider: str = "ollama",  # Default to Ollama (no tokens required)
+    use_cache: bool = True,  # False forces fresh LLM calls instead of cached responses
+    resume: bool = True,  # False ignores checkpoints and builds a fresh plan for the same spec
+    incremental: bool = False,  # True only regenerates epics of spec sections changed since the last run
+    wait: bool = False,  # True runs the pipeline inside this request and returns the plan
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    sprint_service: SprintService = Depends(get_sprint_service)
 ):
-    """Generate sprint plan from project spec"""
+    """
+    Generate sprint plan from project spec
+    
+    By default the plan is generated by a background job: the response is a
+    job id to poll at GET /jobs/{job_id}. Pass wait=true to block until the
+    plan is ready and receive it directly.
+    
+    Re-running for an unchanged spec resumes from the checkpoints of the
+    previous run, so a plan that failed half way only generates what is
+    missing; pass resume=false to generate a new plan from scratch.
+    
+    After uploading a revised spec, pass incremental=true to keep the epics
+    of unchanged sections and regenerate only those of edited, added or
+    removed sections.
+    """
     project = db.query(Project).filter(
         Project.id == project_id,
         Project.owner_id == current_user.id
@@ -133,54 +221,125 @@ async def generate_sprint_plan(
             detail="No spec content or description found. Please upload a spec or add a project description first."
         )
     
+    if not wait:
+        job = job_runner.submit(
+            db,
+            project_id=project_id,
+            user_id=current_user.id,
+            llm_provider=llm_provider,
+            use_cache=use_cache,
+            resume=resume,
+            incremental=incremental
+        )
+        return GenerationJobCreated(
+            job_id=job.id,
+            status=job.status.value,
+            status_url=f"/api/v1/jobs/{job.id}"
+        )
+    
     # Generate sprint plan using SprintService
     try:
-        sprint_service = SprintService()
         sprint_plan = await sprint_service.process_spec_to_sprint_plan(
             db=db,
             project_id=project_id,
             spec_content=spec_content,
-            llm_provider=llm_provider
+            llm_provider=llm_provider,
+            use_cache=use_cache,
+            resume=resume,
+            incremental=incremental
         )
+        response.status_code = status.HTTP_200_OK
         return sprint_plan
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error generating sprint plan: {error_msg}")
-        
-        # Check for Ollama connection errors
-        if "Could not connect to Ollama" in error_msg or "ConnectionError" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"{error_msg}. Please ensure Ollama is running: 'ollama serve' and the model is pulled: 'ollama pull {settings.OLLAMA_MODEL}'"
-            )
-        # Check for model not found errors
-        elif "not found" in error_msg.lower() and "model" in error_msg.lower():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"{error_msg}. Run: ollama pull {settings.OLLAMA_MODEL}"
-            )
-        # Check for quota/rate limit errors (OpenAI)
-        elif "429" in error_msg or "quota" in error_msg.lower() or "insufficient_quota" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="OpenAI API quota exceeded. Please check your billing at https://platform.openai.com/account/billing or switch to Ollama (default, no tokens) by setting llm_provider=ollama"
-            )
-        # Check for API key errors (OpenAI)
-        elif "API key" in error_msg or "AuthenticationError" in error_msg or "401" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OpenAI API key is invalid or not configured. Please check your OPENAI_API_KEY in the .env file, or use Ollama (default) by setting llm_provider=ollama"
-            )
-        elif "Pinecone" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Pinecone configuration error. Sprint plan generation will continue without velocity prediction."
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate sprint plan: {error_msg}"
+        raise _generation_error_to_http(error_msg)
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.get("/{project_id}/generate-sprint-plan/stream")
+async def stream_sprint_plan(
+    project_id: int,
+    llm_provider: str = "ollama",
+    use_cache: bool = True,
+    resume: bool = True,
+    incremental: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    sprint_service: SprintService = Depends(get_sprint_service)
+):
+    """
+    Generate a sprint plan and stream progress as server-sent events
+    
+    Events: stage_started / stage_finished (with elapsed seconds), epic,
+    stories and tasks as each batch is persisted, then plan (the final
+    sprint plan) or error. Comment lines are sent as keep-alives while
+    waiting on slow LLM calls.
+    """
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.owner_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    spec_content = project.spec_content or project.description
+    if not spec_content:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No spec content or description found. Please upload a spec or add a project description first."
+        )
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def generate():
+        try:
+            sprint_plan = await sprint_service.process_spec_to_sprint_plan(
+                db=db,
+                project_id=project_id,
+                spec_content=spec_content,
+                llm_provider=llm_provider,
+                use_cache=use_cache,
+                resume=resume,
+                incremental=incremental,
+                on_event=lambda event, data: events.put_nowait((event, data))
             )
+            events.put_nowait(("plan", sprint_plan))
+        except Exception as e:
+            logger.error(f"Error streaming sprint plan: {e}")
+            http_error = _generation_error_to_http(str(e))
+            events.put_nowait(("error", {"status_code": http_error.status_code, "detail": http_error.detail}))
+        finally:
+            events.put_nowait(None)
+    
+    async def event_stream():
+        generation = asyncio.create_task(generate())
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _sse_event(*item)
+        finally:
+            # Client went away: stop spending tokens on a plan nobody will read
+            if not generation.done():
+                generation.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{project_id}/epics", response_model=List[EpicResponse])
 async def list_epics(
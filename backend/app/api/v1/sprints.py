@@ -10,6 +10,7 @@ from app.models.user import User
 from app.models.project import Project, Sprint
 from app.schemas.project import SprintCreate, SprintResponse
 from app.services.sprint_service import SprintService
+from app.services.container import get_sprint_service
 
 router = APIRouter()
 
@@ -18,7 +19,8 @@ async def create_sprint(
     project_id: int,
     sprint_data: SprintCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    sprint_service: SprintService = Depends(get_sprint_service)
 ):
     """Create a new sprint"""
     # Verify project ownership
@@ -34,7 +36,6 @@ async def create_sprint(
         )
     
     # Create sprint
-    sprint_service = SprintService()
     sprint = await sprint_service.create_sprint(
         db=db,
         project_id=project_id,
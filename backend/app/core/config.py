@@ -41,19 +41,107 @@ class Settings(BaseSettings):
     # Optional: OpenAI (only needed if LLM_PROVIDER=openai)
     OPENAI_API_KEY: str = ""
     DEFAULT_MODEL: str = "gpt-4o"
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"  # Any OpenAI-compatible endpoint, e.g. a local stub server
     
     # Optional: Groq (FREE tier, recommended for Render deployment)
     GROQ_API_KEY: str = ""
     GROQ_MODEL: str = "llama-3.1-8b-instant"  # Free, fast, and reliable model
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    
+    # LLM rate limits per provider (0 = unlimited), shared by all requests in the process
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 6000  # Groq free tier
+    OPENAI_REQUESTS_PER_MINUTE: int = 500
+    OPENAI_TOKENS_PER_MINUTE: int = 30000
+    OLLAMA_REQUESTS_PER_MINUTE: int = 0
+    OLLAMA_TOKENS_PER_MINUTE: int = 0
+    LLM_RATE_LIMIT_OVERRIDES: str = ""  # JSON, e.g. {"groq:llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000}}
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 1024  # Reserved per request until real usage is known
+    # Per-stage overrides of model/temperature/max_tokens/timeout/max_input_tokens, JSON keyed by stage or provider:stage,
+    # e.g. {"groq:generate_tasks": {"model": "llama-3.1-8b-instant", "max_tokens": 2048, "timeout": 60}}
+    LLM_STAGE_PROFILES: str = ""
+    
+    # Structured output: native JSON mode (Ollama format, OpenAI/Groq response_format) and
+    # per-item validation; only items that fail validation are re-asked, with a short repair prompt
+    LLM_JSON_MODE: bool = True
+    LLM_REPAIR_ATTEMPTS: int = 1  # Repair calls per invalid item before it is dropped
+    LLM_REPAIR_MAX_CHARS: int = 2000  # Invalid item text included in a repair prompt
+    LLM_PROMPT_COMPACT: bool = True  # Minify prompt templates and send JSON payloads without indentation
+    
+    # LLM HTTP connection pool, one long-lived client per provider
+    LLM_HTTP_TIMEOUT: float = 120.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept open
+    LLM_HTTP2: bool = True  # Only used when the optional `h2` package is installed
+    
+    # llm_provider=auto: route each call to the fastest configured backend
+    LLM_ROUTING_PROVIDERS: str = "ollama,groq,openai"  # Candidates; ones without credentials are skipped
+    LLM_LATENCY_WINDOW: int = 100  # Latency samples kept per provider/model
+    LLM_LATENCY_MIN_SAMPLES: int = 5  # Below this a backend is explored before ranking by p50
+    LLM_HEDGE_ENABLED: bool = True  # Duplicate a slow call to the next backend; first answer wins
+    LLM_HEDGE_PERCENTILE: float = 0.95  # Hedge once the call runs past this latency percentile
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0  # Hedge delay until a backend has enough samples
+    
+    # Circuit breakers per provider/model, and failover when a call fails or its circuit is open
+    LLM_FAILOVER_CHAIN: str = ""  # e.g. "groq,ollama": tried in order after the requested provider
+    LLM_BREAKER_WINDOW: int = 20  # Most recent calls considered per backend
+    LLM_BREAKER_MIN_CALLS: int = 4  # Calls needed before the failure rate can open the circuit
+    LLM_BREAKER_FAILURE_RATE: float = 0.5  # Failure rate that opens the circuit
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0  # Open time before a half-open probe call
+    
+    # LLM response cache (memory LRU + SQLite)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = ".cache/llm_responses.sqlite3"  # Empty = memory only
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # 0 = never expire
+    LLM_CACHE_MAX_MEMORY_ENTRIES: int = 512
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 20000
+    
+    # Offline record/replay: LLM_RECORD_PATH appends every real answer to a JSONL fixture file;
+    # LLM_PROVIDER=replay serves answers from LLM_REPLAY_PATH instead of calling a model
+    LLM_RECORD_PATH: str = ""
+    LLM_REPLAY_PATH: str = ""
+    LLM_REPLAY_LATENCY: str = "recorded"  # recorded[:scale], fixed:s, uniform:low,high or lognormal:median,sigma
+    LLM_REPLAY_RATE_LIMIT_RATE: float = 0.0  # Share of calls answered with a simulated 429
+    LLM_REPLAY_RETRY_AFTER_SECONDS: float = 1.0
+    LLM_REPLAY_SEED: int = 0
     
     # Deprecated: Anthropic support removed
     ANTHROPIC_API_KEY: str = ""
     CLAUDE_MODEL: str = "claude-3-5-sonnet-20241022"
     
+    # Sprint vector store for velocity prediction: "pinecone", "local" (SprintHistory plus an
+    # in-process index memory-mapped from VECTOR_INDEX_PATH) or "none"
+    VECTOR_STORE: str = "pinecone"
+    VECTOR_INDEX_PATH: str = ".cache/sprint_vectors.npy"  # Empty = rebuilt from the database on startup
+    # Sprint embeddings: "openai", "ollama" (OLLAMA_EMBEDDING_MODEL) or "hashing" (local feature hashing, no network calls)
+    EMBEDDER: str = "openai"
+    EMBEDDING_DIMENSION: int = 0  # 0 = the embedder's default (openai 1536, ollama 768, hashing 512)
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text"
+    
+    # Embedding cache (memory LRU + SQLite float32 blobs), keyed by embedder, model, dimension and text
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = ".cache/embeddings.sqlite3"  # Empty = memory only
+    EMBEDDING_CACHE_MAX_MEMORY_ENTRIES: int = 2048
+    EMBEDDING_CACHE_MAX_DISK_ENTRIES: int = 100000
+    
     # Pinecone (optional, for velocity prediction)
     PINECONE_API_KEY: str = ""
     PINECONE_ENVIRONMENT: str = "us-east-1-aws"
     PINECONE_INDEX_NAME: str = "smartplanner-sprints"
+    PINECONE_REVALIDATE_SECONDS: int = 900  # Background re-check that the index exists (0 = never)
+    
+    # Sprint plan pipeline
+    JOB_WORKERS: int = 2  # Background generation jobs run concurrently per process
+    STORY_GENERATION_CONCURRENCY: int = 4  # Epics processed in parallel during story generation (1 = sequential)
+    TASK_GENERATION_CONCURRENCY: int = 4  # Task batches processed in parallel during task generation (1 = sequential)
+    TASK_BATCH_MAX_STORIES: int = 6  # Stories sent per task-generation call (1 = one call per story)
+    TASK_BATCH_MAX_OUTPUT_TOKENS: int = 4096  # Output budget of one batched call
+    TASK_BATCH_OUTPUT_TOKENS_PER_STORY: int = 450  # Expected task output per story
+    EPIC_CHUNK_MAX_TOKENS: int = 3000  # Specs longer than this are split and epics extracted per chunk (0 = only when over the context window)
+    EPIC_CHUNK_CONCURRENCY: int = 4  # Spec chunks processed in parallel during epic extraction
+    EPIC_MERGE_SIMILARITY: float = 0.6  # Title word overlap above which epics from different chunks are merged
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
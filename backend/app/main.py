@@ -10,6 +10,9 @@ from app.core.config import settings
 from app.core.database import engine, Base
 from app.api.v1.router import api_router
 from app.core.logging import setup_logging
+from app.services.job_service import job_runner
+from app.services.provider_registry import provider_registry
+from app.services.container import services
 import logging
 
 # Setup logging
@@ -25,9 +28,13 @@ async def lifespan(app: FastAPI):
         logger.info("Database tables created/verified successfully")
     except Exception as e:
         logger.warning(f"Could not connect to database on startup: {e}. App will continue, but database features may not work.")
+    await services.start()
+    await job_runner.start()
     yield
     # Shutdown
-    pass
+    await job_runner.stop()
+    await services.stop()
+    await provider_registry.aclose()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -4,6 +4,10 @@ Database models
 from app.models.user import User
 from app.models.project import Project, Epic, Story, Task, Sprint
 from app.models.sprint_history import SprintHistory
+from app.models.generation_job import GenerationJob, JobStatus
+from app.models.pipeline_checkpoint import PipelineCheckpoint
+from app.models.spec_section import SpecSection
+from app.models.llm_usage import LLMUsageRollup
 
-__all__ = ["User", "Project", "Epic", "Story", "Task", "Sprint", "SprintHistory"]
+__all__ = ["User", "Project", "Epic", "Story", "Task", "Sprint", "SprintHistory", "GenerationJob", "JobStatus", "PipelineCheckpoint", "SpecSection", "LLMUsageRollup"]
 
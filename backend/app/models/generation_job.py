@@ -0,0 +1,36 @@
+"""
+Generation job model for background sprint plan generation
+"""
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from datetime import datetime
+import enum
+import uuid
+from app.core.database import Base
+
+class JobStatus(str, enum.Enum):
+    """Generation job status enumeration"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class GenerationJob(Base):
+    """Background sprint plan generation job"""
+    __tablename__ = "generation_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    llm_provider = Column(String, nullable=True)
+    use_cache = Column(Boolean, default=True)
+    resume = Column(Boolean, default=True)  # Reuse checkpoints from earlier runs for the same spec
+    incremental = Column(Boolean, default=False)  # Regenerate only epics of changed spec sections
+    status = Column(SQLEnum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    stage = Column(String, nullable=True)  # Most recently started pipeline stage
+    progress_json = Column(Text, nullable=True)  # JSON counts of persisted epics/stories/tasks
+    result_json = Column(Text, nullable=True)  # JSON sprint plan once completed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,30 @@
+"""
+LLM usage rollup model: tokens, latency and retries per scope, provider, model and stage
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+class LLMUsageRollup(Base):
+    """Running LLM usage totals for one job, project or user on one provider/model/stage"""
+    __tablename__ = "llm_usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("scope", "scope_id", "provider", "model", "stage", name="uq_llm_usage_rollup"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # job, project or user
+    scope_id = Column(String, nullable=False, index=True)  # Job id, project id or user id
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    stage = Column(String, nullable=False)
+    calls = Column(Integer, default=0, nullable=False)
+    cached_calls = Column(Integer, default=0, nullable=False)  # Served from the response cache, no tokens spent
+    failed_calls = Column(Integer, default=0, nullable=False)
+    retries = Column(Integer, default=0, nullable=False)  # Rate-limit retries, failovers, re-asks and repairs
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    total_tokens = Column(Integer, default=0, nullable=False)
+    latency_seconds = Column(Float, default=0.0, nullable=False)  # Summed wall-clock time of the calls
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,21 @@
+"""
+Pipeline checkpoint model for resumable sprint plan generation
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+class PipelineCheckpoint(Base):
+    """A completed pipeline item (epic, a story set or a task set) for one project/spec"""
+    __tablename__ = "pipeline_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("project_id", "spec_hash", "stage", "item_key", name="uq_pipeline_checkpoint_item"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    spec_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the spec content
+    stage = Column(String, nullable=False)  # epics, stories or tasks
+    item_key = Column(String, nullable=False)  # Epic position, epic id or story id
+    refs_json = Column(Text, nullable=False)  # JSON list of ids of the rows the item created
+    created_at = Column(DateTime, default=datetime.utcnow)
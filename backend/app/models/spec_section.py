@@ -0,0 +1,19 @@
+"""
+Spec section model linking parts of a project's spec to the epics generated from them
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from datetime import datetime
+from app.core.database import Base
+
+class SpecSection(Base):
+    """One section of the spec the project's current plan was generated from"""
+    __tablename__ = "spec_sections"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    section_key = Column(String, nullable=False)  # Normalized heading (or paragraph hash)
+    heading = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=False)
+    epic_ids_json = Column(Text, nullable=False, default="[]")  # JSON list of epics generated from this section
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -9,6 +9,7 @@ from app.schemas.project import (
     SprintCreate, SprintResponse,
     SprintPlanResponse
 )
+from app.schemas.job import GenerationJobCreated, GenerationJobResponse
 
 __all__ = [
     "UserCreate", "UserResponse", "Token",
@@ -16,6 +17,7 @@ __all__ = [
     "EpicCreate", "EpicResponse",
     "StoryResponse", "TaskResponse",
     "SprintCreate", "SprintResponse",
-    "SprintPlanResponse"
+    "SprintPlanResponse",
+    "GenerationJobCreated", "GenerationJobResponse"
 ]
 
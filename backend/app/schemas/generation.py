@@ -0,0 +1,112 @@
+"""
+Schemas for validating LLM-generated plan items
+"""
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from typing import List, Optional, Dict, Any, Tuple, Type
+
+PRIORITIES = ("low", "medium", "high", "critical")
+# Common ways models spell a priority
+PRIORITY_ALIASES = {
+    "lowest": "low", "minor": "low", "trivial": "low",
+    "med": "medium", "normal": "medium", "moderate": "medium",
+    "major": "high", "important": "high",
+    "highest": "critical", "urgent": "critical", "blocker": "critical",
+}
+
+
+def _text(value: Any) -> Any:
+    """None as empty text, and lists (e.g. acceptance criteria) as numbered lines"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(f"{i}. {item}" for i, item in enumerate(value, 1))
+    return value
+
+
+class GeneratedItem(BaseModel):
+    """Fields shared by generated epics, stories and tasks"""
+    model_config = ConfigDict(extra="ignore")
+    
+    title: str = Field(min_length=1)
+    description: str = ""
+    priority: str = "medium"
+    
+    @field_validator("title", mode="before")
+    @classmethod
+    def strip_title(cls, value: Any) -> Any:
+        return value.strip() if isinstance(value, str) else value
+    
+    @field_validator("description", mode="before")
+    @classmethod
+    def description_text(cls, value: Any) -> Any:
+        return _text(value)
+    
+    @field_validator("priority", mode="before")
+    @classmethod
+    def normalize_priority(cls, value: Any) -> str:
+        if value is None:
+            return "medium"
+        priority = str(value).strip().lower()
+        priority = PRIORITY_ALIASES.get(priority, priority)
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        return priority
+
+
+class EpicDraft(GeneratedItem):
+    """An epic as returned by the model"""
+    estimated_effort: float = Field(default=0, ge=0)
+
+
+class StoryDraft(GeneratedItem):
+    """A user story as returned by the model"""
+    acceptance_criteria: str = ""
+    estimated_effort: float = Field(default=0, ge=0)
+    
+    @field_validator("acceptance_criteria", mode="before")
+    @classmethod
+    def acceptance_criteria_text(cls, value: Any) -> Any:
+        return _text(value)
+
+
+class TaskDraft(GeneratedItem):
+    """A task as returned by the model"""
+    estimated_hours: float = Field(default=0, ge=0)
+
+
+class TimelineEstimate(BaseModel):
+    """Timeline estimate as returned by the model"""
+    model_config = ConfigDict(extra="allow")
+    
+    estimated_sprints: int = Field(ge=1)
+    sprint_duration_weeks: float = Field(default=2, gt=0)
+    estimated_start_date: Optional[str] = None
+    estimated_end_date: Optional[str] = None
+    confidence_level: Optional[str] = None
+    risk_factors: List[str] = []
+
+
+class GroomedBacklog(BaseModel):
+    """Backlog grooming result as returned by the model"""
+    model_config = ConfigDict(extra="allow")
+    
+    prioritized_items: List[Any] = []
+    dependencies: List[Any] = []
+    recommendations: Any = ""
+
+
+def validate_item(raw: Any, schema: Type[BaseModel]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Validate one generated item: (clean dict, None) when it matches the
+    schema, else (None, a short description of the problems)
+    """
+    if not isinstance(raw, dict):
+        return None, f"expected a JSON object, got {type(raw).__name__}"
+    try:
+        return schema.model_validate(raw).model_dump(), None
+    except ValidationError as e:
+        problems = [
+            f"{'.'.join(str(part) for part in error['loc']) or 'object'}: {error['msg']}"
+            for error in e.errors()
+        ]
+        return None, "; ".join(problems)
@@ -0,0 +1,25 @@
+"""
+Generation job schemas
+"""
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class GenerationJobCreated(BaseModel):
+    """Schema returned when a generation job is queued"""
+    job_id: str
+    status: str
+    status_url: str
+
+class GenerationJobResponse(BaseModel):
+    """Schema for generation job status"""
+    id: str
+    project_id: int
+    status: str
+    stage: Optional[str]
+    progress: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
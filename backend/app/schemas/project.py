@@ -109,4 +109,8 @@ class SprintPlanResponse(BaseModel):
     estimated_sprints: int
     timeline: Dict[str, Any]
     velocity_prediction: Dict[str, Any]
+    stage_timings: Optional[Dict[str, Any]] = None
+    resumed: Optional[Dict[str, int]] = None  # Epics, stories and tasks reused from checkpoints
+    spec_changes: Optional[Dict[str, int]] = None  # Section diff summary for incremental regeneration
+    usage: Optional[Dict[str, Any]] = None  # LLM calls, tokens, latency and retries, in total and per stage/provider
 
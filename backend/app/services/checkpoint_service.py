@@ -0,0 +1,84 @@
+"""
+Checkpoints that let sprint plan generation resume after a failure
+"""
+from typing import List, Dict, Any, Optional, Tuple, Type
+from sqlalchemy.orm import Session
+from app.models.pipeline_checkpoint import PipelineCheckpoint
+from app.services.plan_persistence import load_rows
+import hashlib
+import json
+
+
+def spec_hash(spec_content: str) -> str:
+    """Identity of a spec for checkpointing"""
+    return hashlib.sha256(spec_content.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Completed pipeline items for one project and spec hash.
+    
+    Each checkpoint stores the ids of the rows an item produced. `record`
+    only adds the checkpoint to the session, so callers commit it in the
+    same transaction as those rows. `load` returns the stored rows as
+    records (dicts), or None when the item has no checkpoint or its rows
+    have been deleted.
+    """
+    
+    def __init__(self, db: Session, project_id: int, spec_hash: str):
+        self.db = db
+        self.project_id = project_id
+        self.spec_hash = spec_hash
+        self._rows: Dict[Tuple[str, str], PipelineCheckpoint] = {
+            (row.stage, row.item_key): row
+            for row in db.query(PipelineCheckpoint).filter(
+                PipelineCheckpoint.project_id == project_id,
+                PipelineCheckpoint.spec_hash == spec_hash
+            )
+        }
+        self.reused: Dict[str, int] = {"epics": 0, "stories": 0, "tasks": 0}
+    
+    def keys(self, stage: str) -> List[str]:
+        """Item keys checkpointed for a stage"""
+        return [item_key for row_stage, item_key in self._rows if row_stage == stage]
+    
+    def load(self, model: Type[Any], stage: str, item_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Rows recorded for an item, in their original order"""
+        row = self._rows.get((stage, item_key))
+        if row is None:
+            return None
+        ids = json.loads(row.refs_json)
+        items = load_rows(self.db, model, ids)
+        if len(items) != len(ids):
+            # Rows were deleted since; the item has to be generated again
+            self.discard(stage, item_key)
+            return None
+        return items
+    
+    def record(self, stage: str, item_key: str, ids: List[int]):
+        """Mark an item complete with the ids of the rows it produced (committed by the caller)"""
+        row = self._rows.get((stage, item_key))
+        if row is None:
+            row = PipelineCheckpoint(
+                project_id=self.project_id,
+                spec_hash=self.spec_hash,
+                stage=stage,
+                item_key=item_key
+            )
+            self.db.add(row)
+            self._rows[(stage, item_key)] = row
+        row.refs_json = json.dumps(list(ids))
+    
+    def discard(self, stage: str, item_key: str):
+        """Forget an item's checkpoint"""
+        row = self._rows.pop((stage, item_key), None)
+        if row is not None:
+            self.db.delete(row)
+    
+    def clear(self):
+        """Forget every checkpoint for this project and spec"""
+        self.db.query(PipelineCheckpoint).filter(
+            PipelineCheckpoint.project_id == self.project_id,
+            PipelineCheckpoint.spec_hash == self.spec_hash
+        ).delete(synchronize_session=False)
+        self._rows = {}
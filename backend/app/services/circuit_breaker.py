@@ -0,0 +1,134 @@
+"""
+Circuit breakers for LLM backends
+"""
+from collections import deque
+from typing import Dict, Optional, Tuple, Callable, Deque
+from app.core.config import settings
+import asyncio
+import logging
+import time
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without calling a backend whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` calls to one backend.
+    
+    Closed: calls go through. Once at least `min_calls` outcomes are known
+    and the failure rate reaches `failure_rate`, the circuit opens and calls
+    are refused until `cooldown` seconds have passed. Then it is half-open:
+    a single probe call is let through; success closes the circuit, failure
+    opens it for another cool-down.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        window: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        cooldown: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.window = window or settings.LLM_BREAKER_WINDOW
+        self.min_calls = min_calls or settings.LLM_BREAKER_MIN_CALLS
+        self.failure_rate = failure_rate or settings.LLM_BREAKER_FAILURE_RATE
+        self.cooldown = cooldown if cooldown is not None else settings.LLM_BREAKER_COOLDOWN_SECONDS
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._probing = False
+    
+    def allow(self) -> bool:
+        """Whether a call may be sent now (claims the probe when half-open)"""
+        if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+        return self.state == CLOSED
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (self.clock() - self.opened_at))
+    
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._probing = False
+        self._outcomes.append(True)
+    
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+    
+    def record_cancelled(self):
+        """A call was abandoned (e.g. a hedged loser); frees the half-open probe"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+    
+    def _open(self):
+        logger.warning(f"Circuit for {self.name} opened for {self.cooldown}s")
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self._probing = False
+        self._outcomes.clear()
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """
+    Whether an error means the backend is unhealthy: a timeout, a transport
+    error, a 5xx or a 429, also when a provider re-raised it as another
+    error. Bad requests, invalid keys and unusable answers are not.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError, httpx.TransportError, ConnectionError)):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status >= 500 or status == 429
+        error = error.__cause__ or error.__context__
+    return False
+
+
+_circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider_name: str, model: str) -> CircuitBreaker:
+    """Process-wide circuit breaker for a provider/model"""
+    key = (provider_name, model)
+    if key not in _circuit_breakers:
+        _circuit_breakers[key] = CircuitBreaker(f"{provider_name}:{model}")
+    return _circuit_breakers[key]
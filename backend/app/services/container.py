@@ -0,0 +1,94 @@
+"""
+Long-lived service instances shared by all requests
+"""
+from typing import Optional
+from app.core.config import settings
+from app.services.llm_service import LLMService
+from app.services.vector_store import SprintVectorStore
+from app.services.sprint_service import SprintService
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Builds LLMService, the sprint vector store and SprintService once
+    instead of per request. PineconeService verifies its index on
+    construction, a control-plane round trip, so it is built at startup and
+    the store is re-validated in the background every
+    PINECONE_REVALIDATE_SECONDS (LocalVectorService saves its index then).
+    
+    Services are built on first use when the container was not started
+    (scripts, tests).
+    """
+    
+    def __init__(self):
+        self._sprint_service: Optional[SprintService] = None
+        self._revalidate_task: Optional[asyncio.Task] = None
+    
+    @property
+    def sprint_service(self) -> SprintService:
+        if self._sprint_service is None:
+            self._sprint_service = SprintService()
+        return self._sprint_service
+    
+    @property
+    def llm_service(self) -> LLMService:
+        return self.sprint_service.llm_service
+    
+    @property
+    def pinecone_service(self) -> Optional[SprintVectorStore]:
+        return self.sprint_service.pinecone_service
+    
+    async def start(self):
+        """Build the services and start index re-validation"""
+        if self._sprint_service is None:
+            llm_service = LLMService()
+            # Pinecone's client is synchronous; keep its startup calls off the event loop
+            self._sprint_service = await asyncio.to_thread(SprintService, llm_service)
+        if self.pinecone_service and settings.PINECONE_REVALIDATE_SECONDS > 0 and self._revalidate_task is None:
+            self._revalidate_task = asyncio.create_task(self._revalidate_periodically(), name="pinecone-revalidate")
+        logger.info("Services initialized")
+    
+    async def stop(self):
+        """Stop background re-validation and let the vector store save its state"""
+        if self._revalidate_task is not None:
+            self._revalidate_task.cancel()
+            try:
+                await self._revalidate_task
+            except asyncio.CancelledError:
+                pass
+            self._revalidate_task = None
+        if self._sprint_service is not None and self.pinecone_service:
+            try:
+                await asyncio.to_thread(self.pinecone_service.close)
+            except Exception as e:
+                logger.warning(f"Closing the vector store failed: {e}")
+    
+    async def _revalidate_periodically(self):
+        while True:
+            await asyncio.sleep(settings.PINECONE_REVALIDATE_SECONDS)
+            try:
+                await asyncio.to_thread(self.pinecone_service.revalidate)
+            except Exception as e:
+                logger.warning(f"Pinecone index re-validation failed: {e}")
+
+
+services = ServiceContainer()
+
+
+def get_llm_service() -> LLMService:
+    """Dependency for FastAPI to get the shared LLMService"""
+    return services.llm_service
+
+
+def get_pinecone_service() -> Optional[SprintVectorStore]:
+    """Dependency for FastAPI to get the shared vector store (None if disabled)"""
+    return services.pinecone_service
+
+
+def get_sprint_service() -> SprintService:
+    """Dependency for FastAPI to get the shared SprintService"""
+    return services.sprint_service
@@ -0,0 +1,214 @@
+"""
+Text embedders for sprint similarity: OpenAI, Ollama, or local feature
+hashing that needs no network calls
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, get_embedding_cache
+from app.services.provider_registry import provider_registry
+import hashlib
+import logging
+import math
+import re
+import time
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class Embedder(ABC):
+    """Embeds texts as vectors of a fixed `dimension`"""
+    
+    name: str = ""
+    model: str = ""
+    dimension: int = 0
+    cacheable: bool = True  # Whether an EmbeddingCache lookup is cheaper than embedding
+    
+    @property
+    def key(self) -> str:
+        """Identifies the vector space; vectors from embedders with different keys are not comparable"""
+        return f"{self.name}:{self.model}:{self.dimension}"
+    
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, one vector per text"""
+        pass
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embed(texts)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+    
+    def _check(self, vectors: List[List[float]], count: int) -> List[List[float]]:
+        if len(vectors) != count:
+            raise ValueError(f"{self.name} returned {len(vectors)} embeddings for {count} texts")
+        for vector in vectors:
+            if len(vector) != self.dimension:
+                raise ValueError(
+                    f"{self.name} model {self.model} returned {len(vector)}-dimensional embeddings, "
+                    f"expected {self.dimension} (set EMBEDDING_DIMENSION to match the model)"
+                )
+        return vectors
+
+
+class HashingEmbedder(Embedder):
+    """
+    Local embedder: words and word pairs are hashed into `dimension` signed
+    buckets with sublinear term frequency (1 + log tf), then L2-normalized.
+    Deterministic across processes and needs no model, key or network.
+    """
+    
+    name = "hashing"
+    model = "words+bigrams-v1"
+    cacheable = False  # Hashing a text is cheaper than a cache lookup
+    
+    def __init__(self, dimension: int = 512):
+        if dimension <= 0:
+            raise ValueError("Embedding dimension must be positive")
+        self.dimension = dimension
+        self._bucket = lru_cache(maxsize=65536)(self._bucket_of)
+    
+    def _bucket_of(self, feature: str) -> Tuple[int, float]:
+        # Python's hash() is salted per process; embeddings must be stable across restarts
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return digest % self.dimension, 1.0 if digest >> 63 else -1.0
+    
+    def embed_one(self, text: str) -> np.ndarray:
+        tokens = TOKEN.findall(text.lower())
+        counts = {}
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, count in counts.items():
+            bucket, sign = self._bucket(feature)
+            vector[bucket] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text).tolist() for text in texts]
+
+
+class OllamaEmbedder(Embedder):
+    """Ollama embedding endpoint (/api/embed), batched; the client is pooled by provider_registry"""
+    
+    name = "ollama"
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "nomic-embed-text",
+        dimension: int = 768,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.dimension = dimension
+        self.client = client or provider_registry.get_client("ollama-embeddings", self.base_url)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = await self.client.post(f"{self.base_url}/api/embed", json={"model": self.model, "input": texts})
+        response.raise_for_status()
+        return self._check(response.json().get("embeddings", []), len(texts))
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI embeddings API (or a compatible endpoint), batched; the client is pooled by provider_registry"""
+    
+    name = "openai"
+    DEFAULT_DIMENSION = 1536
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-ada-002",
+        dimension: int = DEFAULT_DIMENSION,
+        client: Optional[httpx.AsyncClient] = None,
+        base_url: str = "https://api.openai.com/v1"
+    ):
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is required for OpenAI embeddings. Use EMBEDDER=hashing for local embeddings")
+        self.model = model
+        self.dimension = dimension
+        self.client = client or provider_registry.get_client(
+            "openai-embeddings",
+            base_url,
+            api_key,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        payload = {"model": self.model, "input": texts}
+        if self.dimension != self.DEFAULT_DIMENSION:
+            # Shortened embeddings (text-embedding-3 models)
+            payload["dimensions"] = self.dimension
+        response = await self.client.post("/embeddings", json=payload)
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return self._check([item["embedding"] for item in data], len(texts))
+
+
+class CachedEmbedder(Embedder):
+    """
+    Embedder in front of an EmbeddingCache: only texts missing from the
+    cache are sent to the wrapped embedder, in one batch
+    """
+    
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.name = embedder.name
+        self.model = embedder.model
+        self.dimension = embedder.dimension
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.key, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            started = time.perf_counter()
+            embedded = await self.embedder.embed(missing)
+            self.cache.set_many(self.key, missing, embedded, time.perf_counter() - started)
+            by_text = dict(zip(missing, embedded))
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+
+DEFAULT_DIMENSIONS = {"hashing": 512, "ollama": 768, "openai": OpenAIEmbedder.DEFAULT_DIMENSION}
+
+
+def create_embedder(name: Optional[str] = None, dimension: Optional[int] = None) -> Embedder:
+    """
+    The embedder selected by EMBEDDER ('openai', 'ollama' or 'hashing'), at
+    EMBEDDING_DIMENSION or the embedder's default dimension, behind the
+    embedding cache unless it is disabled or the embedder is not cacheable
+    """
+    name = (name or settings.EMBEDDER).strip().lower()
+    if name not in DEFAULT_DIMENSIONS:
+        raise ValueError(f"Unknown EMBEDDER: {name}. Supported: 'openai', 'ollama', 'hashing'")
+    dimension = dimension or settings.EMBEDDING_DIMENSION or DEFAULT_DIMENSIONS[name]
+    if name == "hashing":
+        embedder = HashingEmbedder(dimension)
+    elif name == "ollama":
+        embedder = OllamaEmbedder(settings.OLLAMA_BASE_URL, settings.OLLAMA_EMBEDDING_MODEL, dimension)
+    else:
+        embedder = OpenAIEmbedder(
+            settings.OPENAI_API_KEY,
+            settings.OPENAI_EMBEDDING_MODEL,
+            dimension,
+            base_url=settings.OPENAI_BASE_URL
+        )
+    cache = get_embedding_cache() if embedder.cacheable else None
+    return CachedEmbedder(embedder, cache) if cache is not None else embedder
@@ -0,0 +1,184 @@
+"""
+Cache for text embeddings keyed by embedder and text hash
+Two tiers: an in-memory LRU in front of an on-disk SQLite table of float32 blobs
+"""
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from app.core.config import settings
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by a hash of the embedder key (name, model and
+    dimension) and the exact text.
+    
+    Lookups hit the in-memory LRU first, then SQLite (promoting the entry);
+    each tier evicts least-recently-used entries beyond its size. Every
+    entry keeps the seconds it took to embed, so hits report the embedding
+    time they saved.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 2048,
+        max_disk_entries: int = 100000,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        self._memory: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.embed_seconds = 0.0
+        
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, embedder TEXT NOT NULL, vector BLOB NOT NULL, "
+                "seconds REAL NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embeddings_accessed_at ON embeddings (accessed_at)"
+            )
+            self._conn.commit()
+    
+    @staticmethod
+    def make_key(embedder: str, text: str) -> str:
+        """Stable SHA-256 key for a text embedded by `embedder` (an Embedder.key)"""
+        return hashlib.sha256(f"{embedder}\0{text}".encode("utf-8")).hexdigest()
+    
+    def _remember(self, key: str, vector: np.ndarray, seconds: float):
+        self._memory[key] = (vector, seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def get_many(self, embedder: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embedding for each text, or None where there is none"""
+        keys = [self.make_key(embedder, text) for text in texts]
+        found: Dict[str, Tuple[np.ndarray, float]] = {}
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = entry
+                    self.memory_hits += 1
+            
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing and self._conn is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, seconds FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [self.clock()] + [row[0] for row in rows]
+                    )
+                    self._conn.commit()
+                for key, blob, seconds in rows:
+                    entry = (np.frombuffer(blob, dtype=np.float32), seconds)
+                    self._remember(key, *entry)
+                    found[key] = entry
+                    self.disk_hits += 1
+            
+            self.misses += sum(1 for key in keys if key not in found)
+            self.saved_seconds += sum(found[key][1] for key in keys if key in found)
+        return [found[key][0].tolist() if key in found else None for key in keys]
+    
+    def set_many(self, embedder: str, texts: List[str], vectors: List[List[float]], seconds: float = 0.0):
+        """Store embeddings in both tiers; `seconds` is what embedding all of them took"""
+        if not texts:
+            return
+        now = self.clock()
+        per_text = seconds / len(texts)
+        rows = []
+        with self._lock:
+            self.embed_seconds += seconds
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(embedder, text)
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember(key, array, per_text)
+                rows.append((key, embedder, array.tobytes(), per_text, now, now))
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, embedder, vector, seconds, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._conn.commit()
+    
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, embedding time spent and saved, and tier sizes"""
+        with self._lock:
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "hits": self.memory_hits + self.disk_hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "embed_seconds": round(self.embed_seconds, 4),
+                "saved_seconds": round(self.saved_seconds, 4),
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when EMBEDDING_CACHE_ENABLED is off"""
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = EmbeddingCache(
+                path=settings.EMBEDDING_CACHE_PATH or None,
+                max_memory_entries=settings.EMBEDDING_CACHE_MAX_MEMORY_ENTRIES,
+                max_disk_entries=settings.EMBEDDING_CACHE_MAX_DISK_ENTRIES
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Embedding cache database unavailable ({e}); using memory-only cache")
+            _embedding_cache = EmbeddingCache(max_memory_entries=settings.EMBEDDING_CACHE_MAX_MEMORY_ENTRIES)
+    return _embedding_cache
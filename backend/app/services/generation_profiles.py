@@ -0,0 +1,52 @@
+"""
+Per-stage generation profiles (model, temperature, max output tokens, timeout, input budget)
+"""
+from typing import Dict, Any
+from app.core.config import settings
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extract_epics", "generate_stories", "generate_tasks", "estimate_timeline", "groom_backlog")
+
+# Keys are a stage, or "provider:stage" for settings that only apply to one
+# provider (models are provider-specific). An empty model means the
+# provider's configured default (OLLAMA_MODEL, GROQ_MODEL, DEFAULT_MODEL).
+# max_input_tokens caps the prompt; epic extraction is sized by spec chunking.
+DEFAULT_STAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "extract_epics": {"temperature": 0.5},
+    "generate_stories": {"temperature": 0.7, "max_input_tokens": 2048},
+    # High volume and mechanical: keep it cheap and deterministic
+    "generate_tasks": {"temperature": 0.3, "max_input_tokens": 3072},
+    "estimate_timeline": {"temperature": 0.3, "max_input_tokens": 1024},
+    "groom_backlog": {"temperature": 0.5, "max_input_tokens": 3072},
+    "groq:extract_epics": {"model": "llama-3.3-70b-versatile"},
+    "groq:estimate_timeline": {"model": "llama-3.3-70b-versatile"},
+    "groq:groom_backlog": {"model": "llama-3.3-70b-versatile"},
+    "groq:generate_tasks": {"model": "llama-3.1-8b-instant"},
+}
+
+
+def _configured_profiles() -> Dict[str, Dict[str, Any]]:
+    """LLM_STAGE_PROFILES from settings, merged over the defaults"""
+    profiles = {key: dict(value) for key, value in DEFAULT_STAGE_PROFILES.items()}
+    if settings.LLM_STAGE_PROFILES:
+        try:
+            overrides = json.loads(settings.LLM_STAGE_PROFILES)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring invalid LLM_STAGE_PROFILES: {e}")
+            overrides = {}
+        for key, value in overrides.items():
+            profiles.setdefault(key, {}).update(value)
+    return profiles
+
+
+def stage_profile(provider_name: str, stage: str) -> Dict[str, Any]:
+    """
+    Generation options for a stage on a provider: the stage's profile with
+    the provider-specific one on top. Unset values are left out.
+    """
+    profiles = _configured_profiles()
+    profile = {**profiles.get(stage, {}), **profiles.get(f"{provider_name}:{stage}", {})}
+    return {key: value for key, value in profile.items() if value not in (None, "")}
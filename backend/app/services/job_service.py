@@ -0,0 +1,221 @@
+"""
+Background job execution for sprint plan generation
+"""
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.generation_job import GenerationJob, JobStatus
+from app.models.project import Project
+from app.services.sprint_service import SprintService
+from app.services.container import get_sprint_service
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobRunner:
+    """
+    In-process worker pool that runs `SprintService.process_spec_to_sprint_plan`
+    for queued generation jobs.
+    
+    Job state lives in the `generation_jobs` table. Live progress (stage and
+    persisted counts) is kept in memory and written back to the job row at
+    stage boundaries, so polling never waits on the pipeline's transaction.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        sprint_service_factory: Callable[[], SprintService] = get_sprint_service,
+        workers: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.sprint_service_factory = sprint_service_factory
+        self.worker_count = max(1, workers or settings.JOB_WORKERS)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._live_progress: Dict[str, Dict[str, Any]] = {}
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+    
+    async def start(self):
+        """Start workers and pick up jobs left queued by a previous process"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"generation-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        
+        db = self.session_factory()
+        try:
+            interrupted = db.query(GenerationJob).filter(GenerationJob.status == JobStatus.RUNNING).all()
+            for job in interrupted:
+                job.status = JobStatus.FAILED
+                job.error = "Interrupted by server restart"
+                job.finished_at = datetime.utcnow()
+            db.commit()
+            
+            queued = (
+                db.query(GenerationJob)
+                .filter(GenerationJob.status == JobStatus.QUEUED)
+                .order_by(GenerationJob.created_at)
+                .all()
+            )
+            for job in queued:
+                self._queue.put_nowait(job.id)
+            if queued:
+                logger.info(f"Re-queued {len(queued)} pending generation jobs")
+        except Exception as e:
+            logger.warning(f"Could not recover pending generation jobs: {e}")
+        finally:
+            db.close()
+        
+        logger.info(f"Started {self.worker_count} generation job workers")
+    
+    async def stop(self):
+        """Cancel workers; running jobs are marked failed on next start"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+    
+    def submit(
+        self,
+        db: Session,
+        project_id: int,
+        user_id: int,
+        llm_provider: Optional[str] = None,
+        use_cache: bool = True,
+        resume: bool = True,
+        incremental: bool = False
+    ) -> GenerationJob:
+        """Create a queued job row and hand it to the worker pool"""
+        if self._queue is None:
+            raise RuntimeError("Job runner is not started")
+        
+        job = GenerationJob(
+            project_id=project_id,
+            user_id=user_id,
+            llm_provider=llm_provider,
+            use_cache=use_cache,
+            resume=resume,
+            incremental=incremental,
+            status=JobStatus.QUEUED,
+            progress_json=json.dumps(self._empty_progress())
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        
+        self._queue.put_nowait(job.id)
+        logger.info(f"Queued generation job {job.id} for project {project_id}")
+        return job
+    
+    def live_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """In-memory progress of a job running in this process, if any"""
+        return self._live_progress.get(job_id)
+    
+    @staticmethod
+    def _empty_progress() -> Dict[str, Any]:
+        return {"stage": None, "epics": 0, "stories": 0, "tasks": 0, "stage_timings": {}}
+    
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Generation job worker {index} failed on job {job_id}: {e}")
+    
+    async def run_job(self, job_id: str):
+        """Run one job to completion and record the outcome"""
+        db = self.session_factory()
+        jobs_db = self.session_factory()
+        progress = self._empty_progress()
+        self._live_progress[job_id] = progress
+        try:
+            job = jobs_db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            if not job or job.status != JobStatus.QUEUED:
+                return
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+            jobs_db.commit()
+            
+            project = db.query(Project).filter(Project.id == job.project_id).first()
+            if not project:
+                raise ValueError(f"Project {job.project_id} not found")
+            spec_content = project.spec_content or project.description
+            if not spec_content:
+                raise ValueError("No spec content or description found for project")
+            
+            def on_event(event: str, data: Dict[str, Any]):
+                if event == "stage_started":
+                    progress["stage"] = data["stage"]
+                elif event == "stage_finished":
+                    progress["stage_timings"][data["stage"]] = data
+                    self._save_progress(jobs_db, job, progress)
+                elif event == "epic":
+                    progress["epics"] += 1
+                elif event == "stories":
+                    progress["stories"] += len(data["stories"])
+                elif event == "tasks":
+                    progress["tasks"] += len(data["tasks"])
+            
+            sprint_service = self.sprint_service_factory()
+            sprint_plan = await sprint_service.process_spec_to_sprint_plan(
+                db=db,
+                project_id=job.project_id,
+                spec_content=spec_content,
+                llm_provider=job.llm_provider,
+                use_cache=job.use_cache if job.use_cache is not None else True,
+                resume=job.resume if job.resume is not None else True,
+                incremental=bool(job.incremental),
+                on_event=on_event,
+                job_id=job.id
+            )
+            
+            progress["stage"] = "completed"
+            job.status = JobStatus.COMPLETED
+            job.result_json = json.dumps(sprint_plan, default=str)
+            job.progress_json = json.dumps(progress)
+            job.stage = progress["stage"]
+            job.finished_at = datetime.utcnow()
+            jobs_db.commit()
+            logger.info(f"Generation job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Generation job {job_id} failed: {e}")
+            jobs_db.rollback()
+            job = jobs_db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            if job:
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+                job.progress_json = json.dumps(progress)
+                job.finished_at = datetime.utcnow()
+                jobs_db.commit()
+        finally:
+            self._live_progress.pop(job_id, None)
+            db.close()
+            jobs_db.close()
+    
+    @staticmethod
+    def _save_progress(jobs_db: Session, job: GenerationJob, progress: Dict[str, Any]):
+        """Best-effort write of live progress to the job row"""
+        try:
+            job.stage = progress["stage"]
+            job.progress_json = json.dumps(progress)
+            jobs_db.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist progress for job {job.id}: {e}")
+            jobs_db.rollback()
+
+
+job_runner = JobRunner()
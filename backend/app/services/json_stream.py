@@ -0,0 +1,110 @@
+"""
+Incremental JSON array parsing for streamed LLM output
+"""
+from typing import Any, AsyncIterable, AsyncIterator, List, NamedTuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MalformedJSON(NamedTuple):
+    """An array element that did not decode, kept so it can be repaired"""
+    text: str
+    error: str
+
+
+class JSONArrayStreamParser:
+    """
+    Yields the elements of the first JSON array in a stream of text chunks
+    as soon as each element is complete.
+    
+    Anything before the array (prose, a ```json fence, or an enclosing
+    object such as {"epics": [...]}) and anything after it is ignored.
+    Elements that do not decode are counted in `errors` and skipped, or
+    returned as MalformedJSON with `keep_malformed=True`.
+    """
+    
+    def __init__(self, keep_malformed: bool = False):
+        self.keep_malformed = keep_malformed
+        self._buffer: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._depth = 0          # Nesting depth inside the current element
+        self._in_array = False
+        self._done = False
+        self.errors = 0
+    
+    @property
+    def done(self) -> bool:
+        """Whether the array has been closed"""
+        return self._done
+    
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk and return the elements it completed"""
+        items: List[Any] = []
+        for char in chunk:
+            if self._done:
+                break
+            
+            if self._in_string:
+                if self._in_array:
+                    self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            
+            if not self._in_array:
+                if char == '"':
+                    self._in_string = True
+                elif char == "[":
+                    self._in_array = True
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._buffer.append(char)
+            elif char in "[{":
+                self._depth += 1
+                self._buffer.append(char)
+            elif char in "]}":
+                if self._depth == 0:
+                    # End of the array itself
+                    self._emit(items)
+                    self._done = True
+                    continue
+                self._depth -= 1
+                self._buffer.append(char)
+                if self._depth == 0:
+                    self._emit(items)
+            elif char == "," and self._depth == 0:
+                self._emit(items)
+            elif self._buffer or not char.isspace():
+                self._buffer.append(char)
+        return items
+    
+    def _emit(self, items: List[Any]):
+        text = "".join(self._buffer).strip()
+        self._buffer = []
+        if not text:
+            return
+        try:
+            items.append(json.loads(text))
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            if self.keep_malformed:
+                items.append(MalformedJSON(text, str(e)))
+                return
+            logger.warning(f"Skipping malformed array element in streamed JSON: {e}")
+
+
+async def iter_json_array(chunks: AsyncIterable[str]) -> AsyncIterator[Any]:
+    """Yield array elements from an async stream of text chunks as they complete"""
+    parser = JSONArrayStreamParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
@@ -0,0 +1,220 @@
+"""
+Content-addressed cache for LLM provider responses
+Two tiers: an in-memory LRU in front of an on-disk SQLite table
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Callable, Iterator
+from app.core.config import settings
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Set for the duration of a request that must not read or write the cache
+_cache_bypassed: ContextVar[bool] = ContextVar("llm_cache_bypassed", default=False)
+
+
+@contextmanager
+def bypass_llm_cache() -> Iterator[None]:
+    """Skip the response cache for every LLM call made inside this block"""
+    token = _cache_bypassed.set(True)
+    try:
+        yield
+    finally:
+        _cache_bypassed.reset(token)
+
+
+def is_llm_cache_bypassed() -> bool:
+    """Whether the current request asked to skip the cache"""
+    return _cache_bypassed.get()
+
+
+def _normalize_content(content: str) -> str:
+    """Ignore indentation and trailing whitespace differences between prompts"""
+    return "\n".join(line.strip() for line in content.strip().splitlines())
+
+
+class LLMResponseCache:
+    """
+    LLM response cache keyed by a hash of provider, model, temperature and
+    the normalized messages.
+    
+    Lookups hit the in-memory LRU first, then SQLite (promoting the entry).
+    Entries older than `ttl_seconds` are treated as misses (0 = never
+    expire); each tier evicts least-recently-used entries beyond its size.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 20000,
+        ttl_seconds: int = 0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at ON llm_responses (accessed_at)"
+            )
+            self._conn.commit()
+    
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        temperature: float,
+        messages: List[Dict[str, str]],
+        **extra: Any
+    ) -> str:
+        """Stable SHA-256 key for a request; `extra` holds any other output-affecting options"""
+        payload = {
+            "provider": provider,
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "messages": [
+                {"role": msg.get("role", "user"), "content": _normalize_content(msg.get("content", ""))}
+                for msg in messages
+            ],
+            **extra
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+    
+    def _remember(self, key: str, value: Dict[str, Any], created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response for `key`, or None"""
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+            
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = json.loads(row[0]), row[1]
+                    if not self._expired(created_at, now):
+                        self._conn.execute(
+                            "UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        self._remember(key, value, created_at)
+                        self.disk_hits += 1
+                        return value
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+            
+            self.misses += 1
+            return None
+    
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a response in both tiers"""
+        now = self.clock()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE key IN ("
+                    "SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._conn.commit()
+    
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_responses")
+                self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "hits": self.memory_hits + self.disk_hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide response cache, or None when LLM_CACHE_ENABLED is off"""
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        try:
+            _llm_cache = LLMResponseCache(
+                path=settings.LLM_CACHE_PATH or None,
+                max_memory_entries=settings.LLM_CACHE_MAX_MEMORY_ENTRIES,
+                max_disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"LLM cache database unavailable ({e}); using memory-only cache")
+            _llm_cache = LLMResponseCache(
+                max_memory_entries=settings.LLM_CACHE_MAX_MEMORY_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+            )
+    return _llm_cache
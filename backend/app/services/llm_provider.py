@@ -3,18 +3,260 @@ LLM Provider Abstraction Layer
 Supports multiple LLM providers with a unified interface
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Callable, AsyncIterator
+from app.core.config import settings
+from app.services.generation_profiles import stage_profile
 import httpx
 import json
 import logging
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tiktoken encoding once; None if it cannot be loaded (e.g. offline)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text with tiktoken, falling back to ~4 characters per token"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """The first `max_tokens` tokens of text"""
+    max_tokens = max(0, max_tokens)
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate prompt tokens for chat messages (content plus per-message overhead)"""
+    return sum(count_tokens(msg.get('content', '')) + 4 for msg in messages) + 2
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket.
+    
+    `reserve` deducts immediately and may leave the bucket in debt; the
+    returned wait is how long the caller must sleep until the debt is
+    repaid. Because reservation never awaits, concurrent coroutines queue
+    up fairly without a lock.
+    """
+    
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = now
+    
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+    
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` and return seconds to wait before using it"""
+        self._refill(now)
+        # A single request larger than the bucket still goes through once it is full
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+    
+    def adjust(self, delta: float, now: float):
+        """Credit (positive) or charge (negative) the bucket after the fact"""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + delta)
+    
+    def cap(self, remaining: float, now: float):
+        """Never report more than the provider says is left"""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one provider/model.
+    
+    Callers reserve capacity with an estimated token count before sending a
+    request and settle it with the actual usage afterwards. A limit of 0
+    disables that dimension.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.clock = clock
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, now) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, now) if tokens_per_minute > 0 else None
+        self.blocked_until = 0.0
+    
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserve one request and `estimated_tokens`; returns seconds to wait"""
+        now = self.clock()
+        wait = max(0.0, self.blocked_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens, now))
+        return wait
+    
+    async def acquire(self, estimated_tokens: int):
+        """Wait until the request fits in both budgets"""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            logger.info(f"Rate limiter delaying request by {wait:.2f}s")
+            await asyncio.sleep(wait)
+    
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token budget once the provider reports real usage"""
+        if self.tokens and actual_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens, self.clock())
+    
+    def release(self, estimated_tokens: int):
+        """Return a reservation for a request the provider rejected without counting"""
+        if self.tokens:
+            self.tokens.adjust(min(estimated_tokens, self.tokens.capacity), self.clock())
+    
+    def observe_headers(self, headers: httpx.Headers):
+        """Sync with x-ratelimit-remaining-* headers sent by OpenAI-compatible APIs"""
+        now = self.clock()
+        for bucket, header in ((self.requests, 'x-ratelimit-remaining-requests'), (self.tokens, 'x-ratelimit-remaining-tokens')):
+            if bucket and header in headers:
+                try:
+                    bucket.cap(float(headers[header]), now)
+                except ValueError:
+                    pass
+    
+    def pause(self, seconds: float):
+        """Hold every request until the provider's retry-after window has passed"""
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class Reservation:
+    """
+    Capacity reserved for one request. It is settled with the usage the
+    provider reports; any request that ends without settling (an error
+    status, a timeout, cancellation) releases it instead. Both are no-ops
+    after the first call, and without a limiter.
+    """
+    
+    def __init__(self, limiter: Optional[RateLimiter] = None, tokens: int = 0):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.open = limiter is not None
+    
+    def settle(self, usage: Dict[str, Any], headers: Optional[httpx.Headers] = None):
+        """Replace the reservation with the tokens the provider actually counted"""
+        if self.open:
+            self.open = False
+            self.limiter.record_usage(self.tokens, usage.get('total_tokens', 0))
+        if self.limiter is not None and headers is not None:
+            self.limiter.observe_headers(headers)
+    
+    def release(self):
+        """Give back the whole reservation of a request that was never counted"""
+        if self.open:
+            self.open = False
+            self.limiter.release(self.tokens)
+
+
+_rate_limiters: Dict[Tuple[str, str], Optional[RateLimiter]] = {}
+
+
+def _configured_limits(provider_name: str, model: str) -> Tuple[int, int]:
+    """(requests/min, tokens/min) for a provider/model from settings"""
+    overrides = {}
+    if settings.LLM_RATE_LIMIT_OVERRIDES:
+        try:
+            overrides = json.loads(settings.LLM_RATE_LIMIT_OVERRIDES)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring invalid LLM_RATE_LIMIT_OVERRIDES: {e}")
+    override = overrides.get(f"{provider_name}:{model}")
+    if override:
+        return int(override.get('rpm', 0)), int(override.get('tpm', 0))
+    
+    prefix = provider_name.upper()
+    return (
+        getattr(settings, f"{prefix}_REQUESTS_PER_MINUTE", 0),
+        getattr(settings, f"{prefix}_TOKENS_PER_MINUTE", 0)
+    )
+
+
+def get_rate_limiter(provider_name: str, model: str) -> Optional[RateLimiter]:
+    """
+    Process-wide rate limiter for a provider/model, shared by every request.
+    Returns None when no limits are configured.
+    """
+    key = (provider_name, model)
+    if key not in _rate_limiters:
+        requests_per_minute, tokens_per_minute = _configured_limits(provider_name, model)
+        if requests_per_minute > 0 or tokens_per_minute > 0:
+            _rate_limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        else:
+            _rate_limiters[key] = None
+    return _rate_limiters[key]
+
+
+@lru_cache(maxsize=1)
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client(base_url: str = "", headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+    """
+    Connection-pooled client for a provider API, with keep-alive and pool
+    limits from settings. HTTP/2 is used when enabled and `h2` is installed.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=settings.LLM_HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=settings.LLM_HTTP2 and _http2_available()
+    )
+
+
 class LLMProvider(ABC):
     """Base class for LLM providers"""
     
+    provider_name: str = "llm"
+    client: Optional[httpx.AsyncClient] = None
+    # False when the client is shared (see ProviderRegistry) and closed by its owner
+    owns_client: bool = True
+    
     @abstractmethod
     async def generate_text(
         self,
@@ -33,19 +275,92 @@ class LLMProvider(ABC):
             Dict with 'text' and optional 'usage' keys
         """
         pass
+    
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text as the model produces it
+        
+        Yields text deltas. If `usage` is given it is filled with the token
+        counts once the stream has finished. Providers without native
+        streaming yield the whole response as a single chunk.
+        """
+        result = await self.generate_text(messages, options)
+        if usage is not None:
+            usage.update(result.get('usage', {}))
+        yield result['text']
+    
+    def resolve_options(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Options for one call. With a 'stage' option the stage's generation
+        profile fills in model, temperature, max_tokens and timeout;
+        explicitly passed options win.
+        """
+        resolved = dict(options or {})
+        if resolved.get('stage'):
+            for key, value in stage_profile(self.provider_name, resolved['stage']).items():
+                resolved.setdefault(key, value)
+        if not resolved.get('model'):
+            resolved.pop('model', None)
+        return resolved
+    
+    @staticmethod
+    def _request_timeout(options: Dict[str, Any]):
+        """Per-call timeout from the options, else the client's"""
+        return options.get('timeout') or httpx.USE_CLIENT_DEFAULT
+    
+    async def _reserve_capacity(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Dict[str, Any]
+    ) -> Reservation:
+        """Wait for rate-limit capacity; the caller settles or releases the reservation"""
+        limiter = get_rate_limiter(self.provider_name, model)
+        if limiter is None:
+            return Reservation()
+        estimated = estimate_prompt_tokens(messages) + options.get(
+            'max_tokens', settings.LLM_COMPLETION_TOKEN_ESTIMATE
+        )
+        reservation = Reservation(limiter, estimated)
+        try:
+            await limiter.acquire(estimated)
+        except asyncio.CancelledError:
+            reservation.release()
+            raise
+        return reservation
+    
+    async def aclose(self):
+        """Close the HTTP client if this provider created it"""
+        if self.client is not None and self.owns_client:
+            await self.client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
 
 
 class OllamaProvider(LLMProvider):
     """Ollama local LLM provider (default)"""
     
+    provider_name = "ollama"
+    
     def __init__(
         self,
         base_url: str = "http://localhost:11434",
-        model: str = "qwen2.5:7b-instruct"
+        model: str = "qwen2.5:7b-instruct",
+        client: Optional[httpx.AsyncClient] = None
     ):
         self.base_url = base_url.rstrip('/')
         self.model = model
-        self.client = httpx.AsyncClient(timeout=120.0)
+        self.owns_client = client is None
+        self.client = client or create_http_client()
     
     async def generate_text(
         self,
@@ -53,7 +368,7 @@ class OllamaProvider(LLMProvider):
         options: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate text using Ollama Chat API"""
-        options = options or {}
+        options = self.resolve_options(options)
         
         # Convert messages to Ollama format
         ollama_messages = []
@@ -73,14 +388,18 @@ class OllamaProvider(LLMProvider):
         }
         
         # Add optional parameters
-        if 'temperature' in options:
-            payload['options'] = {'temperature': options['temperature']}
+        ollama_options = _ollama_options(options)
+        if ollama_options:
+            payload['options'] = ollama_options
+        if options.get('json_mode'):
+            payload['format'] = "json"
         
         url = f"{self.base_url}/api/chat"
         
+        reservation = await self._reserve_capacity(payload['model'], ollama_messages, options)
         try:
             logger.info(f"Calling Ollama at {url} with model {payload['model']}")
-            response = await self.client.post(url, json=payload)
+            response = await self.client.post(url, json=payload, timeout=self._request_timeout(options))
             response.raise_for_status()
             
             data = response.json()
@@ -91,13 +410,16 @@ class OllamaProvider(LLMProvider):
             if not text:
                 raise ValueError("Empty response from Ollama")
             
+            usage = {
+                'prompt_tokens': data.get('prompt_eval_count', 0),
+                'completion_tokens': data.get('eval_count', 0),
+                'total_tokens': data.get('prompt_eval_count', 0) + data.get('eval_count', 0)
+            }
+            reservation.settle(usage)
+            
             return {
                 'text': text,
-                'usage': {
-                    'prompt_tokens': data.get('prompt_eval_count', 0),
-                    'completion_tokens': data.get('eval_count', 0),
-                    'total_tokens': data.get('prompt_eval_count', 0) + data.get('eval_count', 0)
-                }
+                'usage': usage
             }
         
         except httpx.ConnectError:
@@ -122,29 +444,110 @@ class OllamaProvider(LLMProvider):
         except Exception as e:
             logger.error(f"Ollama API error: {e}")
             raise
+        
+        finally:
+            reservation.release()
     
-    async def __aenter__(self):
-        return self
-    
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text from the Ollama Chat API (newline-delimited JSON)"""
+        options = self.resolve_options(options)
+        ollama_messages = [
+            {'role': msg.get('role', 'user'), 'content': msg.get('content', '')}
+            for msg in messages
+        ]
+        payload = {
+            "model": options.get('model', self.model),
+            "messages": ollama_messages,
+            "stream": True
+        }
+        ollama_options = _ollama_options(options)
+        if ollama_options:
+            payload['options'] = ollama_options
+        if options.get('json_mode'):
+            payload['format'] = "json"
+        
+        url = f"{self.base_url}/api/chat"
+        
+        reservation = await self._reserve_capacity(payload['model'], ollama_messages, options)
+        try:
+            logger.info(f"Streaming from Ollama at {url} with model {payload['model']}")
+            async with self.client.stream("POST", url, json=payload, timeout=self._request_timeout(options)) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                
+                final_usage = {}
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get('error'):
+                        raise ValueError(f"Ollama error: {data['error']}")
+                    text = data.get('message', {}).get('content', '')
+                    if text:
+                        yield text
+                    if data.get('done'):
+                        final_usage = {
+                            'prompt_tokens': data.get('prompt_eval_count', 0),
+                            'completion_tokens': data.get('eval_count', 0),
+                            'total_tokens': data.get('prompt_eval_count', 0) + data.get('eval_count', 0)
+                        }
+            
+            reservation.settle(final_usage)
+            if usage is not None:
+                usage.update(final_usage)
+        
+        except httpx.ConnectError:
+            error_msg = (
+                f"Could not connect to Ollama at {self.base_url}. "
+                f"Please ensure Ollama is running and the model '{self.model}' is pulled. "
+                f"Run: ollama pull {self.model}"
+            )
+            logger.error(error_msg)
+            raise ConnectionError(error_msg)
+        
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                error_msg = (
+                    f"Model '{self.model}' not found. Please pull it first: "
+                    f"ollama pull {self.model}"
+                )
+                logger.error(error_msg)
+                raise ValueError(error_msg)
+            raise
+        
+        finally:
+            reservation.release()
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI provider (optional, requires API key)"""
     
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    provider_name = "openai"
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        client: Optional[httpx.AsyncClient] = None,
+        base_url: str = "https://api.openai.com/v1"
+    ):
         if not api_key:
             raise ValueError("OPENAI_API_KEY is required for OpenAI provider")
         self.api_key = api_key
         self.model = model
-        self.client = httpx.AsyncClient(
-            base_url="https://api.openai.com/v1",
+        self.owns_client = client is None
+        self.client = client or create_http_client(
+            base_url=base_url,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json"
-            },
-            timeout=120.0
+            }
         )
     
     async def generate_text(
@@ -153,7 +556,7 @@ class OpenAIProvider(LLMProvider):
         options: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate text using OpenAI Chat API"""
-        options = options or {}
+        options = self.resolve_options(options)
         
         # Convert messages to OpenAI format
         openai_messages = []
@@ -171,10 +574,15 @@ class OpenAIProvider(LLMProvider):
             "messages": openai_messages,
             "temperature": options.get('temperature', 0.7)
         }
+        if 'max_tokens' in options:
+            payload['max_tokens'] = options['max_tokens']
+        if options.get('json_mode'):
+            payload['response_format'] = {"type": "json_object"}
         
+        reservation = await self._reserve_capacity(payload['model'], openai_messages, options)
         try:
             logger.info(f"Calling OpenAI with model {payload['model']}")
-            response = await self.client.post("/chat/completions", json=payload)
+            response = await self.client.post("/chat/completions", json=payload, timeout=self._request_timeout(options))
             response.raise_for_status()
             
             data = response.json()
@@ -182,62 +590,126 @@ class OpenAIProvider(LLMProvider):
             # Extract text and usage
             text = data['choices'][0]['message']['content']
             usage = data.get('usage', {})
+            usage = {
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0),
+                'total_tokens': usage.get('total_tokens', 0)
+            }
+            reservation.settle(usage, response.headers)
             
             return {
                 'text': text,
-                'usage': {
-                    'prompt_tokens': usage.get('prompt_tokens', 0),
-                    'completion_tokens': usage.get('completion_tokens', 0),
-                    'total_tokens': usage.get('total_tokens', 0)
-                }
+                'usage': usage
             }
         
         except httpx.HTTPStatusError as e:
-            if e.response.status_code == 401:
-                error_msg = (
-                    "OpenAI API key is invalid. Please check your OPENAI_API_KEY. "
-                    "Alternatively, use Ollama (default) by setting LLM_PROVIDER=ollama"
-                )
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-            
-            elif e.response.status_code == 429:
-                error_msg = (
-                    "OpenAI API quota exceeded. Please check your billing at "
-                    "https://platform.openai.com/account/billing or switch to Ollama "
-                    "by setting LLM_PROVIDER=ollama"
-                )
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-            
-            raise
+            self._raise_for_http_error(e, reservation.limiter)
         
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
             raise
+        
+        finally:
+            reservation.release()
     
-    async def __aenter__(self):
-        return self
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text from the OpenAI Chat API (server-sent events)"""
+        options = self.resolve_options(options)
+        openai_messages = [
+            {'role': msg.get('role', 'user'), 'content': msg.get('content', '')}
+            for msg in messages
+        ]
+        payload = {
+            "model": options.get('model', self.model),
+            "messages": openai_messages,
+            "temperature": options.get('temperature', 0.7),
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        if 'max_tokens' in options:
+            payload['max_tokens'] = options['max_tokens']
+        if options.get('json_mode'):
+            payload['response_format'] = {"type": "json_object"}
+        
+        reservation = await self._reserve_capacity(payload['model'], openai_messages, options)
+        try:
+            logger.info(f"Streaming from OpenAI with model {payload['model']}")
+            async with self.client.stream("POST", "/chat/completions", json=payload, timeout=self._request_timeout(options)) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                
+                final_usage = {}
+                async for chunk in _iter_sse_json(response):
+                    final_usage = _chunk_usage(chunk) or final_usage
+                    for choice in chunk.get('choices', []):
+                        text = (choice.get('delta') or {}).get('content')
+                        if text:
+                            yield text
+            
+            reservation.settle(final_usage, response.headers)
+            if usage is not None:
+                usage.update(final_usage)
+        
+        except httpx.HTTPStatusError as e:
+            self._raise_for_http_error(e, reservation.limiter)
+        
+        finally:
+            reservation.release()
     
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+    @staticmethod
+    def _raise_for_http_error(e: httpx.HTTPStatusError, limiter: Optional[RateLimiter]):
+        """Translate OpenAI HTTP errors into actionable messages"""
+        if e.response.status_code == 401:
+            error_msg = (
+                "OpenAI API key is invalid. Please check your OPENAI_API_KEY. "
+                "Alternatively, use Ollama (default) by setting LLM_PROVIDER=ollama"
+            )
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        elif e.response.status_code == 429:
+            if limiter is not None:
+                limiter.pause(_retry_after_seconds(e.response, default=20))
+            error_msg = (
+                "OpenAI API quota exceeded. Please check your billing at "
+                "https://platform.openai.com/account/billing or switch to Ollama "
+                "by setting LLM_PROVIDER=ollama"
+            )
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        raise e
 
 
 class GroqProvider(LLMProvider):
     """Groq provider (FREE tier, no credit card required!)"""
     
-    def __init__(self, api_key: str, model: str = "llama-3.1-70b-versatile"):
+    provider_name = "groq"
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "llama-3.1-70b-versatile",
+        client: Optional[httpx.AsyncClient] = None,
+        base_url: str = "https://api.groq.com/openai/v1"
+    ):
         if not api_key:
             raise ValueError("GROQ_API_KEY is required for Groq provider")
         self.api_key = api_key
         self.model = model
-        self.client = httpx.AsyncClient(
-            base_url="https://api.groq.com/openai/v1",
+        self.owns_client = client is None
+        self.client = client or create_http_client(
+            base_url=base_url,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json"
-            },
-            timeout=120.0
+            }
         )
     
     async def generate_text(
@@ -246,7 +718,7 @@ class GroqProvider(LLMProvider):
         options: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Generate text using Groq API (OpenAI-compatible) with retry logic for rate limits"""
-        options = options or {}
+        options = self.resolve_options(options)
         
         # Convert messages to OpenAI format (Groq uses OpenAI-compatible API)
         groq_messages = []
@@ -263,15 +735,22 @@ class GroqProvider(LLMProvider):
             "messages": groq_messages,
             "temperature": options.get('temperature', 0.7)
         }
+        if 'max_tokens' in options:
+            payload['max_tokens'] = options['max_tokens']
+        if options.get('json_mode'):
+            payload['response_format'] = {"type": "json_object"}
         
         # Retry logic for rate limits (429 errors)
         max_retries = 3
         retry_delay = 2  # Start with 2 seconds
         
         for attempt in range(max_retries):
+            # Wait for shared TPM/RPM budget instead of discovering the limit via 429s
+            reservation = await self._reserve_capacity(payload['model'], groq_messages, options)
+            limiter = reservation.limiter
             try:
                 logger.info(f"Calling Groq API with model {payload['model']} (attempt {attempt + 1}/{max_retries})")
-                response = await self.client.post("/chat/completions", json=payload)
+                response = await self.client.post("/chat/completions", json=payload, timeout=self._request_timeout(options))
                 
                 # Log response for debugging
                 if response.status_code != 200:
@@ -280,15 +759,15 @@ class GroqProvider(LLMProvider):
                 
                 # If rate limited, retry with exponential backoff
                 if response.status_code == 429:
-                    retry_after = response.headers.get('retry-after', str(retry_delay))
-                    try:
-                        retry_seconds = int(retry_after)
-                    except:
-                        retry_seconds = retry_delay
+                    retry_seconds = _retry_after_seconds(response, default=retry_delay)
+                    if limiter is not None:
+                        # Hold every concurrent request, not just this one
+                        limiter.pause(retry_seconds)
                     
                     if attempt < max_retries - 1:
                         logger.info(f"Rate limit hit. Waiting {retry_seconds} seconds before retry...")
-                        await asyncio.sleep(retry_seconds)
+                        if limiter is None:
+                            await asyncio.sleep(retry_seconds)
                         retry_delay *= 2  # Exponential backoff
                         continue
                     else:
@@ -297,73 +776,190 @@ class GroqProvider(LLMProvider):
                 
                 response.raise_for_status()
             
-            data = response.json()
-            
-            # Extract text and usage
-            text = data['choices'][0]['message']['content']
-            usage = data.get('usage', {})
-            
-            return {
-                'text': text,
-                'usage': {
+                data = response.json()
+                
+                # Extract text and usage
+                text = data['choices'][0]['message']['content']
+                usage = data.get('usage', {})
+                usage = {
                     'prompt_tokens': usage.get('prompt_tokens', 0),
                     'completion_tokens': usage.get('completion_tokens', 0),
                     'total_tokens': usage.get('total_tokens', 0)
                 }
-            }
-        
-        except httpx.HTTPStatusError as e:
-            error_body = ""
-            try:
-                error_body = e.response.json()
-            except:
-                error_body = e.response.text
+                reservation.settle(usage, response.headers)
+                
+                return {
+                    'text': text,
+                    'usage': usage,
+                    'retries': attempt  # Rate-limited attempts before this one
+                }
             
-            if e.response.status_code == 400:
-                error_msg = (
-                    f"Groq API bad request: {error_body}. "
-                    f"Check that the model '{payload['model']}' is valid. "
-                    f"Valid models: llama-3.1-70b-versatile, llama-3.1-8b-instant, mixtral-8x7b-32768"
-                )
-                logger.error(error_msg)
-                raise ValueError(error_msg)
+            except httpx.HTTPStatusError as e:
+                self._raise_for_http_error(e, payload['model'])
             
-            elif e.response.status_code == 401:
-                error_msg = (
-                    "Groq API key is invalid. Please check your GROQ_API_KEY. "
-                    "Get a free API key at https://console.groq.com/keys"
-                )
-                logger.error(error_msg)
-                raise ValueError(error_msg)
+            except Exception as e:
+                logger.error(f"Groq API error: {e}")
+                raise
             
-            elif e.response.status_code == 429:
-                # Extract retry-after header if available
-                retry_after = e.response.headers.get('retry-after', '60')
-                try:
-                    retry_seconds = int(retry_after)
-                except:
-                    retry_seconds = 60
+            finally:
+                # Rejected, failed and cancelled attempts were never counted by Groq
+                reservation.release()
+    
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text from the Groq API (OpenAI-compatible server-sent events)"""
+        options = self.resolve_options(options)
+        groq_messages = [
+            {'role': msg.get('role', 'user'), 'content': msg.get('content', '')}
+            for msg in messages
+        ]
+        payload = {
+            "model": options.get('model', self.model),
+            "messages": groq_messages,
+            "temperature": options.get('temperature', 0.7),
+            "stream": True
+        }
+        if 'max_tokens' in options:
+            payload['max_tokens'] = options['max_tokens']
+        # Groq rejects JSON mode on streamed requests; the prompt still asks for JSON
+        
+        # Rate limits are retried only before the first token; a broken stream is not resumable
+        max_retries = 3
+        retry_delay = 2
+        
+        for attempt in range(max_retries):
+            reservation = await self._reserve_capacity(payload['model'], groq_messages, options)
+            limiter = reservation.limiter
+            try:
+                logger.info(f"Streaming from Groq API with model {payload['model']} (attempt {attempt + 1}/{max_retries})")
+                async with self.client.stream("POST", "/chat/completions", json=payload, timeout=self._request_timeout(options)) as response:
+                    if response.is_error:
+                        await response.aread()
+                        logger.warning(f"Groq API error {response.status_code}: {response.text}")
+                    
+                    if response.status_code == 429:
+                        retry_seconds = _retry_after_seconds(response, default=retry_delay)
+                        if limiter is not None:
+                            limiter.pause(retry_seconds)
+                        if attempt < max_retries - 1:
+                            if limiter is None:
+                                await asyncio.sleep(retry_seconds)
+                            logger.info(f"Rate limit hit. Waiting {retry_seconds} seconds before retry...")
+                            retry_delay *= 2
+                            continue
+                    response.raise_for_status()
+                    
+                    final_usage = {}
+                    async for chunk in _iter_sse_json(response):
+                        final_usage = _chunk_usage(chunk) or final_usage
+                        for choice in chunk.get('choices', []):
+                            text = (choice.get('delta') or {}).get('content')
+                            if text:
+                                yield text
                 
-                error_msg = (
-                    f"Groq API rate limit exceeded (6000 tokens/minute on free tier). "
-                    f"Rate limit resets in {retry_seconds} seconds. "
-                    f"Please wait and try again, or upgrade to Dev Tier for higher limits: "
-                    f"https://console.groq.com/settings/billing"
-                )
-                logger.warning(f"Groq rate limit hit. Retry after {retry_seconds}s")
-                raise ValueError(error_msg)
+                reservation.settle(final_usage, response.headers)
+                if usage is not None:
+                    usage.update(final_usage)
+                return
             
-            raise ValueError(f"Groq API error {e.response.status_code}: {error_body}")
-        
-        except Exception as e:
-            logger.error(f"Groq API error: {e}")
-            raise
-    
-    async def __aenter__(self):
-        return self
+            except httpx.HTTPStatusError as e:
+                self._raise_for_http_error(e, payload['model'])
+            
+            finally:
+                reservation.release()
     
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+    @staticmethod
+    def _raise_for_http_error(e: httpx.HTTPStatusError, model: str):
+        """Translate Groq HTTP errors into actionable messages"""
+        error_body = ""
+        try:
+            error_body = e.response.json()
+        except:
+            error_body = e.response.text
+        
+        if e.response.status_code == 400:
+            error_msg = (
+                f"Groq API bad request: {error_body}. "
+                f"Check that the model '{model}' is valid. "
+                f"Valid models: llama-3.1-70b-versatile, llama-3.1-8b-instant, mixtral-8x7b-32768"
+            )
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        elif e.response.status_code == 401:
+            error_msg = (
+                "Groq API key is invalid. Please check your GROQ_API_KEY. "
+                "Get a free API key at https://console.groq.com/keys"
+            )
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        elif e.response.status_code == 429:
+            # Extract retry-after header if available
+            retry_after = e.response.headers.get('retry-after', '60')
+            try:
+                retry_seconds = int(retry_after)
+            except:
+                retry_seconds = 60
+            
+            error_msg = (
+                f"Groq API rate limit exceeded (6000 tokens/minute on free tier). "
+                f"Rate limit resets in {retry_seconds} seconds. "
+                f"Please wait and try again, or upgrade to Dev Tier for higher limits: "
+                f"https://console.groq.com/settings/billing"
+            )
+            logger.warning(f"Groq rate limit hit. Retry after {retry_seconds}s")
+            raise ValueError(error_msg)
+        
+        raise ValueError(f"Groq API error {e.response.status_code}: {error_body}")
+
+
+def _ollama_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Ollama model options (temperature, num_predict) from call options"""
+    ollama_options = {}
+    if 'temperature' in options:
+        ollama_options['temperature'] = options['temperature']
+    if 'max_tokens' in options:
+        ollama_options['num_predict'] = options['max_tokens']
+    return ollama_options
+
+
+async def _iter_sse_json(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Decode `data:` lines of an OpenAI-compatible server-sent event stream"""
+    async for line in response.aiter_lines():
+        if not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed stream chunk: {data[:100]}")
+
+
+def _chunk_usage(chunk: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """Usage reported in a streamed chunk (OpenAI `usage`, Groq `x_groq.usage`)"""
+    usage = chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage')
+    if not usage:
+        return None
+    return {
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'total_tokens': usage.get('total_tokens', 0)
+    }
+
+
+def _retry_after_seconds(response: httpx.Response, default: float) -> float:
+    """Parse a retry-after header, falling back to `default`"""
+    try:
+        return float(response.headers.get('retry-after', default))
+    except (TypeError, ValueError):
+        return default
 
 
 def get_provider(provider_name: str, **kwargs) -> LLMProvider:
@@ -372,7 +968,8 @@ def get_provider(provider_name: str, **kwargs) -> LLMProvider:
     
     Args:
         provider_name: 'ollama', 'openai', or 'groq'
-        **kwargs: Provider-specific configuration
+        **kwargs: Provider-specific configuration; `client` is a shared
+            HTTP client to use instead of creating one
     
     Returns:
         LLMProvider instance
@@ -380,7 +977,8 @@ def get_provider(provider_name: str, **kwargs) -> LLMProvider:
     if provider_name == "ollama":
         return OllamaProvider(
             base_url=kwargs.get('ollama_base_url', 'http://localhost:11434'),
-            model=kwargs.get('ollama_model', 'qwen2.5:7b-instruct')
+            model=kwargs.get('ollama_model', 'qwen2.5:7b-instruct'),
+            client=kwargs.get('client')
         )
     
     elif provider_name == "openai":
@@ -392,7 +990,9 @@ def get_provider(provider_name: str, **kwargs) -> LLMProvider:
             )
         return OpenAIProvider(
             api_key=api_key,
-            model=kwargs.get('openai_model', 'gpt-4o')
+            model=kwargs.get('openai_model', 'gpt-4o'),
+            client=kwargs.get('client'),
+            base_url=kwargs.get('openai_base_url', 'https://api.openai.com/v1')
         )
     
     elif provider_name == "groq":
@@ -404,7 +1004,9 @@ def get_provider(provider_name: str, **kwargs) -> LLMProvider:
             )
         return GroqProvider(
             api_key=api_key,
-            model=kwargs.get('groq_model', 'llama-3.1-70b-versatile')
+            model=kwargs.get('groq_model', 'llama-3.1-70b-versatile'),
+            client=kwargs.get('client'),
+            base_url=kwargs.get('groq_base_url', 'https://api.groq.com/openai/v1')
         )
     
     else:
@@ -0,0 +1,258 @@
+"""
+Latency-aware routing, request hedging and failover across LLM providers
+"""
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Deque
+from app.core.config import settings
+from app.services.llm_provider import LLMProvider
+from app.services.circuit_breaker import CircuitOpenError, get_circuit_breaker, is_backend_failure
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+BackendKey = Tuple[str, str]
+
+
+def backend_key(provider: LLMProvider, options: Optional[Dict[str, Any]] = None) -> BackendKey:
+    """(provider name, model) a call's latency and failures are tracked under"""
+    model = provider.resolve_options(options).get('model', getattr(provider, 'model', ''))
+    return provider.provider_name, model
+
+
+class LatencyTracker:
+    """Rolling window of call latencies per provider/model"""
+    
+    def __init__(self, window: Optional[int] = None, min_samples: Optional[int] = None):
+        self.window = window or settings.LLM_LATENCY_WINDOW
+        self.min_samples = min_samples if min_samples is not None else settings.LLM_LATENCY_MIN_SAMPLES
+        self._samples: Dict[BackendKey, Deque[float]] = {}
+    
+    def record(self, key: BackendKey, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+    
+    def count(self, key: BackendKey) -> int:
+        return len(self._samples.get(key, ()))
+    
+    def percentile(self, key: BackendKey, q: float) -> Optional[float]:
+        """Latency percentile (q in 0..1); None until `min_samples` calls were seen"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95 and sample count per backend, for logs and diagnostics"""
+        return {
+            f"{name}:{model}": {
+                "samples": self.count((name, model)),
+                "p50": self.percentile((name, model), 0.5),
+                "p95": self.percentile((name, model), 0.95)
+            }
+            for name, model in self._samples
+        }
+
+
+_latency_tracker: Optional[LatencyTracker] = None
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Process-wide latency statistics, shared by every routing provider"""
+    global _latency_tracker
+    if _latency_tracker is None:
+        _latency_tracker = LatencyTracker()
+    return _latency_tracker
+
+
+class RoutingProvider(LLMProvider):
+    """
+    Sends each call to one of several providers, skipping backends whose
+    circuit breaker is open, and fails over to the next backend when a call
+    fails with a backend failure (timeout, transport error, 5xx, 429; see
+    `is_backend_failure`). Other errors, such as a bad request or an invalid
+    key, are raised as-is and do not count against the breaker. Calls fail
+    fast with CircuitOpenError when every circuit is open.
+    
+    By default backends are ranked by rolling p50 latency; backends with
+    fewer than LLM_LATENCY_MIN_SAMPLES calls are tried first so every
+    backend gets measured. With `ordered=True` (a failover chain) they are
+    tried in the given order and the first one names the model.
+    
+    With hedging on, when the chosen backend has not answered within its
+    p95 (LLM_HEDGE_DEFAULT_DELAY_SECONDS until it has enough samples) the
+    same request is sent to the next backend too; the first answer wins and
+    the other call is cancelled.
+    """
+    
+    provider_name = "auto"
+    
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        tracker: Optional[LatencyTracker] = None,
+        hedge: Optional[bool] = None,
+        ordered: bool = False
+    ):
+        if not providers:
+            raise ValueError("RoutingProvider needs at least one provider")
+        self.providers = providers
+        self.tracker = tracker or get_latency_tracker()
+        self.ordered = ordered
+        self.hedge = settings.LLM_HEDGE_ENABLED if hedge is None else hedge
+        if ordered:
+            # Responses are cached under the requested backend
+            self.provider_name, self.model = backend_key(providers[0])
+        else:
+            self.model = ",".join(f"{name}:{model}" for name, model in map(backend_key, providers))
+    
+    def ranked(self, options: Optional[Dict[str, Any]] = None) -> List[LLMProvider]:
+        """Providers in the order they should be tried for a call"""
+        if self.ordered:
+            return list(self.providers)
+        
+        def rank(provider: LLMProvider):
+            key = backend_key(provider, options)
+            p50 = self.tracker.percentile(key, 0.5)
+            if p50 is None:
+                return (0, self.tracker.count(key))
+            return (1, p50)
+        return sorted(self.providers, key=rank)
+    
+    def _next_available(self, candidates: List[LLMProvider], options: Optional[Dict[str, Any]]) -> Optional[LLMProvider]:
+        """Pop candidates until one whose circuit lets a call through"""
+        while candidates:
+            provider = candidates.pop(0)
+            breaker = get_circuit_breaker(*backend_key(provider, options))
+            if breaker.allow():
+                return provider
+            logger.info(f"Skipping {breaker.name}: circuit open")
+        return None
+    
+    def _circuit_open_error(self, options: Optional[Dict[str, Any]]) -> CircuitOpenError:
+        breakers = [get_circuit_breaker(*backend_key(provider, options)) for provider in self.providers]
+        retry_in = min(breaker.retry_in() for breaker in breakers)
+        names = ", ".join(breaker.name for breaker in breakers)
+        return CircuitOpenError(f"LLM backends unavailable (circuit open): {names}. Retry in {retry_in:.0f}s")
+    
+    def _hedge_delay(self, provider: LLMProvider, options: Optional[Dict[str, Any]]) -> float:
+        p95 = self.tracker.percentile(backend_key(provider, options), settings.LLM_HEDGE_PERCENTILE)
+        return p95 if p95 is not None else settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    
+    async def _timed(
+        self,
+        provider: LLMProvider,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        key = backend_key(provider, options)
+        breaker = get_circuit_breaker(*key)
+        started = time.monotonic()
+        try:
+            result = await provider.generate_text(messages, options)
+        except asyncio.CancelledError:
+            # A hedged loser was at least this slow
+            self.tracker.record(key, time.monotonic() - started)
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            if is_backend_failure(e):
+                breaker.record_failure()
+            else:
+                # The backend answered; the request itself was bad
+                breaker.record_cancelled()
+            raise
+        breaker.record_success()
+        self.tracker.record(key, time.monotonic() - started)
+        return {**result, 'provider': f"{key[0]}:{key[1]}"}
+    
+    async def generate_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        candidates = self.ranked(options)
+        pending = set()
+        errors: List[BaseException] = []
+        
+        def launch() -> Optional[LLMProvider]:
+            provider = self._next_available(candidates, options)
+            if provider is not None:
+                pending.add(asyncio.create_task(self._timed(provider, messages, options)))
+            return provider
+        
+        primary = launch()
+        if primary is None:
+            raise self._circuit_open_error(options)
+        hedge_delay = self._hedge_delay(primary, options) if self.hedge and candidates else None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                hedge_delay = None
+                if not done:
+                    provider = launch()
+                    if provider is not None:
+                        logger.info(f"Hedging slow LLM call to {':'.join(backend_key(provider, options))}")
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        # Failed backends before this answer count as retries
+                        result = task.result()
+                        return {**result, 'retries': result.get('retries', 0) + len(errors)}
+                    if not is_backend_failure(task.exception()):
+                        # Another backend would reject the same request
+                        raise task.exception()
+                    errors.append(task.exception())
+                    logger.warning(f"LLM backend failed: {task.exception()}")
+                if not pending:
+                    # Fail over to the next backend
+                    launch()
+            raise errors[0] if errors else self._circuit_open_error(options)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the first available backend (streams are not hedged).
+        A backend that fails before its first chunk is failed over.
+        """
+        candidates = self.ranked(options)
+        first_error: Optional[BaseException] = None
+        while True:
+            provider = self._next_available(candidates, options)
+            if provider is None:
+                raise first_error or self._circuit_open_error(options)
+            key = backend_key(provider, options)
+            breaker = get_circuit_breaker(*key)
+            started = time.monotonic()
+            yielded = False
+            try:
+                async for chunk in provider.stream_text(messages, options, usage):
+                    yielded = True
+                    yield chunk
+            except Exception as e:
+                if not is_backend_failure(e):
+                    breaker.record_cancelled()
+                    raise
+                breaker.record_failure()
+                if yielded:
+                    raise
+                logger.warning(f"LLM backend failed: {e}")
+                first_error = first_error or e
+                continue
+            except BaseException:
+                breaker.record_cancelled()
+                raise
+            breaker.record_success()
+            self.tracker.record(key, time.monotonic() - started)
+            return
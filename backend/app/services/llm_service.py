@@ -2,20 +2,301 @@
 LLM abstraction layer using provider abstraction
 Supports Ollama (default) and OpenAI (optional)
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Type
 from app.core.config import settings
-from app.services.llm_provider import get_provider, LLMProvider
+from app.services.llm_provider import LLMProvider, count_tokens, estimate_prompt_tokens
+from app.services.provider_registry import provider_registry
+from app.services.llm_routing import RoutingProvider
+from app.services.generation_profiles import stage_profile
+from app.services.llm_cache import LLMResponseCache, get_llm_cache, is_llm_cache_bypassed
+from app.services.json_stream import JSONArrayStreamParser, MalformedJSON
+from app.services.prompt_builder import build_messages, compact_json
+from app.services.usage_meter import record_llm_call
+from app.services.replay_provider import RecordingProvider, get_replay_provider
+from app.schemas.generation import (
+    EpicDraft, StoryDraft, TaskDraft, TimelineEstimate, GroomedBacklog, validate_item
+)
+from pydantic import BaseModel
+from app.utils.spec_segmenter import chunk_spec
+import asyncio
 import json
 import logging
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
+# Context window (tokens) per model; used to size batched prompts
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 16385,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.1-70b-versatile": 131072,
+    "llama-3.3-70b-versatile": 131072,
+    "mixtral-8x7b-32768": 32768,
+}
+# Ollama truncates to its default num_ctx unless told otherwise
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Ignored when comparing epic titles from different spec chunks
+_TITLE_STOPWORDS = {"and", "the", "of", "for", "a", "an", "to", "with", "in", "on"}
+
+
+def _title_words(epic: Dict[str, Any]) -> set:
+    return {
+        word for word in re.findall(r"[a-z0-9]+", str(epic.get("title", "")).lower())
+        if word not in _TITLE_STOPWORDS
+    }
+
+
+def is_duplicate_epic(epic: Dict[str, Any], others: List[Dict[str, Any]], threshold: float) -> bool:
+    """Whether `epic` has the same title words as one of `others` (Jaccard >= threshold)"""
+    words = _title_words(epic)
+    if not words:
+        return False
+    for other in others:
+        other_words = _title_words(other)
+        if other_words and len(words & other_words) / len(words | other_words) >= threshold:
+            return True
+    return False
+
+
+EPIC_SYSTEM_PROMPT = """You are an expert product manager and agile coach. 
+        Your task is to analyze a product specification document and extract high-level epics.
+        
+        An epic is a large body of work that can be broken down into smaller user stories.
+        Each epic should have:
+        - A clear, descriptive title
+        - A detailed description
+        - A priority level (low, medium, high, critical)
+        - An initial effort estimate in story points (1-100)
+        
+        Return your response as a JSON object holding an array of epics, with the following structure:
+        {
+            "epics": [
+                {
+                    "title": "Epic Title",
+                    "description": "Detailed description of the epic",
+                    "priority": "high",
+                    "estimated_effort": 13
+                }
+            ]
+        }
+        
+        Be thorough but focused. Extract 3-10 epics depending on the scope of the specification."""
+
+EPIC_USER_PROMPT = """Analyze the following product specification and extract epics:
+        
+        {spec_content}
+        
+        Return only valid JSON, no additional text."""
+
+EPIC_PART_USER_PROMPT = """The following is part {part} of {parts} of a larger product specification.
+        Extract only the epics this part describes (0-5 epics; return {{"epics": []}} if it describes none):
+        
+        {spec_content}
+        
+        Return only valid JSON, no additional text."""
+
+STORY_SYSTEM_PROMPT = """You are an expert agile coach. Your task is to break down an epic into user stories.
+        
+        Each user story should follow the format: "As a [user type], I want [goal] so that [benefit]"
+        Each story should have:
+        - A clear title
+        - A detailed description
+        - Acceptance criteria (3-5 bullet points)
+        - A priority level (low, medium, high, critical)
+        - An estimated effort in story points (1-13, using Fibonacci sequence)
+        
+        Return your response as a JSON object holding an array of stories:
+        {
+            "stories": [
+                {
+                    "title": "Story Title",
+                    "description": "As a user, I want...",
+                    "acceptance_criteria": "1. Criterion 1\\n2. Criterion 2",
+                    "priority": "medium",
+                    "estimated_effort": 5
+                }
+            ]
+        }"""
+
+STORY_USER_PROMPT = """Break down the following epic into user stories:
+        
+        {epic_description}
+        
+        Return only valid JSON, no additional text."""
+
+TASK_SYSTEM_PROMPT = """You are an expert technical lead. Your task is to break down a user story into specific, actionable tasks.
+        
+        Each task should be:
+        - Specific and actionable (can be completed by one developer in 1-8 hours)
+        - Have a clear title
+        - Have a description explaining what needs to be done
+        - Have an estimated time in hours
+        - Have a priority level
+        
+        Tasks typically include: design, implementation, testing, documentation, code review, deployment.
+        
+        Return your response as a JSON object holding an array of tasks:
+        {
+            "tasks": [
+                {
+                    "title": "Task Title",
+                    "description": "Detailed task description",
+                    "estimated_hours": 4,
+                    "priority": "medium"
+                }
+            ]
+        }"""
+
+TASK_USER_PROMPT = """Break down the following user story into tasks:
+        
+        Story: {story_description}
+        Acceptance Criteria: {acceptance_criteria}
+        
+        Return only valid JSON, no additional text."""
+
+TASK_BATCH_SYSTEM_PROMPT = """You are an expert technical lead. Your task is to break down several user stories into specific, actionable tasks.
+        
+        Each task should be:
+        - Specific and actionable (can be completed by one developer in 1-8 hours)
+        - Have a clear title
+        - Have a description explaining what needs to be done
+        - Have an estimated time in hours
+        - Have a priority level
+        
+        Tasks typically include: design, implementation, testing, documentation, code review, deployment.
+        
+        Each story is labelled with an identifier such as S1. Return a JSON object that maps
+        every story identifier to that story's array of tasks:
+        {
+            "S1": [
+                {
+                    "title": "Task Title",
+                    "description": "Detailed task description",
+                    "estimated_hours": 4,
+                    "priority": "medium"
+                }
+            ],
+            "S2": [...]
+        }"""
+
+TASK_BATCH_USER_PROMPT = """Break down each of the following user stories into tasks:
+        
+        {story_blocks}
+        
+        Return only a valid JSON object keyed by story identifier ({story_ids}), no additional text."""
+
+TIMELINE_SYSTEM_PROMPT = """You are an expert project manager. Your task is to estimate project timelines.
+        
+        Based on the total effort (story points) and historical velocity data, estimate:
+        - Number of sprints needed
+        - Sprint duration (typically 2 weeks)
+        - Start and end dates
+        - Risk factors
+        
+        Return your response as JSON:
+        {
+            "estimated_sprints": 4,
+            "sprint_duration_weeks": 2,
+            "estimated_start_date": "2024-01-01",
+            "estimated_end_date": "2024-02-26",
+            "confidence_level": "high",
+            "risk_factors": ["Risk 1", "Risk 2"]
+        }"""
+
+TIMELINE_USER_PROMPT = """Estimate the timeline for this project:
+        
+        {project_summary}
+        {context}
+        
+        Return only valid JSON, no additional text."""
+
+GROOM_SYSTEM_PROMPT = """You are an expert product owner. Your task is to groom a product backlog.
+        
+        Analyze the backlog items and:
+        - Suggest priority adjustments
+        - Identify dependencies
+        - Suggest effort estimate refinements
+        - Identify potential risks or blockers
+        
+        Return your response as JSON:
+        {
+            "prioritized_items": [...],
+            "dependencies": [...],
+            "recommendations": "..."
+        }"""
+
+GROOM_USER_PROMPT = """Groom the following backlog:
+        
+        {backlog_items}
+        
+        Return only valid JSON, no additional text."""
+
+REPAIR_SYSTEM_PROMPT = """You fix JSON objects that do not match a schema.
+        Keep the content of the object; change only what is needed to satisfy the schema.
+        Return only the corrected JSON object, no additional text."""
+
+REPAIR_USER_PROMPT = """Object:
+        {item}
+        
+        Problems: {problems}
+        
+        Return only the corrected JSON object, no additional text."""
+
+
+def _strip_code_fence(content: str) -> str:
+    """The body of a ```json fenced block, or the content unchanged"""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
+
+
+def _first_json_object(content: str) -> Optional[Dict[str, Any]]:
+    """The first JSON object in a model answer (prose and code fences around it are ignored)"""
+    content = _strip_code_fence(content)
+    decoder = json.JSONDecoder()
+    start = content.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(content, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = content.find("{", start + 1)
+    return None
+
+
+def _parse_items(content: str) -> Optional[List[Any]]:
+    """
+    Elements of the first JSON array in an answer (a bare array or one
+    wrapped in an object such as {"epics": [...]}); elements that do not
+    decode are returned as MalformedJSON. None when there is no array.
+    """
+    parser = JSONArrayStreamParser(keep_malformed=True)
+    items = parser.feed(content)
+    return items if items or parser.done else None
+
+
 class LLMService:
     """Unified LLM service abstraction layer"""
     
-    def __init__(self):
-        """Initialize LLM provider"""
-        self.default_provider_name = settings.LLM_PROVIDER
+    def __init__(self, backend: Optional[LLMProvider] = None):
+        """
+        Initialize LLM provider
+        
+        `backend` stands in for the configured provider of the same name
+        (a stub or replay provider); it is routed and circuit-broken
+        exactly like a registry provider.
+        """
+        self.backend = backend
+        self.default_provider_name = backend.provider_name if backend else settings.LLM_PROVIDER
         
         # Initialize default provider
         try:
@@ -32,11 +313,57 @@ class LLMService:
                 raise
     
     def _get_provider(self, provider_name: Optional[str] = None) -> LLMProvider:
-        """Get the appropriate LLM provider"""
-        provider_name = provider_name or self.default_provider_name
+        """
+        Get the appropriate LLM provider
         
-        if provider_name == "ollama":
-            return get_provider(
+        'auto' routes between LLM_ROUTING_PROVIDERS. A named provider is
+        always guarded by its circuit breaker, in a failover chain followed
+        by LLM_FAILOVER_CHAIN (when set), so a dead backend fails fast
+        instead of timing out on every call. With LLM_RECORD_PATH set, every
+        backend's answers are recorded.
+        """
+        provider_name = provider_name or self.default_provider_name
+        if provider_name == "auto":
+            backends = self._configured_backends(settings.LLM_ROUTING_PROVIDERS)
+            if not backends:
+                raise ValueError("No LLM provider in LLM_ROUTING_PROVIDERS is configured")
+            return RoutingProvider(backends)
+        
+        backend = self._recorded(self._get_backend(provider_name))
+        fallbacks = [
+            fallback for fallback in self._configured_backends(settings.LLM_FAILOVER_CHAIN)
+            if fallback.provider_name != provider_name
+        ]
+        return RoutingProvider([backend] + fallbacks, hedge=False, ordered=True)
+    
+    def _configured_backends(self, names: str) -> List[LLMProvider]:
+        """Providers from a comma-separated list, skipping ones without credentials"""
+        backends = []
+        for name in names.split(","):
+            name = name.strip()
+            if not name or name == "auto":
+                continue
+            try:
+                backends.append(self._recorded(self._get_backend(name)))
+            except ValueError as e:
+                logger.debug(f"Skipping LLM provider {name}: {e}")
+        return backends
+    
+    @staticmethod
+    def _recorded(backend: LLMProvider) -> LLMProvider:
+        """The backend, recording its answers to LLM_RECORD_PATH when set"""
+        if settings.LLM_RECORD_PATH and backend.provider_name != "replay":
+            return RecordingProvider(backend, settings.LLM_RECORD_PATH)
+        return backend
+    
+    def _get_backend(self, provider_name: str) -> LLMProvider:
+        """A single provider (shared, from the provider registry)"""
+        if self.backend and provider_name == self.backend.provider_name:
+            return self.backend
+        elif provider_name == "replay":
+            return get_replay_provider()
+        elif provider_name == "ollama":
+            return provider_registry.get(
                 "ollama",
                 ollama_base_url=settings.OLLAMA_BASE_URL,
                 ollama_model=settings.OLLAMA_MODEL
@@ -47,10 +374,11 @@ class LLMService:
                     "OPENAI_API_KEY is required for OpenAI provider. "
                     "Use Ollama (default) by setting LLM_PROVIDER=ollama"
                 )
-            return get_provider(
+            return provider_registry.get(
                 "openai",
                 openai_api_key=settings.OPENAI_API_KEY,
-                openai_model=settings.DEFAULT_MODEL
+                openai_model=settings.DEFAULT_MODEL,
+                openai_base_url=settings.OPENAI_BASE_URL
             )
         elif provider_name == "groq":
             if not settings.GROQ_API_KEY:
@@ -58,10 +386,11 @@ class LLMService:
                     "GROQ_API_KEY is required for Groq provider. "
                     "Get a free API key at https://console.groq.com/keys"
                 )
-            return get_provider(
+            return provider_registry.get(
                 "groq",
                 groq_api_key=settings.GROQ_API_KEY,
-                groq_model=settings.GROQ_MODEL
+                groq_model=settings.GROQ_MODEL,
+                groq_base_url=settings.GROQ_BASE_URL
             )
         elif provider_name == "anthropic":
             # Keep Anthropic support for backward compatibility
@@ -77,126 +406,425 @@ class LLMService:
         else:
             raise ValueError(
                 f"Unknown provider: {provider_name}. "
-                f"Supported providers: 'ollama', 'openai', 'groq'"
+                f"Supported providers: 'ollama', 'openai', 'groq', 'auto', 'replay'"
             )
     
+    def _model_name(self, provider_name: Optional[str] = None, stage: Optional[str] = None) -> str:
+        """Model a provider uses (for a stage), without constructing the provider"""
+        provider_name = provider_name or self.default_provider_name
+        if stage and stage_profile(provider_name, stage).get('model'):
+            return stage_profile(provider_name, stage)['model']
+        return {
+            "ollama": settings.OLLAMA_MODEL,
+            "openai": settings.DEFAULT_MODEL,
+            "groq": settings.GROQ_MODEL,
+        }.get(provider_name, "")
+    
+    def _input_budget(self, provider_name: Optional[str], stage: str) -> Optional[int]:
+        """Prompt token budget of a stage (max_input_tokens in its generation profile)"""
+        return stage_profile(provider_name or self.default_provider_name, stage).get('max_input_tokens')
+    
     async def _call_provider(
         self,
         messages: List[Dict[str, str]],
         provider: Optional[str] = None,
-        temperature: float = 0.7
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        stage: Optional[str] = None,
+        json_mode: bool = False,
+        refresh: bool = False,
+        retry: bool = False
     ) -> str:
-        """Call the LLM provider and return text"""
+        """
+        Call the LLM provider and return text
+        
+        `stage` selects the generation profile (model, temperature, max
+        tokens, timeout; see generation_profiles); an explicit temperature
+        overrides the profile's. `json_mode` asks the provider for a JSON
+        answer natively (when LLM_JSON_MODE is on).
+        
+        Responses are served from the shared response cache when an identical
+        request (provider, model, temperature, normalized messages) was seen
+        before. Pass use_cache=False, or wrap the caller in
+        `bypass_llm_cache()`, to always hit the provider; refresh=True skips
+        the lookup but still caches the new answer.
+        
+        Every call is recorded on the active usage meter; retry=True marks
+        a call that re-asks for earlier output (a re-ask or a repair).
+        """
         provider_instance = self._get_provider(provider) if provider else self.default_provider
+        options = self._call_options(stage, temperature, json_mode)
+        started = time.monotonic()
+        
+        cache, cache_key = self._response_cache(messages, provider, provider_instance, options, use_cache)
+        if cache is not None and not refresh:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                self._record_usage(provider_instance, options, started, cached.get('usage'), retries=int(retry), cached=True)
+                return cached['text']
         
         try:
-            result = await provider_instance.generate_text(
-                messages,
-                options={'temperature': temperature}
-            )
-            return result['text']
+            result = await provider_instance.generate_text(messages, options=options)
         except Exception as e:
             logger.error(f"LLM provider error: {e}")
+            self._record_usage(provider_instance, options, started, retries=int(retry), failed=True)
             raise
+        self._record_usage(
+            provider_instance, options, started, result.get('usage'),
+            served_by=result.get('provider'),
+            retries=result.get('retries', 0) + int(retry)
+        )
+        if cache is not None:
+            cache.set(cache_key, {'text': result['text'], 'usage': result.get('usage', {})})
+        return result['text']
     
-    async def extract_epics(self, spec_content: str, provider: Optional[str] = None) -> List[Dict[str, Any]]:
-        """
-        Extract epics from product specification
+    @staticmethod
+    def _record_usage(
+        provider_instance: LLMProvider,
+        options: Dict[str, Any],
+        started: float,
+        usage: Optional[Dict[str, int]] = None,
+        served_by: Optional[str] = None,
+        **outcome: Any
+    ):
+        """Record a call on the active usage meter; `served_by` is the "provider:model" a router picked"""
+        if served_by:
+            provider_name, model = served_by.split(":", 1)
+        else:
+            provider_name = provider_instance.provider_name
+            model = provider_instance.resolve_options(options).get('model', getattr(provider_instance, 'model', ''))
+        record_llm_call(
+            stage=options.get('stage'),
+            provider=provider_name,
+            model=model,
+            usage=usage,
+            latency=time.monotonic() - started,
+            **outcome
+        )
+    
+    @staticmethod
+    def _call_options(stage: Optional[str], temperature: Optional[float], json_mode: bool = False) -> Dict[str, Any]:
+        """Provider options for a call; the provider resolves the stage profile"""
+        options: Dict[str, Any] = {}
+        if stage:
+            options['stage'] = stage
+        if temperature is not None:
+            options['temperature'] = temperature
+        if json_mode and settings.LLM_JSON_MODE:
+            options['json_mode'] = True
+        return options
+    
+    def _response_cache(
+        self,
+        messages: List[Dict[str, str]],
+        provider: Optional[str],
+        provider_instance: LLMProvider,
+        options: Dict[str, Any],
+        use_cache: bool
+    ) -> Tuple[Optional[LLMResponseCache], Optional[str]]:
+        """Response cache and key for a request, or (None, None) when caching is off"""
+        cache = get_llm_cache() if use_cache and not is_llm_cache_bypassed() else None
+        if cache is None:
+            return None, None
+        resolved = provider_instance.resolve_options(options)
+        extra = {'json_mode': True} if resolved.get('json_mode') else {}
+        return cache, cache.make_key(
+            provider or self.default_provider_name,
+            resolved.get('model', getattr(provider_instance, 'model', '')),
+            resolved.get('temperature', 0.7),
+            messages,
+            **extra
+        )
+    
+    async def _stream_provider(
+        self,
+        messages: List[Dict[str, str]],
+        provider: Optional[str] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        stage: Optional[str] = None,
+        json_mode: bool = False
+    ) -> AsyncIterator[str]:
         """
-        system_prompt = """You are an expert product manager and agile coach. 
-        Your task is to analyze a product specification document and extract high-level epics.
+        Stream text from the LLM provider
         
-        An epic is a large body of work that can be broken down into smaller user stories.
-        Each epic should have:
-        - A clear, descriptive title
-        - A detailed description
-        - A priority level (low, medium, high, critical)
-        - An initial effort estimate in story points (1-100)
+        Shares the response cache with `_call_provider`: a cached response is
+        replayed as one chunk, and a completed stream is cached.
+        """
+        provider_instance = self._get_provider(provider) if provider else self.default_provider
+        options = self._call_options(stage, temperature, json_mode)
+        started = time.monotonic()
+        
+        cache, cache_key = self._response_cache(messages, provider, provider_instance, options, use_cache)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.info("LLM response served from cache")
+                self._record_usage(provider_instance, options, started, cached.get('usage'), cached=True)
+                yield cached['text']
+                return
+        
+        chunks = []
+        usage: Dict[str, int] = {}
+        try:
+            async for chunk in provider_instance.stream_text(messages, options=options, usage=usage):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"LLM provider error: {e}")
+            self._record_usage(provider_instance, options, started, usage, failed=True)
+            raise
         
-        Return your response as a JSON array of epics with the following structure:
-        [
-            {
-                "title": "Epic Title",
-                "description": "Detailed description of the epic",
-                "priority": "high",
-                "estimated_effort": 13
-            }
-        ]
+        # Latency of a stream runs until its last chunk
+        self._record_usage(provider_instance, options, started, usage)
+        if cache is not None:
+            cache.set(cache_key, {'text': "".join(chunks), 'usage': usage})
+    
+    @staticmethod
+    def _check_item(raw: Any, schema: Type[BaseModel]) -> Tuple[Optional[Dict[str, Any]], str, str]:
+        """Validated item, or None with the item's text and its problems for a repair prompt"""
+        if isinstance(raw, MalformedJSON):
+            return None, raw.text, f"invalid JSON: {raw.error}"
+        item, error = validate_item(raw, schema)
+        if item is None:
+            return None, json.dumps(raw), error
+        return item, "", ""
+    
+    async def _repair_item(
+        self,
+        text: str,
+        error: str,
+        schema: Type[BaseModel],
+        stage: str,
+        provider: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Re-ask for a single item that failed validation, with a short prompt
+        holding only the schema, the item and its problems (at most
+        LLM_REPAIR_ATTEMPTS calls). None when it still does not validate.
+        """
+        max_chars = settings.LLM_REPAIR_MAX_CHARS
+        for attempt in range(settings.LLM_REPAIR_ATTEMPTS):
+            messages = build_messages(
+                f"{REPAIR_SYSTEM_PROMPT}\nSchema:\n{compact_json(schema.model_json_schema())}",
+                REPAIR_USER_PROMPT,
+                item=text[:max_chars],
+                problems=error[:max_chars]
+            )
+            try:
+                # A cached answer would repeat a failed repair
+                content = await self._call_provider(messages, provider, stage=stage, json_mode=True, use_cache=attempt == 0, retry=True)
+            except Exception as e:
+                logger.warning(f"Repair call for a {stage} item failed: {e}")
+                return None
+            raw = _first_json_object(content)
+            if raw is None:
+                error = "the answer was not a JSON object"
+                continue
+            item, error = validate_item(raw, schema)
+            if item is not None:
+                return item
+            text = json.dumps(raw)
+        logger.warning(f"Dropping a {stage} item that failed validation: {error}")
+        return None
+    
+    async def _validated_items(
+        self,
+        raw_items: List[Any],
+        schema: Type[BaseModel],
+        stage: str,
+        provider: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Validate generated items, repairing only the invalid ones (concurrently); order is kept"""
+        checked = [self._check_item(raw, schema) for raw in raw_items]
+        items = [item for item, _, _ in checked]
+        failed = [i for i, item in enumerate(items) if item is None]
+        if failed:
+            repaired = await asyncio.gather(*(
+                self._repair_item(checked[i][1], checked[i][2], schema, stage, provider) for i in failed
+            ))
+            for i, item in zip(failed, repaired):
+                items[i] = item
+            logger.info(f"Repaired {sum(item is not None for item in repaired)}/{len(failed)} invalid {stage} items")
+        return [item for item in items if item is not None]
+    
+    async def _call_for_json(
+        self,
+        messages: List[Dict[str, str]],
+        parse,
+        stage: str,
+        provider: Optional[str] = None
+    ) -> Any:
+        """
+        Call the provider in JSON mode and parse the answer with `parse`;
+        an answer with no JSON in it is asked for once more
+        """
+        content = await self._call_provider(messages, provider, stage=stage, json_mode=True)
+        parsed = parse(content)
+        if parsed is None:
+            logger.warning(f"No JSON in the {stage} answer; asking again")
+            content = await self._call_provider(messages, provider, stage=stage, json_mode=True, refresh=True, retry=True)
+            parsed = parse(content)
+            if parsed is None:
+                raise ValueError(f"No JSON in the {stage} answer")
+        return parsed
+    
+    async def _generate_items(
+        self,
+        messages: List[Dict[str, str]],
+        schema: Type[BaseModel],
+        stage: str,
+        provider: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate a list of items and validate them against `schema`"""
+        raw_items = await self._call_for_json(messages, _parse_items, stage, provider)
+        return await self._validated_items(raw_items, schema, stage, provider)
+    
+    async def _validated_object(
+        self,
+        messages: List[Dict[str, str]],
+        schema: Type[BaseModel],
+        stage: str,
+        provider: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Generate a single JSON object and validate it, repairing it once if needed"""
+        raw = await self._call_for_json(messages, _first_json_object, stage, provider)
+        item, text, error = self._check_item(raw, schema)
+        if item is None:
+            item = await self._repair_item(text, error, schema, stage, provider)
+            if item is None:
+                raise ValueError(f"Invalid {stage} answer: {error}")
+        return item
+    
+    def _epic_messages(self, spec_content: str, part: Optional[Tuple[int, int]] = None) -> List[Dict[str, str]]:
+        """
+        Prompt for extracting epics from a product specification, or from
+        part (index, count) of one when the spec is split into chunks
+        """
+        if part is not None:
+            return build_messages(EPIC_SYSTEM_PROMPT, EPIC_PART_USER_PROMPT, spec_content=spec_content, part=part[0], parts=part[1])
+        return build_messages(EPIC_SYSTEM_PROMPT, EPIC_USER_PROMPT, spec_content=spec_content)
+    
+    def _epic_chunk_tokens(self, provider: Optional[str] = None) -> int:
+        """Largest spec (in tokens) extracted with a single call"""
+        context_window = MODEL_CONTEXT_WINDOWS.get(self._model_name(provider, "extract_epics"), DEFAULT_CONTEXT_WINDOW)
+        # Leave half of the window for the answer
+        fits = context_window // 2 - estimate_prompt_tokens(self._epic_messages("", part=(1, 1)))
+        if settings.EPIC_CHUNK_MAX_TOKENS > 0:
+            fits = min(fits, settings.EPIC_CHUNK_MAX_TOKENS)
+        budget = self._input_budget(provider, "extract_epics")
+        if budget:
+            fits = min(fits, budget - estimate_prompt_tokens(self._epic_messages("", part=(1, 1))))
+        return max(256, fits)
+    
+    async def _extract_epics_chunked(self, chunks: List[str], provider: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Map-reduce epic extraction for specs too large for one call
         
-        Be thorough but focused. Extract 3-10 epics depending on the scope of the specification."""
+        Map: every chunk is sent in parallel (EPIC_CHUNK_CONCURRENCY calls in
+        flight). Reduce: epics are yielded in chunk order as soon as all
+        earlier chunks are done, dropping those whose title matches an epic
+        already yielded (EPIC_MERGE_SIMILARITY). The reduce step is local and
+        costs no LLM call.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.EPIC_CHUNK_CONCURRENCY))
         
-        human_prompt = f"""Analyze the following product specification and extract epics:
+        async def extract(index: int, chunk: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._generate_items(
+                    self._epic_messages(chunk, part=(index + 1, len(chunks))), EpicDraft, "extract_epics", provider
+                )
         
-        {spec_content}
+        tasks = [asyncio.ensure_future(extract(i, chunk)) for i, chunk in enumerate(chunks)]
+        kept: List[Dict[str, Any]] = []
+        duplicates = 0
+        try:
+            for task in tasks:
+                for epic in await task:
+                    if is_duplicate_epic(epic, kept, settings.EPIC_MERGE_SIMILARITY):
+                        duplicates += 1
+                        continue
+                    kept.append(epic)
+                    yield epic
+            logger.info(f"Extracted {len(kept)} epics from {len(chunks)} spec chunks ({duplicates} duplicates merged)")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def extract_epics(self, spec_content: str, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Extract epics from product specification
         
-        Return only valid JSON array, no additional text."""
+        Specs longer than one call's budget are extracted chunk by chunk (see
+        `_extract_epics_chunked`).
+        """
+        spec_chunks = chunk_spec(spec_content, self._epic_chunk_tokens(provider), count_tokens)
+        if len(spec_chunks) > 1:
+            return [epic async for epic in self._extract_epics_chunked(spec_chunks, provider)]
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": human_prompt}
-        ]
+        messages = self._epic_messages(spec_content)
         
         try:
-            content = await self._call_provider(messages, provider)
-            
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            epics = json.loads(content)
+            epics = await self._generate_items(messages, EpicDraft, "extract_epics", provider)
             logger.info(f"Extracted {len(epics)} epics")
             return epics
         except Exception as e:
             logger.error(f"Error extracting epics: {e}")
             raise
     
+    async def stream_epics(self, spec_content: str, provider: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Extract epics from product specification, yielding each epic as soon
+        as the model has finished writing it (or, for large specs, as soon as
+        its chunk is done)
+        """
+        spec_chunks = chunk_spec(spec_content, self._epic_chunk_tokens(provider), count_tokens)
+        if len(spec_chunks) > 1:
+            async for epic in self._extract_epics_chunked(spec_chunks, provider):
+                yield epic
+            return
+        
+        messages = self._epic_messages(spec_content)
+        parser = JSONArrayStreamParser(keep_malformed=True)
+        invalid = []
+        count = 0
+        try:
+            async for chunk in self._stream_provider(messages, provider, stage="extract_epics", json_mode=True):
+                for raw in parser.feed(chunk):
+                    epic, _, _ = self._check_item(raw, EpicDraft)
+                    if epic is None:
+                        invalid.append(raw)
+                        continue
+                    count += 1
+                    yield epic
+            
+            if count == 0 and not invalid and not parser.done:
+                # No JSON array in the answer at all; ask again without streaming
+                invalid = await self._call_for_json(messages, _parse_items, "extract_epics", provider)
+            # Invalid epics are repaired once the stream is done, and come last
+            for epic in await self._validated_items(invalid, EpicDraft, "extract_epics", provider):
+                count += 1
+                yield epic
+            logger.info(f"Extracted {count} epics")
+        except Exception as e:
+            logger.error(f"Error extracting epics: {e}")
+            raise
+    
     async def generate_stories(self, epic_description: str, provider: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Generate user stories from an epic description
         """
-        system_prompt = """You are an expert agile coach. Your task is to break down an epic into user stories.
-        
-        Each user story should follow the format: "As a [user type], I want [goal] so that [benefit]"
-        Each story should have:
-        - A clear title
-        - A detailed description
-        - Acceptance criteria (3-5 bullet points)
-        - A priority level (low, medium, high, critical)
-        - An estimated effort in story points (1-13, using Fibonacci sequence)
-        
-        Return your response as a JSON array:
-        [
-            {
-                "title": "Story Title",
-                "description": "As a user, I want...",
-                "acceptance_criteria": "1. Criterion 1\\n2. Criterion 2",
-                "priority": "medium",
-                "estimated_effort": 5
-            }
-        ]"""
-        
-        human_prompt = f"""Break down the following epic into user stories:
-        
-        {epic_description}
-        
-        Return only valid JSON array, no additional text."""
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": human_prompt}
-        ]
+        messages = build_messages(
+            STORY_SYSTEM_PROMPT, STORY_USER_PROMPT,
+            budget=self._input_budget(provider, "generate_stories"),
+            epic_description=epic_description
+        )
         
         try:
-            content = await self._call_provider(messages, provider)
-            
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            stories = json.loads(content)
+            stories = await self._generate_items(messages, StoryDraft, "generate_stories", provider)
             logger.info(f"Generated {len(stories)} stories from epic")
             return stories
         except Exception as e:
@@ -207,99 +835,124 @@ class LLMService:
         """
         Generate tasks from a user story
         """
-        system_prompt = """You are an expert technical lead. Your task is to break down a user story into specific, actionable tasks.
-        
-        Each task should be:
-        - Specific and actionable (can be completed by one developer in 1-8 hours)
-        - Have a clear title
-        - Have a description explaining what needs to be done
-        - Have an estimated time in hours
-        - Have a priority level
-        
-        Tasks typically include: design, implementation, testing, documentation, code review, deployment.
+        messages = build_messages(
+            TASK_SYSTEM_PROMPT, TASK_USER_PROMPT,
+            budget=self._input_budget(provider, "generate_tasks"),
+            story_description=story_description,
+            acceptance_criteria=acceptance_criteria
+        )
         
-        Return your response as a JSON array:
-        [
-            {
-                "title": "Task Title",
-                "description": "Detailed task description",
-                "estimated_hours": 4,
-                "priority": "medium"
-            }
-        ]"""
-        
-        human_prompt = f"""Break down the following user story into tasks:
-        
-        Story: {story_description}
-        Acceptance Criteria: {acceptance_criteria}
+        try:
+            tasks = await self._generate_items(messages, TaskDraft, "generate_tasks", provider)
+            logger.info(f"Generated {len(tasks)} tasks from story")
+            return tasks
+        except Exception as e:
+            logger.error(f"Error generating tasks: {e}")
+            raise
+    
+    def plan_task_batches(self, stories: List[Dict[str, str]], provider: Optional[str] = None) -> List[List[int]]:
+        """
+        Group stories into batches for `generate_tasks_batch`
         
-        Return only valid JSON array, no additional text."""
+        Batches are packed greedily in input order so that the prompt fits in
+        the model's context window next to the output budget (and in the
+        stage's max_input_tokens), and the expected
+        output (TASK_BATCH_OUTPUT_TOKENS_PER_STORY per story) fits in
+        TASK_BATCH_MAX_OUTPUT_TOKENS. Returns lists of indexes into `stories`.
+        """
+        max_stories = max(1, settings.TASK_BATCH_MAX_STORIES)
+        context_window = MODEL_CONTEXT_WINDOWS.get(self._model_name(provider, "generate_tasks"), DEFAULT_CONTEXT_WINDOW)
+        output_budget = min(settings.TASK_BATCH_MAX_OUTPUT_TOKENS, context_window // 2)
+        input_budget = context_window - output_budget
+        if self._input_budget(provider, "generate_tasks"):
+            input_budget = min(input_budget, self._input_budget(provider, "generate_tasks"))
+        input_budget -= estimate_prompt_tokens(build_messages(TASK_BATCH_SYSTEM_PROMPT, TASK_BATCH_USER_PROMPT, story_blocks="", story_ids=""))
+        max_stories = max(1, min(max_stories, output_budget // max(1, settings.TASK_BATCH_OUTPUT_TOKENS_PER_STORY)))
+        
+        batches: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for index, story in enumerate(stories):
+            story_tokens = count_tokens(
+                f"{story.get('description', '')} {story.get('acceptance_criteria', '')}"
+            ) + 16  # identifier and labels
+            if current and (len(current) >= max_stories or used + story_tokens > input_budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += story_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def generate_tasks_batch(
+        self,
+        stories: List[Dict[str, str]],
+        provider: Optional[str] = None
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Generate tasks for several user stories in one call
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": human_prompt}
-        ]
+        Each story dict needs 'description' and optionally 'acceptance_criteria'.
+        Returns one entry per input story, in order; an entry is None when the
+        model left that story out of its answer (every entry is, when the
+        answer holds no JSON object), so callers can retry it alone.
+        """
+        story_ids = [f"S{i + 1}" for i in range(len(stories))]
+        story_blocks = "\n\n".join(
+            f"[{story_id}]\nStory: {story.get('description', '')}\n"
+            f"Acceptance Criteria: {story.get('acceptance_criteria', '')}"
+            for story_id, story in zip(story_ids, stories)
+        )
+        
+        messages = build_messages(
+            TASK_BATCH_SYSTEM_PROMPT, TASK_BATCH_USER_PROMPT,
+            budget=self._input_budget(provider, "generate_tasks"),
+            story_blocks=story_blocks,
+            story_ids=", ".join(story_ids)
+        )
         
         try:
-            content = await self._call_provider(messages, provider)
+            content = await self._call_provider(messages, provider, stage="generate_tasks", json_mode=True)
+            tasks_by_story = _first_json_object(content)
+            if tasks_by_story is None:
+                logger.warning("No JSON object in the batched task answer; stories will be retried individually")
+                return [None] * len(stories)
             
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            tasks = json.loads(content)
-            logger.info(f"Generated {len(tasks)} tasks from story")
-            return tasks
+            raw_results = [
+                tasks_by_story.get(story_id) if isinstance(tasks_by_story.get(story_id), list) else None
+                for story_id in story_ids
+            ]
+            # Tasks are validated (and repaired) per story, all stories at once
+            validated = await asyncio.gather(*(
+                self._validated_items(raw_tasks, TaskDraft, "generate_tasks", provider)
+                for raw_tasks in raw_results if raw_tasks is not None
+            ))
+            validated_iter = iter(validated)
+            results = [None if raw_tasks is None else next(validated_iter) for raw_tasks in raw_results]
+            logger.info(
+                f"Generated tasks for {sum(r is not None for r in results)}/{len(stories)} stories in one batch"
+            )
+            return results
         except Exception as e:
-            logger.error(f"Error generating tasks: {e}")
+            logger.error(f"Error generating batched tasks: {e}")
             raise
     
     async def estimate_timeline(self, project_summary: str, historical_context: Optional[str] = None, provider: Optional[str] = None) -> Dict[str, Any]:
         """
         Estimate project timeline based on effort and historical velocity
         """
-        system_prompt = """You are an expert project manager. Your task is to estimate project timelines.
-        
-        Based on the total effort (story points) and historical velocity data, estimate:
-        - Number of sprints needed
-        - Sprint duration (typically 2 weeks)
-        - Start and end dates
-        - Risk factors
-        
-        Return your response as JSON:
-        {
-            "estimated_sprints": 4,
-            "sprint_duration_weeks": 2,
-            "estimated_start_date": "2024-01-01",
-            "estimated_end_date": "2024-02-26",
-            "confidence_level": "high",
-            "risk_factors": ["Risk 1", "Risk 2"]
-        }"""
-        
         context = f"\nHistorical Context:\n{historical_context}" if historical_context else ""
         
-        human_prompt = f"""Estimate the timeline for this project:
-        
-        {project_summary}
-        {context}
-        
-        Return only valid JSON, no additional text."""
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": human_prompt}
-        ]
+        messages = build_messages(
+            TIMELINE_SYSTEM_PROMPT, TIMELINE_USER_PROMPT,
+            budget=self._input_budget(provider, "estimate_timeline"),
+            project_summary=project_summary,
+            context=context
+        )
         
         try:
-            content = await self._call_provider(messages, provider)
-            
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            timeline = json.loads(content)
+            timeline = await self._validated_object(messages, TimelineEstimate, "estimate_timeline", provider)
             logger.info("Generated timeline estimate")
             return timeline
         except Exception as e:
@@ -310,41 +963,15 @@ class LLMService:
         """
         Groom backlog - prioritize and refine items
         """
-        system_prompt = """You are an expert product owner. Your task is to groom a product backlog.
-        
-        Analyze the backlog items and:
-        - Suggest priority adjustments
-        - Identify dependencies
-        - Suggest effort estimate refinements
-        - Identify potential risks or blockers
-        
-        Return your response as JSON:
-        {
-            "prioritized_items": [...],
-            "dependencies": [...],
-            "recommendations": "..."
-        }"""
-        
-        human_prompt = f"""Groom the following backlog:
-        
-        {json.dumps(backlog_items, indent=2)}
-        
-        Return only valid JSON, no additional text."""
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": human_prompt}
-        ]
+        # Serialized as compact JSON; over budget, trailing items are left out
+        messages = build_messages(
+            GROOM_SYSTEM_PROMPT, GROOM_USER_PROMPT,
+            budget=self._input_budget(provider, "groom_backlog"),
+            backlog_items=list(backlog_items)
+        )
         
         try:
-            content = await self._call_provider(messages, provider)
-            
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            groomed = json.loads(content)
+            groomed = await self._validated_object(messages, GroomedBacklog, "groom_backlog", provider)
             logger.info("Backlog grooming completed")
             return groomed
         except Exception as e:
@@ -0,0 +1,234 @@
+"""
+Local vector store: sprint embeddings kept in SprintHistory and searched
+in-process with VectorIndex, without Pinecone
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import func
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.sprint_history import SprintHistory
+from app.services.embedder import Embedder, create_embedder
+from app.services.vector_index import VectorIndex
+from app.services.vector_store import SprintVectorStore
+import asyncio
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LocalVectorService(SprintVectorStore):
+    """
+    Sprint vector store backed by the database and a local VectorIndex.
+    
+    SprintHistory rows (with their embedding) are the source of truth; the
+    index is a float32 matrix built from them and saved at VECTOR_INDEX_PATH
+    as a memory-mapped file. On first use the saved index is loaded if it was
+    built from the current rows, otherwise it is rebuilt from the database.
+    New embeddings are written to both; `revalidate` (called periodically by
+    the service container) and `close` save the index when it has changed.
+    Database and index work runs in a worker thread, off the event loop.
+    
+    The index has the embedder's dimension and only holds history embedded
+    by the same embedder (`Embedder.key`), so switching EMBEDDER rebuilds it
+    from the matching rows instead of mixing vector spaces.
+    """
+    
+    def __init__(self, embeddings: Optional[Embedder] = None, path: Optional[str] = None, session_factory=None):
+        self.embeddings = embeddings or create_embedder()
+        self.path = settings.VECTOR_INDEX_PATH if path is None else path
+        self.session_factory = session_factory or SessionLocal
+        self._index: Optional[VectorIndex] = None
+        self._lock = threading.Lock()  # revalidate runs in a worker thread
+    
+    def _source(self, db) -> List[int]:
+        """What the index is built from: (count, max id) of SprintHistory rows with an embedding"""
+        count, max_id = db.query(func.count(SprintHistory.id), func.max(SprintHistory.id)).filter(
+            SprintHistory.embedding.isnot(None)
+        ).one()
+        return [count, max_id or 0]
+    
+    def _build(self, db) -> VectorIndex:
+        """Index of the SprintHistory embeddings made by this embedder"""
+        index = VectorIndex(self.embeddings.dimension)
+        rows = []
+        skipped = 0
+        for history in db.query(SprintHistory).filter(SprintHistory.embedding.isnot(None)).order_by(SprintHistory.id):
+            metadata = json.loads(history.metadata_json) if history.metadata_json else {}
+            vector = json.loads(history.embedding)
+            # Rows without an embedder key predate it; keep them when the dimension fits
+            if metadata.get("embedder", self.embeddings.key) != self.embeddings.key or len(vector) != index.dimension:
+                skipped += 1
+                continue
+            metadata["history_id"] = history.id
+            rows.append((self._row_id(history.id, metadata), history.project_id, vector, history.velocity, metadata))
+        if skipped:
+            logger.warning(f"Skipped {skipped} sprint history embeddings not made by {self.embeddings.key}")
+        index.add_many(rows)
+        return index
+    
+    @staticmethod
+    def _row_id(history_id: int, metadata: Dict[str, Any]) -> int:
+        # One row per sprint, so re-storing a sprint replaces it
+        return metadata.get("sprint_id") or -history_id
+    
+    def _load(self) -> Optional[VectorIndex]:
+        """The saved index if it matches the database, else one rebuilt from it"""
+        db = self.session_factory()
+        try:
+            source = self._source(db)
+            if self.path and os.path.exists(self.path):
+                try:
+                    index = VectorIndex.load(self.path)
+                    if index.info.get("source") == source and index.info.get("embedder") == self.embeddings.key:
+                        logger.info(f"Loaded vector index with {len(index)} sprints from {self.path}")
+                        return index
+                except Exception as e:
+                    logger.warning(f"Could not load vector index {self.path}: {e}")
+            if not source[0]:
+                return None
+            index = self._build(db)
+            index.info.update(source=source, embedder=self.embeddings.key)
+            logger.info(f"Built vector index with {len(index)} sprints from the database")
+            return index
+        finally:
+            db.close()
+    
+    def get_index(self) -> Optional[VectorIndex]:
+        """The index, loaded on first use (None while there is no history)"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load()
+        return self._index
+    
+    def _save(self):
+        if self._index is not None and self._index.dirty and self.path:
+            self._index.save(self.path)
+            logger.info(f"Saved vector index with {len(self._index)} sprints to {self.path}")
+    
+    def revalidate(self):
+        """Save pending changes, or reload when other processes added history"""
+        with self._lock:
+            if self._index is not None and self._index.dirty:
+                self._save()
+                return
+            db = self.session_factory()
+            try:
+                source = self._source(db)
+            finally:
+                db.close()
+            if self._index is None or self._index.info.get("source") != source:
+                self._index = None
+        self.get_index()
+    
+    def close(self):
+        """Save pending changes"""
+        with self._lock:
+            self._save()
+    
+    def _store(self, sprint_id: int, project_id: int, embedding: List[float], velocity: float,
+               vector_metadata: Dict[str, Any]) -> Tuple[int, List[int]]:
+        """Write the SprintHistory row for a sprint; returns its id and the new source"""
+        db = self.session_factory()
+        try:
+            history = None
+            stored = self._index.get(sprint_id) if self._index is not None else None
+            if stored and stored.get("history_id"):
+                history = db.get(SprintHistory, stored["history_id"])
+            if history is None:
+                history = SprintHistory(project_id=project_id)
+                db.add(history)
+            history.project_id = project_id
+            history.sprint_name = vector_metadata["sprint_name"]
+            history.velocity = velocity
+            history.embedding = json.dumps(embedding)
+            history.metadata_json = json.dumps(vector_metadata)
+            db.commit()
+            return history.id, self._source(db)
+        finally:
+            db.close()
+    
+    def _add(self, sprint_id: int, project_id: int, embedding: List[float], velocity: float,
+             vector_metadata: Dict[str, Any]):
+        """Store a sprint in SprintHistory and the index (blocking)"""
+        self.get_index()
+        with self._lock:
+            history_id, source = self._store(sprint_id, project_id, embedding, velocity, vector_metadata)
+            vector_metadata["history_id"] = history_id
+            if self._index is None:
+                self._index = VectorIndex(self.embeddings.dimension)
+                self._index.info["embedder"] = self.embeddings.key
+            self._index.add(sprint_id, project_id, embedding, velocity, vector_metadata)
+            self._index.info["source"] = source
+    
+    def _query(self, index: VectorIndex, embedding: List[float], top_k: int, project_id: Optional[int]):
+        # Not while another thread is adding to the index
+        with self._lock:
+            return index.query(embedding, top_k=top_k, project_id=project_id)
+    
+    async def store_sprint_embedding(
+        self,
+        sprint_id: int,
+        project_id: int,
+        sprint_data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Store sprint data as an embedding in SprintHistory and the local index
+        """
+        try:
+            sprint_text = self._sprint_to_text(sprint_data)
+            embedding = await self.embeddings.aembed_query(sprint_text)
+            
+            velocity = sprint_data.get("velocity", 0) or 0
+            vector_metadata = {
+                "sprint_id": sprint_id,
+                "project_id": project_id,
+                "velocity": velocity,
+                "sprint_name": sprint_data.get("name", ""),
+                **(metadata or {}),
+                "embedder": self.embeddings.key
+            }
+            
+            await asyncio.to_thread(self._add, sprint_id, project_id, embedding, velocity, vector_metadata)
+            
+            logger.info(f"Stored embedding for sprint {sprint_id}")
+        except Exception as e:
+            logger.error(f"Error storing sprint embedding: {e}")
+            raise
+    
+    async def find_similar_sprints(
+        self,
+        query_text: str,
+        project_id: Optional[int] = None,
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Find similar historical sprints using the local index
+        """
+        try:
+            index = await asyncio.to_thread(self.get_index)
+            if index is None:
+                return []
+            
+            query_embedding = await self.embeddings.aembed_query(query_text)
+            matches = await asyncio.to_thread(self._query, index, query_embedding, top_k, project_id or None)
+            
+            similar_sprints = [
+                {
+                    "sprint_id": match["metadata"].get("sprint_id"),
+                    "velocity": match["velocity"],
+                    "similarity": match["score"],
+                    "metadata": match["metadata"]
+                }
+                for match in matches
+            ]
+            
+            logger.info(f"Found {len(similar_sprints)} similar sprints")
+            return similar_sprints
+        except Exception as e:
+            logger.error(f"Error finding similar sprints: {e}")
+            return []
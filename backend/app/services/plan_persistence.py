@@ -0,0 +1,101 @@
+"""
+Bulk persistence for generated epics, stories and tasks
+"""
+from typing import List, Dict, Any, Iterable, Type
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.models.project import Epic, Story, Task
+
+
+def insert_rows(db: Session, model: Type[Any], rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert rows with INSERT ... RETURNING id and return the new ids in input
+    order. Nothing is added to the session's identity map.
+    """
+    if not rows:
+        return []
+    # SQLAlchemy keeps multi-row batches where it can tie returned ids to
+    # their parameters (e.g. Postgres) and inserts row by row otherwise (SQLite)
+    result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return [row[0] for row in result]
+
+
+def _plain(value: Any) -> Any:
+    """Enum members as their values, so records serialize like API payloads"""
+    return getattr(value, "value", value)
+
+
+def _epic_row(project_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project_id": project_id,
+        "title": data["title"],
+        "description": data.get("description", ""),
+        "priority": data.get("priority", "medium"),
+        "estimated_effort": data.get("estimated_effort", 0)
+    }
+
+
+def _story_row(epic_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "epic_id": epic_id,
+        "title": data["title"],
+        "description": data.get("description", ""),
+        "acceptance_criteria": data.get("acceptance_criteria", ""),
+        "priority": data.get("priority", "medium"),
+        "estimated_effort": data.get("estimated_effort", 0)
+    }
+
+
+def _task_row(story_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "story_id": story_id,
+        "title": data["title"],
+        "description": data.get("description", ""),
+        "estimated_hours": data.get("estimated_hours", 0),
+        "priority": data.get("priority", "medium")
+    }
+
+
+def _with_ids(rows: List[Dict[str, Any]], ids: List[int]) -> List[Dict[str, Any]]:
+    return [{"id": row_id, **{key: _plain(value) for key, value in row.items()}} for row_id, row in zip(ids, rows)]
+
+
+def insert_epics(db: Session, project_id: int, epics_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert epics and return them as records (dicts with 'id')"""
+    rows = [_epic_row(project_id, data) for data in epics_data]
+    return _with_ids(rows, insert_rows(db, Epic, rows))
+
+
+def insert_stories(db: Session, epic_id: int, stories_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert one epic's stories in one batch"""
+    rows = [_story_row(epic_id, data) for data in stories_data]
+    return _with_ids(rows, insert_rows(db, Story, rows))
+
+
+def insert_tasks(db: Session, tasks_by_story: List[tuple]) -> List[List[Dict[str, Any]]]:
+    """
+    Insert the tasks of several stories in one batch.
+    `tasks_by_story` holds (story_id, tasks_data) pairs; returns the task
+    records grouped the same way.
+    """
+    rows = [_task_row(story_id, data) for story_id, tasks_data in tasks_by_story for data in tasks_data]
+    records = _with_ids(rows, insert_rows(db, Task, rows))
+    grouped = []
+    offset = 0
+    for _, tasks_data in tasks_by_story:
+        grouped.append(records[offset:offset + len(tasks_data)])
+        offset += len(tasks_data)
+    return grouped
+
+
+def load_rows(db: Session, model: Type[Any], ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """Rows as records in the order of `ids`; missing rows are left out"""
+    ids = list(ids)
+    if not ids:
+        return []
+    table = model.__table__
+    found = {
+        row["id"]: {key: _plain(value) for key, value in row.items()}
+        for row in db.execute(select(table).where(table.c.id.in_(ids))).mappings()
+    }
+    return [found[row_id] for row_id in ids if row_id in found]
@@ -0,0 +1,77 @@
+"""
+Prompt building: compact templates and payloads, stable prefixes and per-stage input budgets
+"""
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.services.llm_provider import count_tokens, estimate_prompt_tokens, truncate_to_tokens
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def minify_prompt(template: str) -> str:
+    """Template without indentation, trailing whitespace and blank lines"""
+    lines = (line.strip() for line in template.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def compact_json(value: Any) -> str:
+    """JSON for a prompt, without indentation or spaces after separators"""
+    if not settings.LLM_PROMPT_COMPACT:
+        return json.dumps(value, indent=2)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _fit_field(value: Any, max_tokens: int) -> str:
+    """A field cut down to `max_tokens`: text is truncated, a list keeps its leading items"""
+    if isinstance(value, list):
+        items = list(value)
+        while items and count_tokens(compact_json(items)) > max_tokens:
+            items.pop()
+        return compact_json(items)
+    return truncate_to_tokens(value, max_tokens)
+
+
+def build_messages(
+    system_prompt: str,
+    user_template: str,
+    budget: Optional[int] = None,
+    **fields: Any
+) -> List[Dict[str, str]]:
+    """
+    Chat messages for one call
+    
+    The system prompt is static and comes first, followed by the static
+    start of the user template, so every call of a stage begins with the
+    same bytes and Ollama's KV cache and provider-side prompt caching can
+    reuse that prefix. `fields` fill the template's placeholders; lists are
+    serialized as compact JSON. Templates are minified unless
+    LLM_PROMPT_COMPACT is off.
+    
+    With a `budget` (input tokens), the largest field is cut down so the
+    prompt fits: text is truncated, a list drops its trailing items.
+    """
+    if settings.LLM_PROMPT_COMPACT:
+        system_prompt = minify_prompt(system_prompt)
+        user_template = minify_prompt(user_template)
+    rendered = {
+        key: compact_json(value) if isinstance(value, list) else str(value)
+        for key, value in fields.items()
+    }
+    
+    def messages(values: Dict[str, str]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_template.format(**values)}
+        ]
+    
+    if budget and rendered and estimate_prompt_tokens(messages(rendered)) > budget:
+        largest = max(rendered, key=lambda key: len(rendered[key]))
+        room = budget - estimate_prompt_tokens(messages({**rendered, largest: ""}))
+        logger.warning(f"Prompt over its {budget}-token budget; cutting '{largest}' to {max(0, room)} tokens")
+        value = fields[largest] if isinstance(fields[largest], list) else rendered[largest]
+        rendered[largest] = _fit_field(value, room)
+    return messages(rendered)
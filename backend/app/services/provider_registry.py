@@ -0,0 +1,84 @@
+"""
+Process-wide registry of LLM providers and their pooled HTTP clients
+"""
+from typing import Dict, Any, Optional, Tuple
+from app.services.llm_provider import LLMProvider, create_http_client, get_provider
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRegistry:
+    """
+    Hands out long-lived LLM providers so requests reuse open connections
+    instead of building a provider (and an HTTP client) per call.
+    
+    Providers are cached per configuration (provider, model, credentials).
+    All providers for the same endpoint and credentials share one pooled
+    `httpx.AsyncClient`, e.g. different models of one Groq account. Other
+    API consumers such as embedders get pooled clients from `get_client`.
+    The registry owns those clients; `aclose()` closes them on shutdown.
+    """
+    
+    def __init__(self):
+        self._providers: Dict[Tuple, LLMProvider] = {}
+        self._clients: Dict[Tuple, httpx.AsyncClient] = {}
+    
+    @staticmethod
+    def _client_key(provider_name: str, config: Dict[str, Any]) -> Tuple:
+        """Providers with the same endpoint and credentials can share a client"""
+        return (
+            provider_name,
+            config.get(f"{provider_name}_base_url", ""),
+            config.get(f"{provider_name}_api_key", "")
+        )
+    
+    def get(self, provider_name: str, **config) -> LLMProvider:
+        """
+        Cached provider for this configuration (`get_provider` keyword
+        arguments), created on first use
+        """
+        key = (provider_name, tuple(sorted(config.items())))
+        provider = self._providers.get(key)
+        if provider is None:
+            client_key = self._client_key(provider_name, config)
+            provider = get_provider(provider_name, client=self._clients.get(client_key), **config)
+            if client_key not in self._clients:
+                self._clients[client_key] = provider.client
+                logger.info(f"Opened pooled HTTP client for LLM provider {provider_name}")
+            # The registry closes the client, not the provider
+            provider.owns_client = False
+            self._providers[key] = provider
+        return provider
+    
+    def get_client(
+        self,
+        name: str,
+        base_url: str = "",
+        api_key: str = "",
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.AsyncClient:
+        """Pooled client for `name` at this endpoint and credentials, created on first use"""
+        key = (name, base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = create_http_client(base_url=base_url, headers=headers)
+            logger.info(f"Opened pooled HTTP client for {name}")
+        return client
+    
+    async def aclose(self):
+        """Close every pooled client; providers are rebuilt on next use"""
+        clients = list(self._clients.values())
+        self._providers.clear()
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client: {e}")
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled HTTP clients")
+
+
+provider_registry = ProviderRegistry()
@@ -0,0 +1,347 @@
+"""
+Record/replay LLM providers: capture real provider answers to a JSONL fixture
+file and serve them back offline, with simulated latency and rate limiting
+"""
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Union
+from app.core.config import settings
+from app.services.llm_provider import LLMProvider
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Answers a request no fixture matches: (messages, options) -> text
+Responder = Callable[[List[Dict[str, str]], Dict[str, Any]], str]
+
+STREAM_CHUNK_CHARS = 64
+HEADING = re.compile(r"^\s*(?:\d+\.|#+)\s+(.+?)\s*$", re.MULTILINE)
+STORY_ID = re.compile(r"^\[(S\d+)\]", re.MULTILINE)
+
+
+def fixture_key(messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Stable key of a request: stage, JSON mode and messages. Provider and
+    model are left out so fixtures recorded on one backend replay on any.
+    """
+    options = options or {}
+    payload = {
+        "stage": options.get("stage"),
+        "json_mode": bool(options.get("json_mode")),
+        "messages": [{"role": msg.get("role", "user"), "content": msg.get("content", "")} for msg in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _system_prompt(messages: List[Dict[str, str]]) -> str:
+    for msg in messages:
+        if msg.get("role") == "system":
+            return msg.get("content", "")
+    return ""
+
+
+def _prompt_hash(messages: List[Dict[str, str]]) -> str:
+    """Hash of the system prompt: calls of one kind (e.g. batched tasks) share it"""
+    return hashlib.sha256(_system_prompt(messages).encode("utf-8")).hexdigest()[:16]
+
+
+def load_fixtures(path: str) -> List[Dict[str, Any]]:
+    """Records of a JSONL fixture file, skipping blank and unreadable lines"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping unreadable fixture line {path}:{number}: {e}")
+    return records
+
+
+def synthetic_responder(stories: int = 3, tasks: int = 4) -> Responder:
+    """
+    Answers every stage with valid JSON shaped by the request, for offline
+    benchmarks: one epic per heading of the spec ("1. Title" or "## Title"),
+    `stories` stories per epic and `tasks` tasks per story (batched or not)
+    """
+    def task(n):
+        return {"title": f"Task {n}", "description": "Implement, test and document it", "estimated_hours": 3, "priority": "medium"}
+    
+    def respond(messages: List[Dict[str, str]], options: Dict[str, Any]) -> str:
+        stage = options.get("stage")
+        content = messages[-1].get("content", "") if messages else ""
+        if stage == "extract_epics":
+            titles = HEADING.findall(content) or ["Core platform"]
+            answer = {"epics": [
+                {"title": title, "description": f"Everything needed for {title}", "priority": "high", "estimated_effort": 21}
+                for title in titles
+            ]}
+        elif stage == "generate_stories":
+            answer = {"stories": [
+                {"title": f"Story {i + 1}", "description": "As a user, I want this so that I can work faster",
+                 "acceptance_criteria": "1. It works\n2. It is logged", "priority": "medium", "estimated_effort": 5}
+                for i in range(stories)
+            ]}
+        elif stage == "generate_tasks":
+            story_ids = STORY_ID.findall(content)
+            if story_ids:
+                answer = {story_id: [task(i) for i in range(tasks)] for story_id in story_ids}
+            else:
+                answer = {"tasks": [task(i) for i in range(tasks)]}
+        elif stage == "estimate_timeline":
+            answer = {"estimated_sprints": 4, "sprint_duration_weeks": 2, "confidence_level": "medium", "risk_factors": []}
+        else:
+            answer = {"prioritized_items": [], "dependencies": [], "recommendations": ""}
+        return json.dumps(answer)
+    
+    return respond
+
+
+class LatencyModel:
+    """
+    Simulated call latency, from a spec string:
+    
+        recorded[:scale]          the latency captured with the answer, times scale
+        fixed:seconds
+        uniform:low,high
+        lognormal:median,sigma
+    """
+    
+    KINDS = ("recorded", "fixed", "uniform", "lognormal")
+    
+    def __init__(self, spec: str = "recorded"):
+        kind, _, params = (spec or "recorded").partition(":")
+        kind = kind.strip().lower()
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency model '{kind}'. Supported: {', '.join(self.KINDS)}")
+        try:
+            values = [float(value) for value in params.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency parameters: {spec}")
+        required = {"recorded": 0, "fixed": 1, "uniform": 2, "lognormal": 2}[kind]
+        if len(values) < required:
+            raise ValueError(f"Latency model '{kind}' needs {required} parameter(s): {spec}")
+        self.kind = kind
+        self.values = values
+    
+    def sample(self, rng: random.Random, recorded: float = 0.0) -> float:
+        """Seconds to wait for one call"""
+        if self.kind == "recorded":
+            return max(0.0, recorded) * (self.values[0] if self.values else 1.0)
+        if self.kind == "fixed":
+            return max(0.0, self.values[0])
+        if self.kind == "uniform":
+            return rng.uniform(self.values[0], self.values[1])
+        median, sigma = self.values[0], self.values[1]
+        return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+class RecordingProvider(LLMProvider):
+    """
+    Wraps a real provider and appends every answer it gives (with usage and
+    latency) to a JSONL fixture file for ReplayProvider.
+    
+    Takes the wrapped provider's name and model, so stage profiles, rate
+    limits and usage metering see the real backend.
+    """
+    
+    def __init__(self, provider: LLMProvider, path: str):
+        self.provider = provider
+        self.path = path
+        self.provider_name = provider.provider_name
+        self.model = getattr(provider, "model", "")
+        self.client = provider.client
+        self.owns_client = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def _append(self, messages: List[Dict[str, str]], options: Dict[str, Any], result: Dict[str, Any], latency: float):
+        record = {
+            "key": fixture_key(messages, options),
+            "stage": options.get("stage"),
+            "prompt": _prompt_hash(messages),
+            "provider": result.get("provider") or f"{self.provider_name}:{self.resolve_options(options).get('model', self.model)}",
+            "messages": messages,
+            "text": result["text"],
+            "usage": result.get("usage", {}),
+            "latency": round(latency, 4),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    async def generate_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        options = options or {}
+        started = time.monotonic()
+        result = await self.provider.generate_text(messages, options)
+        self._append(messages, options, result, time.monotonic() - started)
+        return result
+    
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        options = options or {}
+        started = time.monotonic()
+        stream_usage: Dict[str, int] = {}
+        chunks = []
+        async for chunk in self.provider.stream_text(messages, options, stream_usage):
+            chunks.append(chunk)
+            yield chunk
+        if usage is not None:
+            usage.update(stream_usage)
+        self._append(messages, options, {"text": "".join(chunks), "usage": stream_usage}, time.monotonic() - started)
+
+
+class ReplayProvider(LLMProvider):
+    """
+    Serves recorded answers instead of calling a model.
+    
+    A request is matched by its exact fixture key; failing that, by a record
+    of the same stage and system prompt, then of the same stage (picked by
+    the key, so a run is deterministic). Requests nothing matches go to
+    `responder` if one is given, else raise ValueError.
+    
+    Each call waits for a latency drawn from `latency` (see LatencyModel).
+    With `rate_limit_rate`, calls are rejected with a simulated 429 at that
+    rate and retried after `retry_after` seconds, like GroqProvider, up to
+    `max_retries` attempts. Random draws are seeded per request, so the
+    same run sees the same latencies and 429s at any concurrency.
+    """
+    
+    provider_name = "replay"
+    
+    def __init__(
+        self,
+        fixtures: Union[str, List[Dict[str, Any]], None] = None,
+        latency: Union[str, LatencyModel] = "recorded",
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        max_retries: int = 3,
+        seed: int = 0,
+        responder: Optional[Responder] = None,
+        model: str = "replay"
+    ):
+        records = load_fixtures(fixtures) if isinstance(fixtures, str) else list(fixtures or [])
+        self.model = model
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.max_retries = max(1, max_retries)
+        self.seed = seed
+        self.responder = responder
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._by_prompt: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._by_stage: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for record in records:
+            self._by_key.setdefault(record.get("key"), record)
+            self._by_prompt.setdefault((record.get("stage"), record.get("prompt")), []).append(record)
+            self._by_stage.setdefault(record.get("stage"), []).append(record)
+        self._seen: Dict[str, int] = {}
+        self.calls = 0
+        self.rate_limited = 0
+    
+    def _match(self, key: str, messages: List[Dict[str, str]], stage: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key in self._by_key:
+            return self._by_key[key]
+        candidates = self._by_prompt.get((stage, _prompt_hash(messages))) or self._by_stage.get(stage)
+        if candidates:
+            return candidates[int(key, 16) % len(candidates)]
+        return None
+    
+    def _rng(self, key: str) -> random.Random:
+        """Random source for one call: seed, request and how often it was seen before"""
+        occurrence = self._seen.get(key, 0)
+        self._seen[key] = occurrence + 1
+        return random.Random(f"{self.seed}:{key}:{occurrence}")
+    
+    async def generate_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        options = self.resolve_options(options)
+        key = fixture_key(messages, options)
+        rng = self._rng(key)
+        self.calls += 1
+        
+        for attempt in range(self.max_retries):
+            if self.rate_limit_rate and rng.random() < self.rate_limit_rate:
+                self.rate_limited += 1
+                if attempt < self.max_retries - 1:
+                    logger.info(f"Replay rate limit hit. Waiting {self.retry_after} seconds before retry...")
+                    await asyncio.sleep(self.retry_after)
+                    continue
+                # Chained like a provider's 429, so circuit breakers see a rate limit
+                request = httpx.Request("POST", "replay://chat/completions")
+                response = httpx.Response(429, headers={"retry-after": str(self.retry_after)}, request=request)
+                raise ValueError(
+                    f"Replay rate limit exceeded (simulated 429). "
+                    f"Rate limit resets in {self.retry_after} seconds."
+                ) from httpx.HTTPStatusError("Too Many Requests", request=request, response=response)
+            break
+        
+        record = self._match(key, messages, options.get("stage"))
+        if record is not None:
+            text, usage, recorded = record["text"], record.get("usage", {}), record.get("latency", 0.0)
+        elif self.responder is not None:
+            text, usage, recorded = self.responder(messages, options), {}, 0.0
+        else:
+            raise ValueError(f"No recorded response for stage '{options.get('stage')}' (key {key[:12]})")
+        
+        delay = self.latency.sample(rng, recorded)
+        if delay:
+            await asyncio.sleep(delay)
+        return {
+            'text': text,
+            'usage': usage,
+            'retries': attempt
+        }
+    
+    async def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Replay an answer in small chunks, as a streaming provider would"""
+        result = await self.generate_text(messages, options)
+        if usage is not None:
+            usage.update(result.get('usage', {}))
+        text = result['text']
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            yield text[start:start + STREAM_CHUNK_CHARS]
+
+
+_replay_provider: Optional[ReplayProvider] = None
+
+
+def get_replay_provider() -> ReplayProvider:
+    """Process-wide replay provider for LLM_PROVIDER=replay, built from settings"""
+    global _replay_provider
+    if _replay_provider is None:
+        if not settings.LLM_REPLAY_PATH:
+            raise ValueError("LLM_REPLAY_PATH is required for the replay provider")
+        _replay_provider = ReplayProvider(
+            settings.LLM_REPLAY_PATH,
+            latency=settings.LLM_REPLAY_LATENCY,
+            rate_limit_rate=settings.LLM_REPLAY_RATE_LIMIT_RATE,
+            retry_after=settings.LLM_REPLAY_RETRY_AFTER_SECONDS,
+            seed=settings.LLM_REPLAY_SEED
+        )
+    return _replay_provider
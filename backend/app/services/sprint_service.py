@@ -1,26 +1,43 @@
 """
 Sprint service - orchestrates LLM pipelines for sprint planning
 """
-from typing import List, Dict, Any, Optional
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from sqlalchemy.orm import Session
 from app.models.project import Project, Epic, Story, Task, Sprint
+from app.models.spec_section import SpecSection
 from app.services.llm_service import LLMService
-from app.services.pinecone_service import PineconeService
+from app.services.vector_store import create_vector_store
+from app.services.llm_cache import bypass_llm_cache
+from app.services.usage_meter import UsageMeter, metered, persist_usage
+from app.services.checkpoint_service import CheckpointStore, spec_hash
+from app.services.plan_persistence import insert_epics, insert_stories, insert_tasks, load_rows
+from app.utils.concurrency import gather_or_cancel
+from app.utils.timing import StageTimer
+from app.utils.spec_segmenter import segment_spec, diff_sections, match_sections
+from app.core.config import settings
 import logging
 import json
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Receives (event, data) as the pipeline makes progress
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
 class SprintService:
     """Service for sprint planning orchestration"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None, with_vector_store: bool = True):
+        self.llm_service = llm_service or LLMService()
+        # Sprint vector store (VECTOR_STORE); keeps its historical attribute name
+        if not with_vector_store:
+            self.pinecone_service = None
+            return
         try:
-            self.pinecone_service = PineconeService()
+            self.pinecone_service = create_vector_store()
         except Exception as e:
-            logger.warning(f"Pinecone service initialization failed: {e}. Velocity prediction will be disabled.")
+            logger.warning(f"Vector store initialization failed: {e}. Velocity prediction will be disabled.")
             self.pinecone_service = None
     
     async def process_spec_to_sprint_plan(
@@ -28,132 +45,207 @@ class SprintService:
         db: Session,
         project_id: int,
         spec_content: str,
-        llm_provider: Optional[str] = None
+        llm_provider: Optional[str] = None,
+        story_concurrency: Optional[int] = None,
+        task_concurrency: Optional[int] = None,
+        use_cache: bool = True,
+        on_event: Optional[ProgressCallback] = None,
+        resume: bool = True,
+        incremental: bool = False,
+        job_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Complete pipeline: Spec → Epics → Stories → Tasks → Sprint Plan
+        
+        Epic, story and task generation run as overlapping stages (see
+        `_generate_plan_items`), with at most `story_concurrency` story calls
+        and `task_concurrency` task calls in flight (defaults to
+        STORY_GENERATION_CONCURRENCY / TASK_GENERATION_CONCURRENCY).
+        Per-stage timings are returned under `stage_timings`.
+        With use_cache=False every LLM call bypasses the response cache.
+        
+        `on_event(event, data)` is called synchronously as the plan is built:
+        "stage_started"/"stage_finished" for every stage (with its timings)
+        and "epic"/"stories"/"tasks" as items are persisted.
+        
+        Every epic, story set and task set is committed together with a
+        checkpoint keyed by project and spec hash. A re-run for the same spec
+        reuses completed items and only generates what is missing (counts of
+        reused items are returned under `resumed`); resume=False discards
+        the checkpoints and generates a fresh plan.
+        
+        The spec is split into sections and each generated epic is linked to
+        the sections it came from. With incremental=True the spec is diffed
+        against the sections of the previous run: epics of unchanged sections
+        are kept, epics of edited or removed sections are deleted in the
+        commit that completes their replacements, and only edited and new
+        sections (plus unchanged ones sharing a deleted epic) are sent to
+        the LLM. A summary of the diff is
+        returned under `spec_changes`.
+        
+        Tokens, latency and retries of every LLM call are returned under
+        `usage` and added to the stored usage rollups of the project, its
+        owner and `job_id` (also when generation fails).
         """
+        with metered() as meter:
+            try:
+                with bypass_llm_cache() if not use_cache else nullcontext():
+                    sprint_plan = await self._generate_sprint_plan(
+                        db,
+                        project_id,
+                        spec_content,
+                        llm_provider,
+                        story_concurrency=story_concurrency,
+                        task_concurrency=task_concurrency,
+                        on_event=on_event,
+                        resume=resume,
+                        incremental=incremental
+                    )
+            finally:
+                self._persist_usage(db, meter, project_id, job_id)
+        sprint_plan["usage"] = meter.summary()
+        return sprint_plan
+    
+    async def _generate_sprint_plan(
+        self,
+        db: Session,
+        project_id: int,
+        spec_content: str,
+        llm_provider: Optional[str],
+        story_concurrency: Optional[int],
+        task_concurrency: Optional[int],
+        on_event: Optional[ProgressCallback],
+        resume: bool,
+        incremental: bool
+    ) -> Dict[str, Any]:
+        """The pipeline behind `process_spec_to_sprint_plan`"""
         try:
             project = db.query(Project).filter(Project.id == project_id).first()
             if not project:
                 raise ValueError(f"Project {project_id} not found")
             
-            # Step 1: Extract Epics
-            logger.info("Step 1: Extracting epics from spec")
-            epics_data = await self.llm_service.extract_epics(spec_content, llm_provider)
-            
-            # Create epics in database
-            created_epics = []
-            for epic_data in epics_data:
-                epic = Epic(
-                    project_id=project_id,
-                    title=epic_data["title"],
-                    description=epic_data.get("description", ""),
-                    priority=epic_data.get("priority", "medium"),
-                    estimated_effort=epic_data.get("estimated_effort", 0)
+            sections = segment_spec(spec_content)
+            previous_sections = self._load_spec_sections(db, project_id)
+            generation_spec = spec_content
+            target_sections = list(range(len(sections)))
+            kept_epics: List[Dict[str, Any]] = []
+            stale_epic_ids: List[int] = []
+            spec_changes = None
+            if incremental and previous_sections:
+                generation_spec, target_sections, stale_epic_ids, spec_changes = self._apply_spec_diff(
+                    db, project_id, previous_sections, sections
                 )
-                db.add(epic)
-                db.flush()
-                created_epics.append(epic)
+                logger.info(f"Incremental regeneration: {spec_changes}")
+            elif incremental:
+                logger.info(f"No section history for project {project_id}; generating the full plan")
             
-            db.commit()
-            logger.info(f"Created {len(created_epics)} epics")
-            
-            # Step 2: Generate Stories for each Epic
-            logger.info("Step 2: Generating stories from epics")
-            all_stories = []
-            for epic in created_epics:
-                epic_description = f"{epic.title}: {epic.description}"
-                stories_data = await self.llm_service.generate_stories(epic_description, llm_provider)
-                # Small delay to avoid hitting rate limits (Groq free tier: 6000 tokens/minute)
-                await asyncio.sleep(0.5)
-                
-                for story_data in stories_data:
-                    story = Story(
-                        epic_id=epic.id,
-                        title=story_data["title"],
-                        description=story_data.get("description", ""),
-                        acceptance_criteria=story_data.get("acceptance_criteria", ""),
-                        priority=story_data.get("priority", "medium"),
-                        estimated_effort=story_data.get("estimated_effort", 0)
-                    )
-                    db.add(story)
-                    db.flush()
-                    all_stories.append(story)
+            checkpoints = CheckpointStore(db, project_id, spec_hash(generation_spec))
+            if not resume:
+                checkpoints.clear()
+                db.commit()
             
-            db.commit()
-            logger.info(f"Created {len(all_stories)} stories")
-            
-            # Step 3: Generate Tasks for each Story
-            logger.info("Step 3: Generating tasks from stories")
-            all_tasks = []
-            for story in all_stories:
-                tasks_data = await self.llm_service.generate_tasks(
-                    story.description,
-                    story.acceptance_criteria or "",
-                    llm_provider
+            timer = StageTimer(listener=lambda event, data: self._emit(on_event, event, data))
+            
+            # Steps 1-3: Epics → Stories → Tasks as a streaming pipeline
+            logger.info("Steps 1-3: Generating epics, stories and tasks")
+            if generation_spec.strip():
+                created_epics, all_stories, all_tasks = await self._generate_plan_items(
+                    db,
+                    project_id,
+                    generation_spec,
+                    llm_provider,
+                    story_concurrency=story_concurrency or settings.STORY_GENERATION_CONCURRENCY,
+                    task_concurrency=task_concurrency or settings.TASK_GENERATION_CONCURRENCY,
+                    timer=timer,
+                    checkpoints=checkpoints,
+                    on_event=on_event
                 )
-                # Small delay to avoid hitting rate limits (Groq free tier: 6000 tokens/minute)
-                await asyncio.sleep(0.3)
-                
-                for task_data in tasks_data:
-                    task = Task(
-                        story_id=story.id,
-                        title=task_data["title"],
-                        description=task_data.get("description", ""),
-                        estimated_hours=task_data.get("estimated_hours", 0),
-                        priority=task_data.get("priority", "medium")
-                    )
-                    db.add(task)
-                    db.flush()
-                    all_tasks.append(task)
+            else:
+                # Only removals: nothing to send to the LLM
+                created_epics, all_stories, all_tasks = [], [], []
+            
+            if spec_changes is not None:
+                kept_epics = self._kept_epics(db, project_id, set(stale_epic_ids) | {epic["id"] for epic in created_epics})
+                spec_changes["epics_kept"] = len(kept_epics)
             
+            # Stale epics stay until their replacements are complete, then go in one commit with the new section map
+            if stale_epic_ids:
+                for epic in db.query(Epic).filter(Epic.id.in_(stale_epic_ids)).all():
+                    db.delete(epic)
+            self._record_spec_sections(
+                db,
+                project_id,
+                sections,
+                previous_sections if spec_changes else [],
+                {epic["id"] for epic in kept_epics},
+                created_epics,
+                target_sections
+            )
             db.commit()
-            logger.info(f"Created {len(all_tasks)} tasks")
+            logger.info(
+                f"Created {len(created_epics)} epics, {len(all_stories)} stories "
+                f"and {len(all_tasks)} tasks (reused from checkpoints: {checkpoints.reused})"
+            )
+            
+            # Kept epics count towards the plan as much as regenerated ones
+            plan_epics = kept_epics + created_epics
+            kept_ids = [epic["id"] for epic in kept_epics]
+            story_count = len(all_stories)
+            task_count = len(all_tasks)
+            if kept_ids:
+                story_count += db.query(Story).filter(Story.epic_id.in_(kept_ids)).count()
+                task_count += db.query(Task).join(Story).filter(Story.epic_id.in_(kept_ids)).count()
             
             # Step 4: Predict velocity and estimate timeline
             logger.info("Step 4: Predicting velocity and estimating timeline")
-            total_effort = sum(epic.estimated_effort or 0 for epic in created_epics)
+            total_effort = sum(epic.get("estimated_effort") or 0 for epic in plan_epics)
             
             # Try to predict velocity using Pinecone, fallback to default if unavailable
-            if self.pinecone_service:
-                try:
-                    project_summary = f"{project.name}: {project.description or ''}"
-                    velocity_prediction = await self.pinecone_service.predict_velocity(
-                        project_summary,
-                        project_id
-                    )
-                    predicted_velocity = velocity_prediction.get("predicted_velocity", 20.0)
-                except Exception as e:
-                    logger.warning(f"Pinecone velocity prediction failed: {e}. Using default velocity.")
-                    predicted_velocity = 20.0
-                    velocity_prediction = {"predicted_velocity": 20.0, "confidence": "low", "reason": "Pinecone unavailable"}
-            else:
-                predicted_velocity = 20.0  # Default velocity
-                velocity_prediction = {"predicted_velocity": 20.0, "confidence": "low", "reason": "Pinecone not configured"}
+            with timer.measure("velocity"):
+                if self.pinecone_service:
+                    try:
+                        project_summary = f"{project.name}: {project.description or ''}"
+                        velocity_prediction = await self.pinecone_service.predict_velocity(
+                            project_summary,
+                            project_id
+                        )
+                        predicted_velocity = velocity_prediction.get("predicted_velocity", 20.0)
+                    except Exception as e:
+                        logger.warning(f"Pinecone velocity prediction failed: {e}. Using default velocity.")
+                        predicted_velocity = 20.0
+                        velocity_prediction = {"predicted_velocity": 20.0, "confidence": "low", "reason": "Pinecone unavailable"}
+                else:
+                    predicted_velocity = 20.0  # Default velocity
+                    velocity_prediction = {"predicted_velocity": 20.0, "confidence": "low", "reason": "Pinecone not configured"}
+            timer.finish("velocity")
             
             estimated_sprints = max(1, int(total_effort / predicted_velocity) if predicted_velocity > 0 else 1)
             
-            timeline = await self.llm_service.estimate_timeline(
-                f"Total effort: {total_effort} story points. Predicted velocity: {predicted_velocity}",
-                historical_context=json.dumps(velocity_prediction),
-                provider=llm_provider
-            )
+            with timer.measure("timeline"):
+                timeline = await self.llm_service.estimate_timeline(
+                    f"Total effort: {total_effort} story points. Predicted velocity: {predicted_velocity}",
+                    historical_context=json.dumps(velocity_prediction),
+                    provider=llm_provider
+                )
+            timer.finish("timeline")
             
             # Step 5: Create Sprint Plan
             sprint_plan = {
                 "project_id": project_id,
-                "epics": len(created_epics),
-                "stories": len(all_stories),
-                "tasks": len(all_tasks),
+                "epics": len(plan_epics),
+                "stories": story_count,
+                "tasks": task_count,
                 "total_effort": total_effort,
                 "predicted_velocity": predicted_velocity,
                 "estimated_sprints": estimated_sprints,
                 "timeline": timeline,
-                "velocity_prediction": velocity_prediction
+                "velocity_prediction": velocity_prediction,
+                "stage_timings": timer.as_dict(),
+                "resumed": dict(checkpoints.reused),
+                "spec_changes": spec_changes
             }
             
-            logger.info("Sprint plan generation completed")
+            logger.info(f"Sprint plan generation completed: {sprint_plan['stage_timings']}")
             return sprint_plan
             
         except Exception as e:
@@ -161,6 +253,401 @@ class SprintService:
             db.rollback()
             raise
     
+    @staticmethod
+    def _persist_usage(db: Session, meter: UsageMeter, project_id: int, job_id: Optional[str]):
+        """Best-effort update of the usage rollups; never fails the pipeline"""
+        if not meter.calls:
+            return
+        try:
+            owner_id = db.query(Project.owner_id).filter(Project.id == project_id).scalar()
+            scopes = [("project", project_id)]
+            if owner_id is not None:
+                scopes.append(("user", owner_id))
+            if job_id:
+                scopes.append(("job", job_id))
+            persist_usage(db, meter, scopes)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist LLM usage for project {project_id}: {e}")
+            db.rollback()
+    
+    @staticmethod
+    def _load_spec_sections(db: Session, project_id: int) -> List[Dict[str, Any]]:
+        """Sections recorded by the project's last generation run"""
+        rows = (
+            db.query(SpecSection)
+            .filter(SpecSection.project_id == project_id)
+            .order_by(SpecSection.position)
+            .all()
+        )
+        return [
+            {"key": row.section_key, "heading": row.heading, "hash": row.content_hash, "epic_ids": json.loads(row.epic_ids_json)}
+            for row in rows
+        ]
+    
+    def _apply_spec_diff(
+        self,
+        db: Session,
+        project_id: int,
+        previous_sections: List[Dict[str, Any]],
+        sections: List[Dict[str, Any]]
+    ) -> Tuple[str, List[int], List[int], Dict[str, int]]:
+        """
+        Find epics whose source sections changed or disappeared.
+        
+        An epic linked to several sections is stale as soon as one of them
+        changes, so its unchanged sections are regenerated too (and their
+        other epics with them) until no stale epic is left linked to a kept
+        section.
+        
+        Returns the text to regenerate (edited, new and shared sections, in
+        spec order), the indexes of those sections, the ids of the stale
+        epics to delete once their replacements exist and a summary.
+        """
+        diff = diff_sections(previous_sections, sections)
+        stale_ids = {epic_id for old, _ in diff["changed"] for epic_id in old["epic_ids"]}
+        stale_ids |= {epic_id for old in diff["removed"] for epic_id in old["epic_ids"]}
+        regenerate_keys = {new["key"] for _, new in diff["changed"]} | {new["key"] for new in diff["added"]}
+        
+        unchanged = {new["key"]: old for old, new in diff["unchanged"]}
+        shared = True
+        while shared:
+            shared = [
+                key for key, old in unchanged.items()
+                if key not in regenerate_keys and stale_ids.intersection(old["epic_ids"])
+            ]
+            for key in shared:
+                regenerate_keys.add(key)
+                stale_ids.update(unchanged[key]["epic_ids"])
+        
+        stale_epic_ids = [
+            epic_id for (epic_id,) in db.query(Epic.id).filter(Epic.project_id == project_id, Epic.id.in_(stale_ids))
+        ] if stale_ids else []
+        
+        target = [i for i, section in enumerate(sections) if section["key"] in regenerate_keys]
+        generation_spec = "\n\n".join(sections[i]["text"] for i in target)
+        
+        summary = {
+            "sections_unchanged": len(diff["unchanged"]),
+            "sections_changed": len(diff["changed"]),
+            "sections_added": len(diff["added"]),
+            "sections_removed": len(diff["removed"]),
+            "sections_regenerated": len(target),
+            "epics_removed": len(stale_epic_ids),
+        }
+        return generation_spec, target, stale_epic_ids, summary
+    
+    @staticmethod
+    def _kept_epics(db: Session, project_id: int, replaced_ids: set) -> List[Dict[str, Any]]:
+        """
+        Epics an incremental run leaves in place: every epic of the project
+        except the stale and regenerated ones, including epics that matched
+        no section
+        """
+        ids = [
+            epic_id for (epic_id,) in db.query(Epic.id).filter(Epic.project_id == project_id).order_by(Epic.id)
+            if epic_id not in replaced_ids
+        ]
+        return load_rows(db, Epic, ids)
+    
+    @staticmethod
+    def _record_spec_sections(
+        db: Session,
+        project_id: int,
+        sections: List[Dict[str, Any]],
+        previous_sections: List[Dict[str, Any]],
+        kept_epic_ids: set,
+        created_epics: List[Dict[str, Any]],
+        target_sections: List[int]
+    ):
+        """
+        Replace the project's section map: unchanged sections keep their
+        epics, and each new epic is linked to the target sections it matches
+        (to none when it shares no words with them)
+        """
+        previous_by_key = {section["key"]: section for section in previous_sections}
+        epic_ids: List[List[int]] = []
+        for section in sections:
+            previous = previous_by_key.get(section["key"])
+            if previous and previous["hash"] == section["hash"]:
+                epic_ids.append([epic_id for epic_id in previous["epic_ids"] if epic_id in kept_epic_ids])
+            else:
+                epic_ids.append([])
+        
+        candidates = [sections[i] for i in target_sections]
+        for epic in created_epics:
+            for match in match_sections(f"{epic['title']} {epic.get('description') or ''}", candidates):
+                epic_ids[target_sections[match]].append(epic["id"])
+        
+        db.query(SpecSection).filter(SpecSection.project_id == project_id).delete(synchronize_session=False)
+        for position, (section, ids) in enumerate(zip(sections, epic_ids)):
+            db.add(SpecSection(
+                project_id=project_id,
+                position=position,
+                section_key=section["key"],
+                heading=section["heading"] or None,
+                content_hash=section["hash"],
+                epic_ids_json=json.dumps(ids)
+            ))
+    
+    async def _generate_plan_items(
+        self,
+        db: Session,
+        project_id: int,
+        spec_content: str,
+        llm_provider: Optional[str],
+        story_concurrency: int,
+        task_concurrency: int,
+        timer: StageTimer,
+        checkpoints: CheckpointStore,
+        on_event: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Generate and persist epics, stories and tasks as an overlapping pipeline.
+        
+        Stages are connected by asyncio queues: story generation for an epic
+        starts as soon as that epic is persisted, and task generation for a
+        story starts as soon as its epic's stories are back (stories of one
+        epic are sent in batches sized by `LLMService.plan_task_batches`).
+        The critical path is therefore roughly one epic → story → task chain
+        instead of the sum of every stage. Results are returned in epic/story
+        order, independent of which calls finished first.
+        
+        Each persisted epic, story batch and task batch is reported to
+        `on_event` as "epic", "stories" and "tasks" events.
+        
+        Items already recorded in `checkpoints` are loaded instead of
+        generated; new items are committed with their checkpoint right away.
+        
+        Items are written with one batched INSERT per epic, story set and
+        task batch (see `plan_persistence`) and handled as plain records
+        (dicts with 'id'), never as session-tracked ORM instances.
+        """
+        story_concurrency = max(1, story_concurrency)
+        task_concurrency = max(1, task_concurrency)
+        epic_queue: asyncio.Queue = asyncio.Queue()
+        story_queue: asyncio.Queue = asyncio.Queue()
+        
+        created_epics: List[Dict[str, Any]] = []
+        stories_by_epic: Dict[int, List[Dict[str, Any]]] = {}
+        tasks_by_story: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        
+        async def epic_stage():
+            def hand_off(epic: Dict[str, Any]):
+                epic_queue.put_nowait((len(created_epics), epic))
+                created_epics.append(epic)
+                self._emit(on_event, "epic", self._epic_to_dict(epic))
+            
+            with timer.measure("epics"):
+                completed = checkpoints.load(Epic, "epics", "complete")
+                if completed is not None:
+                    checkpoints.reused["epics"] += len(completed)
+                    for epic in completed:
+                        hand_off(epic)
+                else:
+                    # Epics are persisted and handed to story workers while the model is still writing the rest
+                    async for epic_data in self.llm_service.stream_epics(spec_content, llm_provider):
+                        epic = self._resume_or_create_epic(db, checkpoints, project_id, len(created_epics), epic_data)
+                        db.commit()
+                        hand_off(epic)
+                    
+                    # Epics left over from an interrupted run that produced more of them
+                    for item_key in checkpoints.keys("epics"):
+                        if item_key != "complete" and int(item_key) >= len(created_epics):
+                            for epic in checkpoints.load(Epic, "epics", item_key) or []:
+                                self._discard_epic(db, checkpoints, epic["id"])
+                            checkpoints.discard("epics", item_key)
+                    checkpoints.record("epics", "complete", [epic["id"] for epic in created_epics])
+                    db.commit()
+            timer.finish("epics")
+            
+            for _ in range(story_concurrency):
+                epic_queue.put_nowait(None)
+        
+        async def story_worker():
+            while (item := await epic_queue.get()) is not None:
+                epic_index, epic = item
+                stories = checkpoints.load(Story, "stories", str(epic["id"]))
+                if stories is not None:
+                    checkpoints.reused["stories"] += len(stories)
+                else:
+                    with timer.measure("stories"):
+                        stories = await self._generate_stories_for_epic(db, epic, llm_provider)
+                    checkpoints.record("stories", str(epic["id"]), [story["id"] for story in stories])
+                    db.commit()
+                stories_by_epic[epic_index] = stories
+                self._emit(on_event, "stories", {
+                    "epic_id": epic["id"],
+                    "stories": [self._story_to_dict(story) for story in stories]
+                })
+                
+                # Stories whose tasks were saved by an earlier run are not sent to the LLM again
+                pending = []
+                restored_tasks = []
+                for story_index, story in enumerate(stories):
+                    tasks = checkpoints.load(Task, "tasks", str(story["id"]))
+                    if tasks is None:
+                        pending.append(story_index)
+                    else:
+                        tasks_by_story[(epic_index, story_index)] = tasks
+                        restored_tasks.extend(tasks)
+                if restored_tasks:
+                    checkpoints.reused["tasks"] += len(restored_tasks)
+                    self._emit(on_event, "tasks", {"tasks": [self._task_to_dict(task) for task in restored_tasks]})
+                
+                for batch in self.llm_service.plan_task_batches(
+                    [self._story_prompt_fields(stories[i]) for i in pending],
+                    llm_provider
+                ):
+                    story_queue.put_nowait([((epic_index, pending[i]), stories[pending[i]]) for i in batch])
+        
+        async def story_stage():
+            await gather_or_cancel([story_worker() for _ in range(story_concurrency)])
+            timer.finish("stories")
+            for _ in range(task_concurrency):
+                story_queue.put_nowait(None)
+        
+        async def task_worker():
+            while (batch := await story_queue.get()) is not None:
+                with timer.measure("tasks"):
+                    batch_tasks = await self._generate_tasks_for_stories(
+                        db,
+                        [story for _, story in batch],
+                        llm_provider
+                    )
+                for (position, story), tasks in zip(batch, batch_tasks):
+                    tasks_by_story[position] = tasks
+                    checkpoints.record("tasks", str(story["id"]), [task["id"] for task in tasks])
+                db.commit()
+                self._emit(on_event, "tasks", {
+                    "tasks": [self._task_to_dict(task) for tasks in batch_tasks for task in tasks]
+                })
+        
+        async def task_stage():
+            await gather_or_cancel([task_worker() for _ in range(task_concurrency)])
+            timer.finish("tasks")
+        
+        await gather_or_cancel([epic_stage(), story_stage(), task_stage()])
+        
+        all_stories = [
+            story
+            for epic_index in range(len(created_epics))
+            for story in stories_by_epic.get(epic_index, [])
+        ]
+        all_tasks = [task for position in sorted(tasks_by_story) for task in tasks_by_story[position]]
+        return created_epics, all_stories, all_tasks
+    
+    def _resume_or_create_epic(
+        self,
+        db: Session,
+        checkpoints: CheckpointStore,
+        project_id: int,
+        index: int,
+        epic_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Persist the epic at `index` of the extracted list, reusing the one an
+        interrupted run saved at the same position if it has the same title
+        """
+        previous = checkpoints.load(Epic, "epics", str(index))
+        if previous and previous[0]["title"] == epic_data["title"]:
+            checkpoints.reused["epics"] += 1
+            return previous[0]
+        if previous:
+            self._discard_epic(db, checkpoints, previous[0]["id"])
+        
+        epic = insert_epics(db, project_id, [epic_data])[0]
+        checkpoints.record("epics", str(index), [epic["id"]])
+        return epic
+    
+    @staticmethod
+    def _discard_epic(db: Session, checkpoints: CheckpointStore, epic_id: int):
+        """Delete an epic superseded by a re-run, with its subtree and checkpoints"""
+        for (story_id,) in db.query(Story.id).filter(Story.epic_id == epic_id):
+            checkpoints.discard("tasks", str(story_id))
+        checkpoints.discard("stories", str(epic_id))
+        epic = db.get(Epic, epic_id)
+        if epic is not None:
+            db.delete(epic)
+            db.flush()
+    
+    async def _generate_stories_for_epic(
+        self,
+        db: Session,
+        epic: Dict[str, Any],
+        llm_provider: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Generate stories for one epic and insert them as soon as they return"""
+        epic_description = f"{epic['title']}: {epic.get('description')}"
+        stories_data = await self.llm_service.generate_stories(epic_description, llm_provider)
+        return insert_stories(db, epic["id"], stories_data)
+    
+    @staticmethod
+    def _emit(on_event: Optional[ProgressCallback], event: str, data: Dict[str, Any]):
+        """Report progress without letting a failing listener break the pipeline"""
+        if on_event is None:
+            return
+        try:
+            on_event(event, data)
+        except Exception as e:
+            logger.warning(f"Progress listener failed on '{event}' event: {e}")
+    
+    @staticmethod
+    def _epic_to_dict(epic: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: epic.get(key) for key in ("id", "title", "description", "priority", "estimated_effort")}
+    
+    @staticmethod
+    def _story_to_dict(story: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: story.get(key)
+            for key in ("id", "epic_id", "title", "description", "acceptance_criteria", "priority", "estimated_effort")
+        }
+    
+    @staticmethod
+    def _task_to_dict(task: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: task.get(key) for key in ("id", "story_id", "title", "description", "priority", "estimated_hours")}
+    
+    @staticmethod
+    def _story_prompt_fields(story: Dict[str, Any]) -> Dict[str, str]:
+        """Story fields used in task-generation prompts"""
+        return {
+            "description": story.get("description") or "",
+            "acceptance_criteria": story.get("acceptance_criteria") or ""
+        }
+    
+    async def _generate_tasks_for_stories(
+        self,
+        db: Session,
+        stories: List[Dict[str, Any]],
+        llm_provider: Optional[str]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Generate tasks for a batch of stories with one LLM call and insert
+        them with one statement. Stories the batched answer left out fall
+        back to single-story calls.
+        """
+        story_fields = [self._story_prompt_fields(story) for story in stories]
+        if len(stories) > 1:
+            batch_results = await self.llm_service.generate_tasks_batch(story_fields, llm_provider)
+        else:
+            batch_results = [None]
+        
+        missing = [i for i, tasks_data in enumerate(batch_results) if tasks_data is None]
+        if len(stories) > 1 and missing:
+            logger.warning(f"Batched task answer missed {len(missing)}/{len(stories)} stories; retrying them individually")
+        single_results = await gather_or_cancel([
+            self.llm_service.generate_tasks(
+                story_fields[i]["description"],
+                story_fields[i]["acceptance_criteria"],
+                llm_provider
+            )
+            for i in missing
+        ])
+        for i, tasks_data in zip(missing, single_results):
+            batch_results[i] = tasks_data
+        
+        return insert_tasks(db, [(story["id"], tasks_data) for story, tasks_data in zip(stories, batch_results)])
+    
     async def create_sprint(
         self,
         db: Session,
@@ -0,0 +1,154 @@
+"""
+LLM usage metering: tokens, latency and retries of every call, rolled up per job, project and user
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from sqlalchemy.orm import Session
+from app.models.llm_usage import LLMUsageRollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("calls", "cached_calls", "failed_calls", "retries", "prompt_tokens", "completion_tokens", "total_tokens", "latency_seconds")
+
+
+class UsageMeter:
+    """
+    Records every LLM call made while it is active (see `metered`).
+    
+    Calls made from tasks spawned inside the block are recorded too, since
+    tasks inherit the active meter.
+    """
+    
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+    
+    def record(
+        self,
+        stage: Optional[str],
+        provider: str,
+        model: str,
+        usage: Optional[Dict[str, int]],
+        latency: float,
+        retries: int = 0,
+        cached: bool = False,
+        failed: bool = False
+    ):
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens', 0) or 0
+        completion_tokens = usage.get('completion_tokens', 0) or 0
+        self.calls.append({
+            "stage": stage or "other",
+            "provider": provider,
+            "model": model,
+            "cached": cached,
+            "failed": failed,
+            "retries": retries,
+            # A cached answer spent no tokens
+            "prompt_tokens": 0 if cached else prompt_tokens,
+            "completion_tokens": 0 if cached else completion_tokens,
+            "total_tokens": 0 if cached else (usage.get('total_tokens') or prompt_tokens + completion_tokens),
+            "latency_seconds": latency,
+        })
+    
+    def rollup(self) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """Counters per (provider, model, stage)"""
+        groups: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for call in self.calls:
+            totals = groups.setdefault((call["provider"], call["model"], call["stage"]), dict.fromkeys(COUNTERS, 0))
+            _add_call(totals, call)
+        return groups
+    
+    def summary(self) -> Dict[str, Any]:
+        """Totals, and totals per stage and per provider:model, for API responses"""
+        summary: Dict[str, Any] = dict.fromkeys(COUNTERS, 0)
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        by_provider: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            _add_call(summary, call)
+            _add_call(by_stage.setdefault(call["stage"], dict.fromkeys(COUNTERS, 0)), call)
+            _add_call(by_provider.setdefault(f"{call['provider']}:{call['model']}", dict.fromkeys(COUNTERS, 0)), call)
+        for totals in [summary, *by_stage.values(), *by_provider.values()]:
+            totals["latency_seconds"] = round(totals["latency_seconds"], 3)
+        summary["by_stage"] = by_stage
+        summary["by_provider"] = by_provider
+        return summary
+
+
+def _add_call(totals: Dict[str, Any], call: Dict[str, Any]):
+    totals["calls"] += 1
+    totals["cached_calls"] += int(call["cached"])
+    totals["failed_calls"] += int(call["failed"])
+    for key in ("retries", "prompt_tokens", "completion_tokens", "total_tokens", "latency_seconds"):
+        totals[key] += call[key]
+
+
+_current_meter: ContextVar[Optional[UsageMeter]] = ContextVar("llm_usage_meter", default=None)
+
+
+@contextmanager
+def metered() -> Iterator[UsageMeter]:
+    """Record every LLM call made inside this block on a new meter"""
+    meter = UsageMeter()
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+
+def record_llm_call(**kwargs: Any):
+    """Record a call on the active meter, if any (see `UsageMeter.record`)"""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.record(**kwargs)
+
+
+def persist_usage(db: Session, meter: UsageMeter, scopes: List[Tuple[str, Any]]):
+    """
+    Add a meter's counters to the stored rollups of each (scope, id), e.g.
+    [("job", job_id), ("project", 3), ("user", 1)]. Flushes; the caller commits.
+    """
+    groups = meter.rollup()
+    if not groups:
+        return
+    for scope, scope_id in scopes:
+        existing = {
+            (row.provider, row.model, row.stage): row
+            for row in db.query(LLMUsageRollup).filter(
+                LLMUsageRollup.scope == scope,
+                LLMUsageRollup.scope_id == str(scope_id)
+            )
+        }
+        for (provider, model, stage), totals in groups.items():
+            row = existing.get((provider, model, stage))
+            if row is None:
+                row = LLMUsageRollup(
+                    scope=scope, scope_id=str(scope_id), provider=provider, model=model, stage=stage,
+                    **dict.fromkeys(COUNTERS, 0)
+                )
+                db.add(row)
+            for key in COUNTERS:
+                setattr(row, key, getattr(row, key) + totals[key])
+    db.flush()
+
+
+def usage_rollups(db: Session, scope: str, scope_id: Any) -> List[Dict[str, Any]]:
+    """Stored rollups of one job, project or user"""
+    rows = (
+        db.query(LLMUsageRollup)
+        .filter(LLMUsageRollup.scope == scope, LLMUsageRollup.scope_id == str(scope_id))
+        .order_by(LLMUsageRollup.provider, LLMUsageRollup.model, LLMUsageRollup.stage)
+        .all()
+    )
+    return [
+        {
+            "provider": row.provider,
+            "model": row.model,
+            "stage": row.stage,
+            **{key: getattr(row, key) for key in COUNTERS},
+            "updated_at": row.updated_at
+        }
+        for row in rows
+    ]
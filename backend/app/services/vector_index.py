@@ -0,0 +1,181 @@
+"""
+In-process vector index: cosine top-k over a contiguous float32 matrix,
+persisted as a memory-mapped .npy file
+"""
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """
+    Unit-normalized vectors in one float32 matrix, so a query is a single
+    matrix-vector product. Each row carries an id, a project id, a velocity
+    and metadata; `query` can be restricted to one project, in which case
+    only that project's rows are scored.
+    
+    Rows are appended in place (capacity doubles as needed) and an id that
+    is added again replaces its row. `save` writes the matrix as .npy plus a
+    JSON sidecar; `load` memory-maps the matrix, so startup does not read it
+    all, and copies it into memory on the first write.
+    """
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self.ids: List[int] = []
+        self.project_ids: List[int] = []
+        self.velocities: List[float] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[int, int] = {}  # id -> row
+        self._project_rows: Dict[int, np.ndarray] = {}  # project id -> rows; built on demand, dropped on writes
+        self.info: Dict[str, Any] = {}  # Saved with the index, e.g. what it was built from
+        self.dirty = False
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """The used rows of the matrix"""
+        return self._vectors[:self._size]
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+    
+    def _reserve(self, rows: int):
+        """Room for `rows` rows in a writable, in-memory matrix"""
+        capacity = self._vectors.shape[0]
+        if rows <= capacity and not isinstance(self._vectors, np.memmap):
+            return
+        grown = np.zeros((max(rows, capacity * 2, 64), self.dimension), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+    
+    def add(
+        self,
+        id: int,
+        project_id: int,
+        vector: Iterable[float],
+        velocity: float = 0.0,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Add a vector, or replace the one stored under `id`"""
+        self.add_many([(id, project_id, vector, velocity, metadata or {})])
+    
+    def add_many(self, rows: List[Tuple[int, int, Iterable[float], float, Dict[str, Any]]]):
+        """Add (id, project_id, vector, velocity, metadata) rows in one write"""
+        if not rows:
+            return
+        vectors = np.asarray([row[2] for row in rows], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got shape {vectors.shape}")
+        vectors = self._normalize(vectors)
+        self._reserve(self._size + len(rows))
+        for (id, project_id, _, velocity, metadata), vector in zip(rows, vectors):
+            row = self._rows.get(id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._rows[id] = row
+                self.ids.append(id)
+                self.project_ids.append(project_id)
+                self.velocities.append(float(velocity or 0.0))
+                self.metadata.append(metadata)
+            else:
+                self.project_ids[row] = project_id
+                self.velocities[row] = float(velocity or 0.0)
+                self.metadata[row] = metadata
+            self._vectors[row] = vector
+        self._project_rows.clear()
+        self.dirty = True
+    
+    def get(self, id: int) -> Optional[Dict[str, Any]]:
+        """Metadata stored under `id`, or None"""
+        row = self._rows.get(id)
+        return None if row is None else self.metadata[row]
+    
+    def _rows_of(self, project_id: int) -> np.ndarray:
+        if not self._project_rows:
+            # Group every project's rows in one pass, so each filtered query only gathers its own rows
+            project_ids = np.asarray(self.project_ids)
+            order = np.argsort(project_ids, kind="stable")
+            projects, starts = np.unique(project_ids[order], return_index=True)
+            self._project_rows = dict(zip(projects.tolist(), np.split(order, starts[1:])))
+        return self._project_rows.get(project_id, np.empty(0, dtype=np.intp))
+    
+    def query(self, vector: Iterable[float], top_k: int = 5, project_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The `top_k` most cosine-similar rows, best first, optionally within one project"""
+        if not self._size or top_k <= 0:
+            return []
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        if query.shape != (self.dimension,):
+            raise ValueError(f"Expected a query of dimension {self.dimension}, got shape {query.shape}")
+        if project_id is None:
+            rows = None
+            scores = self.vectors @ query
+        else:
+            rows = self._rows_of(project_id)
+            if not len(rows):
+                return []
+            scores = self._vectors[rows] @ query
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {
+                "id": self.ids[row],
+                "project_id": self.project_ids[row],
+                "velocity": self.velocities[row],
+                "score": float(scores[position]),
+                "metadata": self.metadata[row],
+            }
+            for position in best
+            for row in [int(position if rows is None else rows[position])]
+        ]
+    
+    def save(self, path: str):
+        """Write the matrix to `path` (.npy) and the row data to `path`.json"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so a reader never maps a half-written file
+        np.save(path + ".tmp.npy", np.ascontiguousarray(self.vectors))
+        with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "dimension": self.dimension,
+                "ids": self.ids,
+                "project_ids": self.project_ids,
+                "velocities": self.velocities,
+                "metadata": self.metadata,
+                "info": self.info,
+            }, f)
+        os.replace(path + ".tmp.npy", path)
+        os.replace(path + ".json.tmp", path + ".json")
+        self.dirty = False
+    
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        """Index saved at `path`, with the matrix memory-mapped read-only"""
+        with open(path + ".json", encoding="utf-8") as f:
+            rows = json.load(f)
+        vectors = np.load(path, mmap_mode="r")
+        if vectors.shape != (len(rows["ids"]), rows["dimension"]):
+            raise ValueError(f"Vector index {path} does not match its row data")
+        index = cls(rows["dimension"])
+        index._vectors = vectors
+        index._size = len(rows["ids"])
+        index.ids = rows["ids"]
+        index.project_ids = rows["project_ids"]
+        index.velocities = rows["velocities"]
+        index.metadata = rows["metadata"]
+        index.info = rows.get("info", {})
+        index._rows = {id: row for row, id in enumerate(index.ids)}
+        return index
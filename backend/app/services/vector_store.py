@@ -0,0 +1,131 @@
+"""
+Sprint vector stores: the interface velocity prediction uses, and the
+factory that picks a backend (Pinecone or the in-process index)
+"""
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VELOCITY = 20.0  # Story points per sprint when there is no history
+
+
+class SprintVectorStore(ABC):
+    """Stores sprint embeddings and predicts velocity from similar past sprints"""
+    
+    @abstractmethod
+    async def store_sprint_embedding(
+        self,
+        sprint_id: int,
+        project_id: int,
+        sprint_data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Store sprint data as an embedding"""
+        pass
+    
+    @abstractmethod
+    async def find_similar_sprints(
+        self,
+        query_text: str,
+        project_id: Optional[int] = None,
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Most similar historical sprints, best first, as dicts with sprint_id,
+        velocity, similarity and metadata
+        """
+        pass
+    
+    def revalidate(self):
+        """Periodic maintenance, called by the service container"""
+        pass
+    
+    def close(self):
+        """Flush pending state; called when the service container stops"""
+        pass
+    
+    async def predict_velocity(
+        self,
+        project_summary: str,
+        project_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Predict sprint velocity based on similar historical sprints
+        """
+        try:
+            # Find similar sprints
+            similar_sprints = await self.find_similar_sprints(
+                query_text=project_summary,
+                project_id=project_id,
+                top_k=10
+            )
+            
+            if not similar_sprints:
+                # Default velocity if no history
+                return {
+                    "predicted_velocity": DEFAULT_VELOCITY,
+                    "confidence": "low",
+                    "based_on_sprints": 0
+                }
+            
+            # Calculate average velocity from similar sprints
+            velocities = [s["velocity"] for s in similar_sprints if s["velocity"]]
+            avg_velocity = sum(velocities) / len(velocities) if velocities else DEFAULT_VELOCITY
+            
+            # Weight by similarity
+            weighted_sum = sum(s["velocity"] * s["similarity"] for s in similar_sprints if s["velocity"])
+            similarity_sum = sum(s["similarity"] for s in similar_sprints)
+            weighted_velocity = weighted_sum / similarity_sum if similarity_sum > 0 else avg_velocity
+            
+            confidence = "high" if len(similar_sprints) >= 5 else "medium" if len(similar_sprints) >= 2 else "low"
+            
+            return {
+                "predicted_velocity": round(weighted_velocity, 2),
+                "confidence": confidence,
+                "based_on_sprints": len(similar_sprints),
+                "similar_sprints": similar_sprints[:3]  # Top 3 for reference
+            }
+        except Exception as e:
+            logger.error(f"Error predicting velocity: {e}")
+            return {
+                "predicted_velocity": DEFAULT_VELOCITY,
+                "confidence": "low",
+                "based_on_sprints": 0
+            }
+    
+    def _sprint_to_text(self, sprint_data: Dict[str, Any]) -> str:
+        """Convert sprint data to text for embedding"""
+        parts = [
+            f"Sprint: {sprint_data.get('name', '')}",
+            f"Velocity: {sprint_data.get('velocity', 0)}",
+        ]
+        
+        if "tasks" in sprint_data:
+            task_titles = [t.get("title", "") for t in sprint_data["tasks"]]
+            parts.append(f"Tasks: {', '.join(task_titles)}")
+        
+        if "metadata" in sprint_data:
+            parts.append(f"Metadata: {json.dumps(sprint_data['metadata'])}")
+        
+        return " | ".join(parts)
+
+
+def create_vector_store() -> Optional[SprintVectorStore]:
+    """
+    The vector store selected by VECTOR_STORE: 'pinecone', 'local' or
+    'none' (returns None). Raises if the backend cannot be built.
+    """
+    backend = settings.VECTOR_STORE.strip().lower()
+    if backend == "pinecone":
+        from app.services.pinecone_service import PineconeService
+        return PineconeService()
+    elif backend == "local":
+        from app.services.local_vector_service import LocalVectorService
+        return LocalVectorService()
+    elif backend in ("", "none"):
+        return None
+    raise ValueError(f"Unknown VECTOR_STORE: {settings.VECTOR_STORE}. Supported: 'pinecone', 'local', 'none'")
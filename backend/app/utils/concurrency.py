@@ -0,0 +1,43 @@
+"""
+Async concurrency helpers
+"""
+from typing import Any, Awaitable, Iterable, List
+import asyncio
+
+
+async def gather_with_limit(limit: int, aws: Iterable[Awaitable[Any]]) -> List[Any]:
+    """
+    Run awaitables concurrently with at most `limit` of them in flight.
+
+    Results are returned in input order, regardless of completion order.
+    If any awaitable fails, the remaining ones are cancelled and the first
+    error is re-raised unchanged (so callers can keep matching on it).
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await aw
+
+    return await gather_or_cancel([run(aw) for aw in aws])
+
+
+async def gather_or_cancel(aws: Iterable[Awaitable[Any]]) -> List[Any]:
+    """
+    Run awaitables concurrently and return their results in input order.
+
+    Unlike plain asyncio.gather, a failure cancels the siblings that are
+    still running before the first error is re-raised unchanged.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
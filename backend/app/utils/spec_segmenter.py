@@ -0,0 +1,169 @@
+"""
+Split product specs into sections and compare spec revisions
+"""
+from collections import Counter
+from typing import List, Dict, Any, Set, Callable
+import hashlib
+import re
+
+# Markdown headings, numbered headings ("2. Product Catalog") and ALL CAPS lines
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*$")
+_NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*[.)]?\s+[A-Za-z][^.!?]*$")
+_UNDERLINE = re.compile(r"^(=+|-+)\s*$")
+_WORD = re.compile(r"[a-z][a-z0-9]{2,}")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "will", "should",
+    "can", "users", "user", "allow", "allows", "support", "have", "has", "into",
+    "their", "they", "them", "all", "any", "each", "able", "via", "also",
+}
+MAX_HEADING_LENGTH = 80
+
+
+def _is_heading(line: str, next_line: str) -> bool:
+    if not line.strip() or line[0].isspace() or len(line) > MAX_HEADING_LENGTH:
+        return False
+    stripped = line.strip()
+    if _MARKDOWN_HEADING.match(stripped) or _UNDERLINE.match(next_line.strip()):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    if letters and stripped.upper() == stripped and len(letters) >= 3 and not stripped.startswith("-"):
+        return True
+    return bool(_NUMBERED_HEADING.match(stripped))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def _section(key: str, heading: str, lines: List[str]) -> Dict[str, Any]:
+    text = "\n".join(lines).strip()
+    return {"key": key, "heading": heading, "text": text, "hash": _content_hash(text)}
+
+
+def segment_spec(spec_content: str) -> List[Dict[str, Any]]:
+    """
+    Split a spec into sections: dicts with key, heading, text and hash.
+    
+    Sections start at headings. The key is the normalized heading, made
+    unique with a "#n" suffix, so an edited section keeps its key. Specs
+    without headings are split into paragraphs keyed by content.
+    """
+    lines = spec_content.splitlines()
+    starts = [
+        i for i, line in enumerate(lines)
+        if _is_heading(line, lines[i + 1] if i + 1 < len(lines) else "")
+    ]
+    
+    sections: List[Dict[str, Any]] = []
+    if not starts:
+        paragraphs = [p for p in re.split(r"\n\s*\n", spec_content) if p.strip()]
+        for paragraph in paragraphs:
+            section = _section("", "", paragraph.splitlines())
+            section["key"] = f"paragraph:{section['hash'][:16]}"
+            sections.append(section)
+        return sections
+    
+    if any(line.strip() for line in lines[:starts[0]]):
+        sections.append(_section("preamble", "", lines[:starts[0]]))
+    
+    seen: Dict[str, int] = {}
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        heading = lines[start].strip().lstrip("#").strip()
+        key = _normalize(re.sub(r"^\d+(\.\d+)*[.)]?\s+", "", heading))
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}#{seen[key]}"
+        sections.append(_section(key, heading, lines[start:end]))
+    return sections
+
+
+def diff_sections(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Compare two segmentations by section key.
+    
+    Returns "unchanged" and "changed" as (old, new) pairs, "added" as new
+    sections and "removed" as old sections.
+    """
+    old_by_key = {section["key"]: section for section in old}
+    new_keys = {section["key"] for section in new}
+    diff: Dict[str, List[Any]] = {"unchanged": [], "changed": [], "added": [], "removed": []}
+    for section in new:
+        previous = old_by_key.get(section["key"])
+        if previous is None:
+            diff["added"].append(section)
+        elif previous["hash"] == section["hash"]:
+            diff["unchanged"].append((previous, section))
+        else:
+            diff["changed"].append((previous, section))
+    diff["removed"] = [section for section in old if section["key"] not in new_keys]
+    return diff
+
+
+def _words(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def match_sections(text: str, sections: List[Dict[str, Any]]) -> List[int]:
+    """
+    Indexes of the sections a generated item (e.g. an epic) most likely came
+    from, by word overlap. A shared word counts 1 / the number of sections
+    sharing it, so words common to the whole spec weigh little. Every section
+    scoring at least 60% of the best match is returned; none when the best
+    match is weaker than one word found in a single section.
+    """
+    words = _words(text)
+    shared = [words & _words(section["text"]) for section in sections]
+    sections_with = Counter(word for section_words in shared for word in section_words)
+    scores = [sum(1.0 / sections_with[word] for word in section_words) for section_words in shared]
+    best = max(scores, default=0)
+    if best < 1.0:
+        return []
+    return [i for i, score in enumerate(scores) if score >= 0.6 * best]
+
+
+def _split_to_budget(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Split one oversized block at paragraphs, then lines, then characters"""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+    for separator in ("\n\n", "\n"):
+        parts = [part for part in text.split(separator) if part.strip()]
+        if len(parts) > 1:
+            return _pack(parts, max_tokens, count_tokens, separator)
+    # A single enormous line: cut it proportionally
+    size = max(1, len(text) * max_tokens // count_tokens(text))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _pack(blocks: List[str], max_tokens: int, count_tokens: Callable[[str], int], separator: str) -> List[str]:
+    """Greedily join consecutive blocks into chunks of at most `max_tokens`"""
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for block in blocks:
+        for piece in _split_to_budget(block, max_tokens, count_tokens):
+            tokens = count_tokens(piece)
+            if current and used + tokens > max_tokens:
+                chunks.append(separator.join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_spec(spec_content: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """
+    Split a spec into chunks of at most `max_tokens`, breaking only between
+    sections where possible (then between paragraphs and lines). Sections
+    stay in document order and neighbouring small sections share a chunk.
+    """
+    if count_tokens(spec_content) <= max_tokens:
+        return [spec_content]
+    sections = [section["text"] for section in segment_spec(spec_content)]
+    return _pack(sections, max_tokens, count_tokens, "\n\n")
@@ -0,0 +1,68 @@
+"""
+Timing helpers for pipeline stages
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import time
+
+
+class StageTimer:
+    """
+    Records wall-clock windows for pipeline stages that may overlap.
+
+    Every unit of work is wrapped in `measure(stage)`; a stage starts when
+    its first item starts and ends when its last item finishes, so stages
+    running in parallel show overlapping windows.
+
+    An optional `listener(event, data)` receives "stage_started" when a
+    stage's first item starts and "stage_finished" when `finish` is called.
+    """
+
+    def __init__(self, listener: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self._origin = time.perf_counter()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._listener = listener
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Time one item of work belonging to `stage`"""
+        started = time.perf_counter()
+        if stage not in self._stages and self._listener:
+            self._listener("stage_started", {"stage": stage, "started": round(started - self._origin, 3)})
+        entry = self._stages.setdefault(
+            stage,
+            {"started": started, "finished": started, "items": 0, "busy": 0.0}
+        )
+        entry["started"] = min(entry["started"], started)
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            entry["finished"] = max(entry["finished"], finished)
+            entry["items"] += 1
+            entry["busy"] += finished - started
+
+    def finish(self, stage: str):
+        """Mark a stage as complete and notify the listener with its timings"""
+        if stage in self._stages and self._listener:
+            self._listener("stage_finished", {"stage": stage, **self._stage_dict(stage)})
+
+    def _stage_dict(self, stage: str) -> Dict[str, Any]:
+        entry = self._stages[stage]
+        return {
+            "started": round(entry["started"] - self._origin, 3),
+            "finished": round(entry["finished"] - self._origin, 3),
+            "elapsed": round(entry["finished"] - entry["started"], 3),
+            "items": int(entry["items"]),
+            "busy": round(entry["busy"], 3),
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Stage windows as offsets (seconds) from timer creation.
+        `busy` is the summed duration of the stage's items; when it exceeds
+        `elapsed` the stage ran items concurrently.
+        """
+        timings: Dict[str, Any] = {stage: self._stage_dict(stage) for stage in self._stages}
+        timings["total"] = round(time.perf_counter() - self._origin, 3)
+        return timings
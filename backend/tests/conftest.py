@@ -0,0 +1,161 @@
+"""
+Shared test fixtures
+"""
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models.user import User
+from app.models.project import Project
+from app.services.llm_provider import LLMProvider
+from app.services.llm_service import LLMService
+from app.services import circuit_breaker, embedding_cache, llm_cache
+
+
+@pytest.fixture(autouse=True)
+def memory_llm_cache(monkeypatch):
+    """Fresh memory-only LLM response cache per test (never touches disk)"""
+    cache = llm_cache.LLMResponseCache()
+    monkeypatch.setattr(llm_cache, "_llm_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def memory_embedding_cache(monkeypatch):
+    """Fresh memory-only embedding cache per test (never touches disk)"""
+    cache = embedding_cache.EmbeddingCache()
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory bound to an in-memory SQLite database with all tables created"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    """Database session for a test"""
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def project(db):
+    """A project owned by a freshly created user"""
+    user = User(email="owner@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    project = Project(name="Test Project", description="Task management app", owner_id=user.id)
+    db.add(project)
+    db.commit()
+    return project
+
+
+class FakeClock:
+    """Settable stand-in for time.monotonic"""
+    
+    def __init__(self, now: float = 0.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+class FakeLLMService(LLMService):
+    """Offline stand-in for LLMService that records call concurrency"""
+    
+    def __init__(self, epic_count: int = 3, stories_per_epic: int = 2, tasks_per_story: int = 2, delay: float = 0.01):
+        self.default_provider_name = "ollama"
+        self.drop_from_batch = set()  # Story positions the batched answer "forgets"
+        self.epic_count = epic_count
+        self.stories_per_epic = stories_per_epic
+        self.tasks_per_story = tasks_per_story
+        self.delay = delay
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.calls = []
+    
+    async def _track(self, name: str, delay: float):
+        self.calls.append(name)
+        self.in_flight[name] = self.in_flight.get(name, 0) + 1
+        self.max_in_flight[name] = max(self.max_in_flight.get(name, 0), self.in_flight[name])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight[name] -= 1
+    
+    async def extract_epics(self, spec_content, provider=None):
+        await self._track("extract_epics", self.delay)
+        return [
+            {"title": f"Epic {i}", "description": f"Epic {i} description", "priority": "high", "estimated_effort": 8}
+            for i in range(self.epic_count)
+        ]
+    
+    async def stream_epics(self, spec_content, provider=None):
+        for epic in await self.extract_epics(spec_content, provider):
+            yield epic
+    
+    async def generate_stories(self, epic_description, provider=None):
+        # Earlier epics take longer so completion order differs from input order
+        epic_index = int(epic_description.split(":")[0].split()[-1])
+        await self._track("generate_stories", self.delay * (self.epic_count - epic_index))
+        return [
+            {"title": f"{epic_description.split(':')[0]} / Story {j}", "description": "As a user...", "acceptance_criteria": "1. Works", "priority": "medium", "estimated_effort": 3}
+            for j in range(self.stories_per_epic)
+        ]
+    
+    async def generate_tasks(self, story_description, acceptance_criteria, provider=None):
+        await self._track("generate_tasks", self.delay)
+        return [
+            {"title": f"Task {k}", "description": "Do it", "estimated_hours": 2, "priority": "low"}
+            for k in range(self.tasks_per_story)
+        ]
+    
+    async def generate_tasks_batch(self, stories, provider=None):
+        await self._track("generate_tasks_batch", self.delay)
+        return [
+            None if i in self.drop_from_batch else [
+                {"title": f"Task {k}", "description": "Do it", "estimated_hours": 2, "priority": "low"}
+                for k in range(self.tasks_per_story)
+            ]
+            for i in range(len(stories))
+        ]
+    
+    async def estimate_timeline(self, project_summary, historical_context=None, provider=None):
+        await self._track("estimate_timeline", self.delay)
+        return {"estimated_sprints": 2, "sprint_duration_weeks": 2}
+
+
+@pytest.fixture
+def fake_llm():
+    """Fake LLM service with deterministic output"""
+    return FakeLLMService()
+
+
+@pytest.fixture
+def llm_service_for(monkeypatch):
+    """
+    Builds an LLMService whose configured backend is a stub provider
+    
+    The stub goes through _get_provider like a registry provider, so calls
+    run through the production routing and circuit breaker (fresh per test).
+    """
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    
+    def build(provider: LLMProvider) -> LLMService:
+        return LLMService(backend=provider)
+    return build
@@ -0,0 +1,71 @@
+"""
+Tests for LLM backend circuit breakers
+"""
+import httpx
+from app.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, is_backend_failure
+from tests.conftest import FakeClock
+
+
+def make_breaker(clock) -> CircuitBreaker:
+    return CircuitBreaker("groq:m", window=4, min_calls=4, failure_rate=0.5, cooldown=30, clock=clock)
+
+
+def test_opens_on_failure_rate_and_refuses_calls():
+    """Test the circuit opens once half of the recent calls failed"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.retry_in() == 20
+
+
+def test_half_open_probe_closes_or_reopens():
+    """Test one probe is let through after the cool-down"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def translated(status: int) -> ValueError:
+    """A provider's ValueError raised while handling an HTTP error, as _raise_for_http_error does"""
+    request = httpx.Request("POST", "https://api.example.com/chat/completions")
+    try:
+        raise httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+    except httpx.HTTPStatusError:
+        try:
+            raise ValueError(f"API error {status}")
+        except ValueError as e:
+            return e
+
+
+def test_only_transient_errors_are_backend_failures():
+    """Test timeouts, transport errors, 5xx and 429 count; bad requests and keys do not"""
+    assert is_backend_failure(httpx.ConnectTimeout("timed out"))
+    assert is_backend_failure(ConnectionError("Could not connect to Ollama"))
+    assert is_backend_failure(translated(503))
+    assert is_backend_failure(translated(429))
+    assert not is_backend_failure(translated(400))
+    assert not is_backend_failure(translated(401))
+    assert not is_backend_failure(ValueError("Empty response from Ollama"))
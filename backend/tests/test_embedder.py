@@ -0,0 +1,88 @@
+"""
+Tests for the sprint text embedders
+"""
+import json
+import httpx
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services.embedder import HashingEmbedder, OllamaEmbedder, OpenAIEmbedder, create_embedder
+from app.services.local_vector_service import LocalVectorService
+
+
+@pytest.mark.asyncio
+async def test_hashing_embedder_is_deterministic_and_ranks_related_text_higher():
+    """Test local embeddings are stable, normalized, batched and similarity-preserving"""
+    embedder = HashingEmbedder(dimension=256)
+    texts = [
+        "Sprint: Auth | Tasks: Login form, Password reset, OAuth login",
+        "Auth sprint with login form and password reset",
+        "Billing: invoices, payment gateway, refunds",
+    ]
+    vectors = np.asarray(await embedder.embed(texts))
+    
+    assert vectors.shape == (3, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert await HashingEmbedder(dimension=256).aembed_query(texts[0]) == vectors[0].tolist()
+    assert await embedder.embed([]) == []
+    assert await embedder.aembed_query("") == [0.0] * 256
+
+
+@pytest.mark.asyncio
+async def test_remote_embedders_batch_and_check_dimension():
+    """Test Ollama and OpenAI embed a batch in one request and reject the wrong dimension"""
+    requests = []
+    
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append((request.url.path, body))
+        vectors = [[float(i)] * 4 for i in range(len(body["input"]))]
+        if request.url.path == "/api/embed":
+            return httpx.Response(200, json={"embeddings": vectors})
+        data = [{"index": i, "embedding": vector} for i, vector in reversed(list(enumerate(vectors)))]
+        return httpx.Response(200, json={"data": data})
+    
+    client = httpx.AsyncClient(base_url="https://api.openai.com/v1", transport=httpx.MockTransport(handler))
+    ollama = OllamaEmbedder("http://ollama:11434", "nomic-embed-text", dimension=4, client=client)
+    openai = OpenAIEmbedder("key", "text-embedding-3-small", dimension=4, client=client)
+    
+    assert await ollama.embed(["a", "b"]) == [[0.0] * 4, [1.0] * 4]
+    assert await openai.embed(["a", "b", "c"]) == [[0.0] * 4, [1.0] * 4, [2.0] * 4]
+    assert requests[0] == ("/api/embed", {"model": "nomic-embed-text", "input": ["a", "b"]})
+    assert requests[1] == ("/v1/embeddings", {"model": "text-embedding-3-small", "input": ["a", "b", "c"], "dimensions": 4})
+    
+    with pytest.raises(ValueError, match="EMBEDDING_DIMENSION"):
+        await OllamaEmbedder("http://ollama:11434", dimension=8, client=client).embed(["a"])
+    await client.aclose()
+
+
+def test_create_embedder_uses_configured_dimension(monkeypatch):
+    """Test EMBEDDER and EMBEDDING_DIMENSION pick the embedder and its dimension"""
+    monkeypatch.setattr(settings, "EMBEDDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 0)
+    assert create_embedder().dimension == 512
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 128)
+    assert create_embedder().key == "hashing:words+bigrams-v1:128"
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    with pytest.raises(ValueError):
+        create_embedder("openai")
+    with pytest.raises(ValueError):
+        create_embedder("word2vec")
+
+
+@pytest.mark.asyncio
+async def test_local_store_index_follows_the_embedder(session_factory, tmp_path):
+    """Test the index takes the embedder's dimension and ignores history from other embedders"""
+    path = str(tmp_path / "sprints.npy")
+    small = LocalVectorService(embeddings=HashingEmbedder(64), path=path, session_factory=session_factory)
+    await small.store_sprint_embedding(1, 1, {"name": "Auth", "velocity": 20})
+    assert small.get_index().dimension == 64
+    small.close()
+    
+    large = LocalVectorService(embeddings=HashingEmbedder(128), path=path, session_factory=session_factory)
+    assert len(large.get_index()) == 0
+    await large.store_sprint_embedding(2, 1, {"name": "Auth", "velocity": 30})
+    similar = await large.find_similar_sprints("Sprint: Auth", project_id=1)
+    assert [s["sprint_id"] for s in similar] == [2]
+    assert large.get_index().dimension == 128
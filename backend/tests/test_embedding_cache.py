@@ -0,0 +1,96 @@
+"""
+Tests for the embedding cache
+"""
+import asyncio
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services.embedder import CachedEmbedder, Embedder, HashingEmbedder, OpenAIEmbedder, create_embedder
+from app.services.embedding_cache import EmbeddingCache
+from app.services.local_vector_service import LocalVectorService
+
+
+class SlowEmbedder(Embedder):
+    """Counts calls and texts; every call takes `delay` seconds"""
+    
+    name = "slow"
+    model = "test"
+    dimension = 4
+    
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+    
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        return [[float(len(text)), 1.0, 0.5, 0.25] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_repeated_texts_skip_the_embedder():
+    """Test only uncached texts are embedded, once each, and hits report saved time"""
+    inner = SlowEmbedder()
+    embedder = CachedEmbedder(inner, EmbeddingCache())
+    
+    first = await embedder.embed(["alpha", "beta", "alpha"])
+    second = await embedder.embed(["beta", "gamma"])
+    assert await embedder.aembed_query("alpha") == first[0]
+    
+    assert inner.calls == [["alpha", "beta"], ["gamma"]]
+    assert first == [[5.0, 1.0, 0.5, 0.25], [4.0, 1.0, 0.5, 0.25], [5.0, 1.0, 0.5, 0.25]]
+    assert second[0] == first[1]
+    stats = embedder.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+    assert stats["hit_rate"] == round(2 / 6, 4)
+    assert 0 < stats["saved_seconds"] <= stats["embed_seconds"]
+    assert embedder.key == inner.key
+
+
+def test_disk_tier_survives_restarts_and_evicts_lru(tmp_path):
+    """Test float32 blobs are read back after a restart, per embedder, within the size limits"""
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path=path, max_memory_entries=1, max_disk_entries=2)
+    cache.set_many("a:m:3", ["one", "two"], [[1, 2, 3], [4, 5, 6]], seconds=0.2)
+    assert cache.stats()["memory_entries"] == 1
+    
+    reopened = EmbeddingCache(path=path, max_memory_entries=1, max_disk_entries=2)
+    assert reopened.get_many("a:m:3", ["one", "two", "three"]) == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0], None]
+    assert reopened.get_many("b:m:3", ["one"]) == [None]
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["misses"], stats["saved_seconds"]) == (2, 2, 0.2)
+    
+    reopened.set_many("a:m:3", ["three"], [[7, 8, 9]])
+    assert reopened.stats()["disk_entries"] == 2
+    assert EmbeddingCache(path=path).get_many("a:m:3", ["one", "two", "three"])[2] == [7.0, 8.0, 9.0]
+
+
+def test_create_embedder_caches_remote_embedders_only(monkeypatch, memory_embedding_cache):
+    """Test network embedders get the shared cache and local hashing does not"""
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "key")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 0)
+    embedder = create_embedder("openai")
+    assert isinstance(embedder, CachedEmbedder) and isinstance(embedder.embedder, OpenAIEmbedder)
+    assert embedder.cache is memory_embedding_cache
+    assert isinstance(create_embedder("hashing"), HashingEmbedder)
+    
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    assert isinstance(create_embedder("openai"), OpenAIEmbedder)
+
+
+@pytest.mark.asyncio
+async def test_velocity_prediction_embeds_the_project_summary_once(session_factory, tmp_path):
+    """Test planning the same project again reuses the summary's embedding"""
+    inner = SlowEmbedder(delay=0)
+    store = LocalVectorService(
+        embeddings=CachedEmbedder(inner, EmbeddingCache()),
+        path=str(tmp_path / "sprints.npy"),
+        session_factory=session_factory
+    )
+    await store.store_sprint_embedding(1, 1, {"name": "Auth", "velocity": 20})
+    
+    for _ in range(3):
+        prediction = await store.predict_velocity("Shop: online store", project_id=1)
+        assert prediction["based_on_sprints"] == 1
+    assert [texts for texts in inner.calls if texts == ["Shop: online store"]] == [["Shop: online store"]]
+    assert np.isclose(store.embeddings.cache.stats()["hit_rate"], 2 / 4)
@@ -0,0 +1,79 @@
+"""
+Tests for map-reduce epic extraction of large specs
+"""
+import asyncio
+import json
+import pytest
+from app.core.config import settings
+from app.services.llm_provider import LLMProvider
+from app.services.llm_service import is_duplicate_epic
+
+
+class HeadingEpicProvider(LLMProvider):
+    """Answers every epic prompt with one epic per '## ' heading it contains"""
+    
+    provider_name = "ollama"
+    model = "fake"
+    
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def generate_text(self, messages, options=None):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        titles = [line.strip()[3:] for line in prompt.splitlines() if line.strip().startswith("## ")]
+        epics = [{"title": title, "description": title, "priority": "medium", "estimated_effort": 5} for title in titles]
+        return {"text": "```json\n" + json.dumps(epics) + "\n```", "usage": {}}
+
+
+def large_spec(sections: int) -> str:
+    body = "The system must handle this capability end to end. " * 20
+    headings = [f"Feature {i} Management" for i in range(sections)] + ["Feature 0 management"]
+    return "\n\n".join(f"## {heading}\n{body}" for heading in headings)
+
+
+@pytest.mark.asyncio
+async def test_large_spec_is_extracted_in_parallel_chunks(monkeypatch, llm_service_for):
+    """Test chunks are sent concurrently and duplicate epics are merged"""
+    monkeypatch.setattr(settings, "EPIC_CHUNK_MAX_TOKENS", 600)
+    monkeypatch.setattr(settings, "EPIC_CHUNK_CONCURRENCY", 3)
+    provider = HeadingEpicProvider()
+    service = llm_service_for(provider)
+    
+    epics = await service.extract_epics(large_spec(8))
+    
+    assert len(provider.prompts) > 2
+    assert all("part" in prompt for prompt in provider.prompts)
+    assert provider.max_in_flight == 3
+    # The trailing "Feature 0 management" section duplicates the first epic
+    assert [epic["title"] for epic in epics] == [f"Feature {i} Management" for i in range(8)]
+    
+    streamed = [epic async for epic in service.stream_epics(large_spec(8))]
+    assert streamed == epics
+
+
+@pytest.mark.asyncio
+async def test_small_spec_uses_a_single_call(monkeypatch, llm_service_for):
+    monkeypatch.setattr(settings, "EPIC_CHUNK_MAX_TOKENS", 600)
+    provider = HeadingEpicProvider()
+    epics = await llm_service_for(provider).extract_epics("## Login\nUsers sign in.\n\n## Search\nFind things.")
+    
+    assert len(provider.prompts) == 1
+    assert "part" not in provider.prompts[0]
+    assert [epic["title"] for epic in epics] == ["Login", "Search"]
+
+
+def test_duplicate_epic_titles():
+    kept = [{"title": "User Management"}, {"title": "Shopping Cart"}]
+    assert is_duplicate_epic({"title": "user management"}, kept, 0.6)
+    assert is_duplicate_epic({"title": "Management of Users and User"}, [{"title": "Management of Users"}], 0.6)
+    assert not is_duplicate_epic({"title": "Order Management"}, kept, 0.6)
@@ -0,0 +1,49 @@
+"""
+Tests for per-stage generation profiles
+"""
+import json
+import httpx
+import pytest
+from app.core.config import settings
+from app.services.generation_profiles import stage_profile
+from app.services.llm_provider import GroqProvider
+
+
+def test_stage_profile_layers_provider_and_settings(monkeypatch):
+    """Test provider-specific profiles and LLM_STAGE_PROFILES override the stage defaults"""
+    monkeypatch.setattr(settings, "LLM_STAGE_PROFILES", json.dumps({
+        "generate_tasks": {"max_tokens": 2048},
+        "groq:extract_epics": {"model": "", "timeout": 90}
+    }))
+    
+    assert stage_profile("groq", "generate_tasks") == {
+        "temperature": 0.3, "max_input_tokens": 3072, "max_tokens": 2048, "model": "llama-3.1-8b-instant"
+    }
+    assert stage_profile("ollama", "generate_tasks") == {"temperature": 0.3, "max_input_tokens": 3072, "max_tokens": 2048}
+    # An empty model falls back to the provider's configured one
+    assert stage_profile("groq", "extract_epics") == {"temperature": 0.5, "timeout": 90}
+
+
+@pytest.mark.asyncio
+async def test_provider_applies_stage_profile(monkeypatch):
+    """Test the request carries the stage's model, temperature and max tokens"""
+    monkeypatch.setattr(settings, "LLM_STAGE_PROFILES", json.dumps({"generate_tasks": {"max_tokens": 512}}))
+    payloads = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "[]"}}], "usage": {}})
+    
+    client = httpx.AsyncClient(base_url="https://api.groq.com/openai/v1", transport=httpx.MockTransport(handler))
+    provider = GroqProvider(api_key="test", model="llama-3.1-70b-versatile", client=client)
+    messages = [{"role": "user", "content": "tasks"}]
+    await provider.generate_text(messages, {"stage": "generate_tasks"})
+    await provider.generate_text(messages, {"stage": "generate_tasks", "temperature": 0.9})
+    await provider.generate_text(messages)
+    
+    assert payloads[0]["model"] == "llama-3.1-8b-instant"
+    assert (payloads[0]["temperature"], payloads[0]["max_tokens"]) == (0.3, 512)
+    # Explicit options win over the profile
+    assert payloads[1]["temperature"] == 0.9
+    assert payloads[2]["model"] == "llama-3.1-70b-versatile" and "max_tokens" not in payloads[2]
+    await client.aclose()
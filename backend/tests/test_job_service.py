@@ -0,0 +1,68 @@
+"""
+Tests for background generation jobs
+"""
+import asyncio
+import json
+import pytest
+from app.models.generation_job import GenerationJob, JobStatus
+from app.services.job_service import JobRunner
+from app.services.sprint_service import SprintService
+
+
+async def wait_for_job(session_factory, job_id: str, timeout: float = 5.0) -> GenerationJob:
+    db = session_factory()
+    try:
+        for _ in range(int(timeout / 0.01)):
+            job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                return job
+            db.expire_all()
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"Job {job_id} did not finish")
+    finally:
+        db.close()
+
+
+def make_runner(session_factory, fake_llm) -> JobRunner:
+    def sprint_service_factory():
+        return SprintService(llm_service=fake_llm, with_vector_store=False)
+    
+    return JobRunner(session_factory=session_factory, sprint_service_factory=sprint_service_factory, workers=2)
+
+
+@pytest.mark.asyncio
+async def test_job_returns_immediately_and_completes(session_factory, db, project, fake_llm):
+    """Test submit returns a queued job and a worker produces the plan"""
+    runner = make_runner(session_factory, fake_llm)
+    await runner.start()
+    try:
+        job = runner.submit(db, project_id=project.id, user_id=project.owner_id, llm_provider="ollama")
+        assert job.status == JobStatus.QUEUED
+        
+        finished = await wait_for_job(session_factory, job.id)
+        assert finished.status == JobStatus.COMPLETED
+        assert json.loads(finished.result_json)["tasks"] == 12
+        progress = json.loads(finished.progress_json)
+        assert (progress["epics"], progress["stories"], progress["tasks"]) == (3, 6, 12)
+        assert progress["stage"] == "completed"
+        assert "tasks" in progress["stage_timings"]
+    finally:
+        await runner.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_failure_is_recorded(session_factory, db, project, fake_llm):
+    """Test a failing pipeline marks the job failed with the error"""
+    async def broken_extract(spec_content, provider=None):
+        raise ConnectionError("Could not connect to Ollama")
+    fake_llm.extract_epics = broken_extract
+    
+    runner = make_runner(session_factory, fake_llm)
+    await runner.start()
+    try:
+        job = runner.submit(db, project_id=project.id, user_id=project.owner_id)
+        finished = await wait_for_job(session_factory, job.id)
+        assert finished.status == JobStatus.FAILED
+        assert "Could not connect to Ollama" in finished.error
+    finally:
+        await runner.stop()
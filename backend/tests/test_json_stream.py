@@ -0,0 +1,123 @@
+"""
+Tests for streamed LLM output: incremental JSON parsing and provider streams
+"""
+import json
+import httpx
+from app.services.json_stream import JSONArrayStreamParser, iter_json_array
+from app.services.llm_provider import LLMProvider, OllamaProvider, OpenAIProvider
+
+
+def feed_all(parser, chunks):
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+def test_parser_yields_elements_as_they_close():
+    """Test each element is returned by the chunk that completes it"""
+    parser = JSONArrayStreamParser()
+    assert parser.feed('```json\n[{"title": "A", "tags": ["x", "]"]}, {"ti') == [{"title": "A", "tags": ["x", "]"]}]
+    assert parser.feed('tle": "B \\"quoted\\" {"}') == [{"title": 'B "quoted" {'}]
+    assert parser.feed(']\n```\nDone.') == []
+    assert parser.done
+
+
+def test_parser_handles_single_character_chunks_and_wrappers():
+    """Test elements inside an enclosing object, fed one character at a time"""
+    text = 'Sure! {"epics": [{"title": "A", "n": 1}, 2, "three"], "extra": [9]}'
+    assert feed_all(JSONArrayStreamParser(), text) == [{"title": "A", "n": 1}, 2, "three"]
+
+
+def test_parser_skips_malformed_elements():
+    """Test a broken element does not stop later ones"""
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"title": }, {"title": "ok"}]') == [{"title": "ok"}]
+    assert parser.errors == 1
+
+
+async def test_iter_json_array():
+    async def chunks():
+        for chunk in ['[{"a"', ': 1}, {"a": 2}', ']']:
+            yield chunk
+    
+    assert [item async for item in iter_json_array(chunks())] == [{"a": 1}, {"a": 2}]
+
+
+async def test_ollama_stream_text_reads_ndjson():
+    """Test Ollama streaming yields message deltas and reports usage"""
+    lines = [
+        {"message": {"content": "[{\"title\""}, "done": False},
+        {"message": {"content": ": \"A\"}]"}, "done": False},
+        {"message": {"content": ""}, "done": True, "prompt_eval_count": 10, "eval_count": 5},
+    ]
+    
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines))
+    
+    provider = OllamaProvider()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    usage = {}
+    chunks = [chunk async for chunk in provider.stream_text([{"role": "user", "content": "hi"}], usage=usage)]
+    assert "".join(chunks) == '[{"title": "A"}]'
+    assert usage["total_tokens"] == 15
+
+
+async def test_openai_stream_text_reads_server_sent_events():
+    """Test OpenAI streaming decodes SSE deltas and the trailing usage chunk"""
+    events = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "Hel"}}]},
+        {"choices": [{"delta": {"content": "lo"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    
+    provider = OpenAIProvider(api_key="test")
+    provider.client = httpx.AsyncClient(
+        base_url="https://api.openai.com/v1",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+    usage = {}
+    chunks = [chunk async for chunk in provider.stream_text([{"role": "user", "content": "hi"}], usage=usage)]
+    assert chunks == ["Hel", "lo"]
+    assert usage["total_tokens"] == 5
+
+
+class ChunkedProvider(LLMProvider):
+    """Streams a fixed answer a few characters at a time and records progress"""
+    
+    provider_name = "ollama"
+    model = "chunked"
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.sent = 0
+        self.streams = 0
+    
+    async def generate_text(self, messages, options=None):
+        return {"text": self.text, "usage": {}}
+    
+    async def stream_text(self, messages, options=None, usage=None):
+        self.streams += 1
+        for i in range(0, len(self.text), 5):
+            self.sent = i + 5
+            yield self.text[i:i + 5]
+
+
+async def test_stream_epics_yields_before_the_answer_is_complete(llm_service_for):
+    """Test epics arrive while the model is still writing, and the answer is cached"""
+    epics = [{"title": f"Epic {i}", "description": "d", "priority": "high", "estimated_effort": 5} for i in range(4)]
+    text = "```json\n" + json.dumps(epics) + "\n```"
+    provider = ChunkedProvider(text)
+    service = llm_service_for(provider)
+    
+    received = []
+    async for epic in service.stream_epics("spec"):
+        received.append((epic, provider.sent))
+    assert [epic for epic, _ in received] == epics
+    assert received[0][1] < len(text)
+    
+    assert [epic async for epic in service.stream_epics("spec")] == epics
+    assert provider.streams == 1
@@ -0,0 +1,81 @@
+"""
+Tests for the LLM response cache
+"""
+import pytest
+from app.services.llm_cache import LLMResponseCache, bypass_llm_cache
+from app.services.llm_service import LLMService
+from app.services.llm_provider import LLMProvider
+from tests.conftest import FakeClock
+
+
+class CountingProvider(LLMProvider):
+    """Provider that answers instantly and counts calls"""
+    
+    def __init__(self):
+        self.model = "fake-model"
+        self.calls = 0
+    
+    async def generate_text(self, messages, options=None):
+        self.calls += 1
+        return {"text": '[{"title": "Epic"}]', "usage": {"total_tokens": 10}}
+
+
+MESSAGES = [{"role": "system", "content": "You are helpful."}, {"role": "user", "content": "Hi"}]
+
+
+def test_key_ignores_indentation_but_not_model():
+    """Test key normalization and sensitivity to model/temperature"""
+    indented = [{"role": "system", "content": "    You are helpful.   "}, {"role": "user", "content": "Hi\n"}]
+    key = LLMResponseCache.make_key("groq", "m1", 0.7, MESSAGES)
+    
+    assert key == LLMResponseCache.make_key("groq", "m1", 0.7, indented)
+    assert key != LLMResponseCache.make_key("groq", "m2", 0.7, MESSAGES)
+    assert key != LLMResponseCache.make_key("groq", "m1", 0.2, MESSAGES)
+
+
+def test_disk_tier_survives_restart_and_ttl_expires(tmp_path):
+    """Test SQLite tier persists across instances and honours TTL"""
+    clock = FakeClock(1000.0)
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResponseCache(path=path, ttl_seconds=60, clock=clock).set("k", {"text": "hello"})
+    
+    reopened = LLMResponseCache(path=path, ttl_seconds=60, clock=clock)
+    assert reopened.get("k") == {"text": "hello"}
+    assert reopened.get("k") == {"text": "hello"}
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["memory_hits"] == 1
+    
+    clock.now += 61
+    assert reopened.get("k") is None
+    assert reopened.stats()["misses"] == 1
+
+
+def test_size_eviction(tmp_path):
+    """Test both tiers evict least recently used entries"""
+    cache = LLMResponseCache(path=str(tmp_path / "c.sqlite3"), max_memory_entries=2, max_disk_entries=3)
+    for i in range(5):
+        cache.set(f"k{i}", {"text": str(i)})
+    
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 3
+    assert cache.get("k0") is None
+    assert cache.get("k4") == {"text": "4"}
+
+
+@pytest.mark.asyncio
+async def test_llm_service_uses_cache_and_bypass(memory_llm_cache):
+    """Test repeated requests skip the provider unless the cache is bypassed"""
+    service = LLMService()
+    provider = CountingProvider()
+    service.default_provider = provider
+    
+    first = await service.extract_epics("Build a todo app")
+    second = await service.extract_epics("Build a todo app")
+    assert first == second
+    assert provider.calls == 1
+    
+    with bypass_llm_cache():
+        await service.extract_epics("Build a todo app")
+    assert provider.calls == 2
+    assert memory_llm_cache.stats()["hits"] == 1
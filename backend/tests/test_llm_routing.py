@@ -0,0 +1,156 @@
+"""
+Tests for latency-aware routing and hedging
+"""
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.llm_provider import LLMProvider
+from app.services.llm_routing import LatencyTracker, RoutingProvider
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+
+
+class DelayedProvider(LLMProvider):
+    def __init__(self, name: str, delay: float, fail: bool = False):
+        self.provider_name = name
+        self.model = "m"
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+    
+    async def generate_text(self, messages, options=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.provider_name} is down")
+        return {"text": self.provider_name, "usage": {}}
+
+
+def warmed_tracker(**latencies) -> LatencyTracker:
+    tracker = LatencyTracker(window=20, min_samples=3)
+    for name, seconds in latencies.items():
+        for _ in range(5):
+            tracker.record((name, "m"), seconds)
+    return tracker
+
+
+def test_latency_percentiles_need_min_samples():
+    """Test percentiles over the rolling window, None until warmed up"""
+    tracker = LatencyTracker(window=4, min_samples=2)
+    tracker.record(("groq", "m"), 1.0)
+    assert tracker.percentile(("groq", "m"), 0.5) is None
+    for seconds in (2.0, 3.0, 4.0, 5.0):
+        tracker.record(("groq", "m"), seconds)
+    # Oldest sample fell out of the window
+    assert tracker.percentile(("groq", "m"), 0.0) == 2.0
+    assert tracker.percentile(("groq", "m"), 0.95) == 5.0
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_backend():
+    """Test calls go to the backend with the lowest p50"""
+    slow, fast = DelayedProvider("slow", 0.01), DelayedProvider("fast", 0.01)
+    router = RoutingProvider([slow, fast], tracker=warmed_tracker(slow=2.0, fast=0.1), hedge=False)
+    
+    result = await router.generate_text([{"role": "user", "content": "hi"}])
+    assert result["text"] == "fast"
+    assert result["provider"] == "fast:m"
+    assert slow.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_past_p95_and_cancels_loser():
+    """Test a call slower than its p95 is duplicated and the loser cancelled"""
+    primary, backup = DelayedProvider("primary", 1.0), DelayedProvider("backup", 0.01)
+    router = RoutingProvider([primary, backup], tracker=warmed_tracker(primary=0.02, backup=0.5), hedge=True)
+    
+    result = await router.generate_text([{"role": "user", "content": "hi"}])
+    assert result["text"] == "backup"
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_backend_is_hedged_immediately():
+    """Test an error before the hedge delay sends the call to the next backend"""
+    primary, backup = DelayedProvider("primary", 0.0, fail=True), DelayedProvider("backup", 0.01)
+    router = RoutingProvider([primary, backup], tracker=warmed_tracker(primary=5.0, backup=6.0), hedge=True)
+    
+    result = await router.generate_text([{"role": "user", "content": "hi"}])
+    assert result["text"] == "backup"
+
+
+@pytest.mark.asyncio
+async def test_failover_chain_skips_open_circuits(monkeypatch):
+    """Test a dead backend fails over, then is skipped without being called"""
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 2)
+    dead, backup = DelayedProvider("dead", 0.0, fail=True), DelayedProvider("backup", 0.0)
+    chain = RoutingProvider([dead, backup], hedge=False, ordered=True)
+    assert (chain.provider_name, chain.model) == ("dead", "m")
+    
+    for _ in range(3):
+        result = await chain.generate_text([{"role": "user", "content": "hi"}])
+        assert result["text"] == "backup"
+    # The circuit opened after two failures
+    assert dead.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_fails_fast_when_every_circuit_is_open(monkeypatch):
+    """Test calls are refused without touching any backend"""
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 1)
+    dead = DelayedProvider("dead", 0.0, fail=True)
+    chain = RoutingProvider([dead], hedge=False, ordered=True)
+    with pytest.raises(ConnectionError):
+        await chain.generate_text([{"role": "user", "content": "hi"}])
+    
+    with pytest.raises(CircuitOpenError, match="circuit open"):
+        await chain.generate_text([{"role": "user", "content": "hi"}])
+    assert dead.calls == 1
+
+
+class RejectingProvider(DelayedProvider):
+    """Answers every call with a non-transient error, like a 400 or a bad key"""
+    
+    async def generate_text(self, messages, options=None):
+        self.calls += 1
+        raise ValueError(f"{self.provider_name} API key is invalid")
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_do_not_trip_the_breaker_or_fail_over(monkeypatch):
+    """Test non-transient errors are raised as-is, without opening the circuit or trying the next backend"""
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 1)
+    rejecting, backup = RejectingProvider("rejecting", 0.0), DelayedProvider("backup", 0.0)
+    chain = RoutingProvider([rejecting, backup], hedge=False, ordered=True)
+    
+    for _ in range(3):
+        with pytest.raises(ValueError, match="invalid"):
+            await chain.generate_text([{"role": "user", "content": "hi"}])
+    assert (rejecting.calls, backup.calls) == (3, 0)
+    assert circuit_breaker.get_circuit_breaker("rejecting", "m").state == circuit_breaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_single_provider_fails_fast_once_its_circuit_opens(monkeypatch, llm_service_for):
+    """Test a lone configured provider is breaker-guarded even without a failover chain"""
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 1)
+    monkeypatch.setattr(settings, "LLM_FAILOVER_CHAIN", "")
+    dead = DelayedProvider("ollama", 0.0, fail=True)
+    service = llm_service_for(dead)
+    provider = service._get_provider("ollama")
+    
+    with pytest.raises(ConnectionError, match="down"):
+        await provider.generate_text([{"role": "user", "content": "hi"}])
+    with pytest.raises(CircuitOpenError):
+        await service._get_provider("ollama").generate_text([{"role": "user", "content": "hi"}])
+    assert dead.calls == 1
@@ -0,0 +1,35 @@
+"""
+Tests for bulk plan persistence
+"""
+from app.models.project import Epic, Story, Task
+from app.services.plan_persistence import insert_epics, insert_stories, insert_tasks, load_rows
+
+
+def test_insert_tasks_groups_records_by_story(db, project):
+    """Test one batched task insert returns records grouped in input order"""
+    epic = insert_epics(db, project.id, [{"title": "Epic", "priority": "high"}])[0]
+    stories = insert_stories(db, epic["id"], [{"title": f"Story {i}"} for i in range(3)])
+    grouped = insert_tasks(db, [
+        (story["id"], [{"title": f"Task {i}.{j}"} for j in range(i + 1)])
+        for i, story in enumerate(stories)
+    ])
+    db.commit()
+    
+    assert epic["priority"] == "high"
+    assert [[task["title"] for task in tasks] for tasks in grouped] == [
+        ["Task 0.0"], ["Task 1.0", "Task 1.1"], ["Task 2.0", "Task 2.1", "Task 2.2"]
+    ]
+    for story, tasks in zip(stories, grouped):
+        assert {task.id for task in db.query(Task).filter(Task.story_id == story["id"])} == {task["id"] for task in tasks}
+    assert db.query(Story).count() == 3
+
+
+def test_load_rows_keeps_id_order_and_skips_missing(db, project):
+    """Test records come back in the requested order without deleted rows"""
+    epics = insert_epics(db, project.id, [{"title": f"Epic {i}"} for i in range(3)])
+    db.query(Epic).filter(Epic.id == epics[1]["id"]).delete()
+    db.commit()
+    
+    records = load_rows(db, Epic, [epics[2]["id"], epics[1]["id"], epics[0]["id"]])
+    assert [record["title"] for record in records] == ["Epic 2", "Epic 0"]
+    assert records[0]["priority"] == "medium"
@@ -0,0 +1,99 @@
+"""
+Tests for project API endpoints
+"""
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.api.v1 import jobs, projects
+from app.main import app
+from app.core.auth import get_current_active_user
+from app.core.database import get_db
+from app.services.container import get_sprint_service
+from app.services.sprint_service import SprintService
+from tests.test_job_service import make_runner
+
+
+@pytest.fixture
+def client(db, project, fake_llm):
+    """Test client authenticated as the project owner, with a fake LLM"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    
+    app.dependency_overrides[get_sprint_service] = lambda: service
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: project.owner
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def job_client(client, session_factory, fake_llm, monkeypatch):
+    """The test client with its own job runner, started and stopped by the app lifespan"""
+    runner = make_runner(session_factory, fake_llm)
+    for module in (main, projects, jobs):
+        monkeypatch.setattr(module, "job_runner", runner)
+    with client:
+        yield client
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sprint_plan_emits_incremental_events(client, project):
+    """Test the SSE endpoint streams stage events and items before the final plan"""
+    response = client.get(f"/api/v1/projects/{project.id}/generate-sprint-plan/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "stage_started"
+    assert names.count("epic") == 3
+    assert names.count("stories") == 3
+    assert names[-1] == "plan"
+    assert names.index("epic") < names.index("plan")
+    finished = {data["stage"]: data for name, data in events if name == "stage_finished"}
+    assert set(finished) == {"epics", "stories", "tasks", "velocity", "timeline"}
+    assert all("elapsed" in data for data in finished.values())
+    assert events[-1][1]["tasks"] == 12
+
+
+def test_stream_sprint_plan_reports_errors(client, project, fake_llm):
+    """Test pipeline failures become an error event"""
+    async def broken_extract(spec_content, provider=None):
+        raise ConnectionError("Could not connect to Ollama")
+    fake_llm.extract_epics = broken_extract
+    
+    events = parse_sse(client.get(f"/api/v1/projects/{project.id}/generate-sprint-plan/stream").text)
+    assert events[-1][0] == "error"
+    assert events[-1][1]["status_code"] == 503
+
+
+def test_generate_sprint_plan_runs_as_a_pollable_job(job_client, project):
+    """Test the endpoint answers 202 with a job id whose status can be polled until the plan is ready"""
+    response = job_client.post(f"/api/v1/projects/{project.id}/generate-sprint-plan")
+    assert response.status_code == 202
+    created = response.json()
+    assert created["status"] == "queued"
+    assert created["status_url"] == f"/api/v1/jobs/{created['job_id']}"
+    
+    for _ in range(500):
+        job = job_client.get(created["status_url"]).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "completed", job["error"]
+    assert job["result"]["tasks"] == 12
+    assert (job["progress"]["epics"], job["progress"]["stories"], job["progress"]["tasks"]) == (3, 6, 12)
+    
+    missing = job_client.get("/api/v1/jobs/no-such-job")
+    assert missing.status_code == 404
@@ -0,0 +1,58 @@
+"""
+Tests for the prompt builder
+"""
+import json
+from app.core.config import settings
+from app.services.llm_provider import estimate_prompt_tokens
+from app.services.llm_service import GROOM_SYSTEM_PROMPT, GROOM_USER_PROMPT
+from app.services.prompt_builder import build_messages, minify_prompt
+
+
+def test_templates_are_minified_and_fields_kept_verbatim():
+    """Test template indentation is dropped but field content is left alone"""
+    messages = build_messages(
+        """You are a planner.
+        
+            - Be brief""",
+        """Story:
+        {story}""",
+        story="  indented\n\n  code"
+    )
+    
+    assert messages[0] == {"role": "system", "content": "You are a planner.\n- Be brief"}
+    assert messages[1]["content"] == "Story:\n  indented\n\n  code"
+    assert minify_prompt("  a  \n\n   b ") == "a\nb"
+
+
+def test_calls_of_a_stage_share_a_byte_identical_prefix(fake_llm):
+    """Test the system prompt and the start of the user message do not depend on the input"""
+    first = fake_llm._epic_messages("Spec about billing")
+    second = fake_llm._epic_messages("A different spec about search")
+    
+    assert first[0] == second[0]
+    prefix = first[1]["content"].split("Spec about billing")[0]
+    assert second[1]["content"].startswith(prefix) and prefix
+
+
+def test_budget_truncates_largest_field_and_trims_lists():
+    """Test an over-budget prompt is cut to its budget; list fields drop trailing items whole"""
+    long_text = "word " * 2000
+    messages = build_messages("System.", "A: {a}\nB: {b}", budget=300, a="short", b=long_text)
+    assert estimate_prompt_tokens(messages) <= 300
+    assert "A: short" in messages[1]["content"]
+    
+    backlog = [{"id": i, "title": f"Item {i}", "description": "x" * 200} for i in range(50)]
+    messages = build_messages(GROOM_SYSTEM_PROMPT, GROOM_USER_PROMPT, budget=1500, backlog_items=backlog)
+    payload = messages[1]["content"].split("\n")[1]
+    kept = json.loads(payload)
+    assert 0 < len(kept) < 50 and kept == backlog[:len(kept)]
+    assert estimate_prompt_tokens(messages) <= 1500
+
+
+def test_compaction_can_be_turned_off(monkeypatch):
+    """Test LLM_PROMPT_COMPACT=False sends templates and JSON as written"""
+    monkeypatch.setattr(settings, "LLM_PROMPT_COMPACT", False)
+    messages = build_messages(GROOM_SYSTEM_PROMPT, GROOM_USER_PROMPT, backlog_items=[{"id": 1}])
+    
+    assert messages[0]["content"] == GROOM_SYSTEM_PROMPT
+    assert json.dumps([{"id": 1}], indent=2) in messages[1]["content"]
@@ -0,0 +1,49 @@
+"""
+Tests for the shared LLM provider registry
+"""
+import pytest
+from app.services import embedder
+from app.services.embedder import OllamaEmbedder, OpenAIEmbedder
+from app.services.provider_registry import ProviderRegistry
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_providers_and_pooled_clients():
+    """Test repeated lookups share providers, and models of one account share a client"""
+    registry = ProviderRegistry()
+    first = registry.get("groq", groq_api_key="key", groq_model="llama-3.1-8b-instant")
+    again = registry.get("groq", groq_api_key="key", groq_model="llama-3.1-8b-instant")
+    other_model = registry.get("groq", groq_api_key="key", groq_model="llama-3.3-70b-versatile")
+    other_key = registry.get("groq", groq_api_key="other", groq_model="llama-3.1-8b-instant")
+    
+    assert again is first
+    assert other_model is not first and other_model.client is first.client
+    assert other_key.client is not first.client
+    
+    # Providers do not close the shared client themselves
+    async with first:
+        pass
+    assert not first.client.is_closed
+    
+    await registry.aclose()
+    assert first.client.is_closed and other_key.client.is_closed
+    assert registry.get("groq", groq_api_key="key", groq_model="llama-3.1-8b-instant") is not first
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_embedders_use_pooled_clients_closed_by_the_registry(monkeypatch):
+    """Test embedders for one endpoint share a registry client that shutdown closes"""
+    registry = ProviderRegistry()
+    monkeypatch.setattr(embedder, "provider_registry", registry)
+    small = OpenAIEmbedder("key", "text-embedding-3-small", dimension=512)
+    large = OpenAIEmbedder("key", "text-embedding-3-large", dimension=1024)
+    other_key = OpenAIEmbedder("other", "text-embedding-3-small", dimension=512)
+    ollama = OllamaEmbedder("http://ollama:11434")
+    
+    assert large.client is small.client
+    assert other_key.client is not small.client and ollama.client is not small.client
+    assert small.client.headers["Authorization"] == "Bearer key"
+    
+    await registry.aclose()
+    assert small.client.is_closed and other_key.client.is_closed and ollama.client.is_closed
@@ -0,0 +1,131 @@
+"""
+Tests for the provider rate limiter
+"""
+import asyncio
+import httpx
+import pytest
+from app.services import llm_provider
+from app.services.llm_provider import GroqProvider, OpenAIProvider, RateLimiter, estimate_prompt_tokens
+from tests.conftest import FakeClock
+
+
+def test_requests_per_minute_budget():
+    """Test requests beyond the RPM budget are told to wait for refill"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=2, clock=clock)
+    
+    assert limiter.reserve(0) == 0
+    assert limiter.reserve(0) == 0
+    assert limiter.reserve(0) == pytest.approx(30.0)
+    # Queued requests wait behind earlier reservations
+    assert limiter.reserve(0) == pytest.approx(60.0)
+
+
+def test_tokens_per_minute_budget_and_usage_correction():
+    """Test token reservations are corrected with actual usage"""
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+    
+    assert limiter.reserve(5000) == 0
+    assert limiter.reserve(2000) == pytest.approx(10.0)
+    
+    # Both calls actually used far fewer tokens than reserved
+    limiter.record_usage(5000, 1000)
+    limiter.record_usage(2000, 1000)
+    assert limiter.reserve(3000) == 0
+
+
+def test_pause_and_headers():
+    """Test retry-after pauses and remaining-token headers tighten the budget"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000, clock=clock)
+    
+    limiter.pause(5)
+    assert limiter.reserve(10) == pytest.approx(5.0)
+    
+    clock.now = 10.0
+    limiter.observe_headers(httpx.Headers({"x-ratelimit-remaining-tokens": "0"}))
+    assert limiter.reserve(600) == pytest.approx(6.0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_rate_limited_attempts_return_their_reservation(monkeypatch, stream):
+    """Test a 429 refunds its reserved tokens so only the successful attempt is charged"""
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+    monkeypatch.setitem(llm_provider._rate_limiters, ("groq", "m"), limiter)
+    statuses = [429, 200]
+    
+    def handler(request):
+        status = statuses.pop(0)
+        if status == 429:
+            return httpx.Response(429, headers={"retry-after": "0"}, json={"error": "rate limited"})
+        if stream:
+            body = 'data: {"choices": [{"delta": {"content": "ok"}}], "usage": {"total_tokens": 100}}\n\ndata: [DONE]\n\n'
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 100}})
+    
+    client = httpx.AsyncClient(base_url="https://api.groq.com/openai/v1", transport=httpx.MockTransport(handler))
+    provider = GroqProvider(api_key="test", model="m", client=client)
+    messages = [{"role": "user", "content": "hi"}]
+    if stream:
+        assert [text async for text in provider.stream_text(messages, {"max_tokens": 1000})] == ["ok"]
+    else:
+        assert (await provider.generate_text(messages, {"max_tokens": 1000}))["retries"] == 1
+    
+    assert statuses == []
+    assert limiter.tokens.tokens == pytest.approx(6000 - 100)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_and_cancelled_requests_return_their_reservation(monkeypatch):
+    """Test a 5xx, an OpenAI 429 and a cancelled request leave the token budget untouched"""
+    clock = FakeClock()
+    limiters = {name: RateLimiter(tokens_per_minute=6000, clock=clock) for name in ("groq", "openai")}
+    for name, limiter in limiters.items():
+        monkeypatch.setitem(llm_provider._rate_limiters, (name, "m"), limiter)
+    hang = asyncio.Event()
+    
+    async def handler(request):
+        if request.headers.get("x-test") == "hang":
+            await hang.wait()
+        if request.url.host == "api.openai.com":
+            return httpx.Response(429, json={"error": "quota"})
+        return httpx.Response(500, json={"error": "internal"})
+    
+    transport = httpx.MockTransport(handler)
+    groq_client = httpx.AsyncClient(base_url="https://api.groq.com/openai/v1", transport=transport)
+    openai_client = httpx.AsyncClient(base_url="https://api.openai.com/v1", transport=transport)
+    groq = GroqProvider(api_key="test", model="m", client=groq_client)
+    openai = OpenAIProvider(api_key="test", model="m", client=openai_client)
+    messages = [{"role": "user", "content": "hi"}]
+    options = {"max_tokens": 1000}
+    
+    with pytest.raises(ValueError, match="500"):
+        await groq.generate_text(messages, options)
+    with pytest.raises(ValueError, match="500"):
+        [text async for text in groq.stream_text(messages, options)]
+    with pytest.raises(ValueError, match="quota"):
+        await openai.generate_text(messages, options)
+    
+    groq_client.headers["x-test"] = "hang"
+    call = asyncio.create_task(groq.generate_text(messages, options))
+    await asyncio.sleep(0.01)
+    assert limiters["groq"].tokens.tokens < 6000
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    
+    assert limiters["groq"].tokens.tokens == pytest.approx(6000)
+    assert limiters["openai"].tokens.tokens == pytest.approx(6000)
+    await groq_client.aclose()
+    await openai_client.aclose()
+
+
+def test_estimate_prompt_tokens():
+    """Test prompt token estimate grows with content"""
+    short = estimate_prompt_tokens([{"role": "user", "content": "hi"}])
+    long = estimate_prompt_tokens([{"role": "user", "content": "hi " * 200}])
+    assert 0 < short < long
@@ -0,0 +1,53 @@
+"""
+Tests for the shared service container
+"""
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.container import ServiceContainer
+from app.services.sprint_service import SprintService
+
+
+class FakePineconeService:
+    def __init__(self):
+        self.revalidations = 0
+    
+    def revalidate(self):
+        self.revalidations += 1
+    
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_container_builds_services_once(monkeypatch):
+    """Test every request gets the same warm services"""
+    monkeypatch.setattr(settings, "PINECONE_API_KEY", "")
+    container = ServiceContainer()
+    await container.start()
+    sprint_service = container.sprint_service
+    await container.start()
+    
+    assert container.sprint_service is sprint_service
+    assert container.llm_service is sprint_service.llm_service
+    assert container.pinecone_service is None
+    await container.stop()
+
+
+@pytest.mark.asyncio
+async def test_container_revalidates_pinecone_index(fake_llm, monkeypatch):
+    """Test the index is re-checked in the background, not per request"""
+    monkeypatch.setattr(settings, "PINECONE_REVALIDATE_SECONDS", 0.01)
+    container = ServiceContainer()
+    pinecone = FakePineconeService()
+    container._sprint_service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    container._sprint_service.pinecone_service = pinecone
+    
+    await container.start()
+    await asyncio.sleep(0.1)
+    await container.stop()
+    
+    assert pinecone.revalidations >= 2
+    count = pinecone.revalidations
+    await asyncio.sleep(0.05)
+    assert pinecone.revalidations == count
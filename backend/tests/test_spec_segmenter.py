@@ -0,0 +1,42 @@
+"""
+Tests for spec segmentation and diffing
+"""
+from pathlib import Path
+from app.utils.spec_segmenter import segment_spec, diff_sections, match_sections
+
+EXAMPLE_SPEC = Path(__file__).resolve().parents[2] / "examples" / "example_spec.txt"
+
+
+def test_segment_example_spec_by_headings():
+    """Test ALL CAPS and numbered headings start sections"""
+    sections = segment_spec(EXAMPLE_SPEC.read_text())
+    keys = [section["key"] for section in sections]
+    assert keys[:4] == ["preamble", "overview", "core features", "user management"]
+    assert "shopping cart" in keys and "technical requirements" in keys
+
+
+def test_diff_ignores_renumbering_and_whitespace():
+    """Test sections are matched by heading, and reformatting is not a change"""
+    old = segment_spec("# Cart\nAdd items.\n\n# Checkout\nPay by card.\n")
+    new = segment_spec("# Cart\nAdd   items.\n\n# Checkout\nPay by card or wallet.\n\n# Search\nFind products.\n")
+    diff = diff_sections(old, new)
+    assert [new["key"] for _, new in diff["unchanged"]] == ["cart"]
+    assert [new["key"] for _, new in diff["changed"]] == ["checkout"]
+    assert [section["key"] for section in diff["added"]] == ["search"]
+    assert diff["removed"] == []
+
+
+def test_specs_without_headings_split_into_paragraphs():
+    sections = segment_spec("Users can log in.\n\nAdmins can ban users.")
+    assert len(sections) == 2
+    assert all(section["key"].startswith("paragraph:") for section in sections)
+
+
+def test_match_sections_by_word_overlap():
+    sections = segment_spec(EXAMPLE_SPEC.read_text())
+    matches = match_sections("Shopping Cart: add items, update quantities and discount codes", sections)
+    assert [sections[i]["key"] for i in matches] == ["shopping cart"]
+    checkout = match_sections("Checkout and Payment Processing: cart checkout, payment gateway integration, order confirmation", sections)
+    assert [sections[i]["key"] for i in checkout] == ["checkout process"]
+    # Words shared only with the spec's title and overview are not enough to place an epic
+    assert match_sections("Platform Infrastructure: scalable backend, security and deployment", sections) == []
@@ -0,0 +1,248 @@
+"""
+Tests for sprint service pipeline orchestration
+"""
+import pytest
+from app.models.project import Epic, Story, Task
+from app.services.sprint_service import SprintService
+from app.services.checkpoint_service import CheckpointStore, spec_hash
+from app.utils.timing import StageTimer
+from app.core.config import settings
+from tests.conftest import FakeLLMService
+
+
+@pytest.mark.asyncio
+async def test_sprint_plan_counts(db, project, fake_llm):
+    """Test the full pipeline persists the whole hierarchy"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec")
+    
+    assert plan["epics"] == 3
+    assert plan["stories"] == 6
+    assert plan["tasks"] == 12
+    assert db.query(Epic).count() == 3
+    assert db.query(Story).count() == 6
+    assert db.query(Task).count() == 12
+
+
+@pytest.mark.asyncio
+async def test_story_generation_respects_concurrency_limit(db, project, fake_llm):
+    """Test story fan-out never exceeds the configured concurrency"""
+    fake_llm.epic_count = 5
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    await service.process_spec_to_sprint_plan(db, project.id, "spec", story_concurrency=2)
+    
+    assert fake_llm.max_in_flight["generate_stories"] == 2
+    assert fake_llm.calls.count("generate_stories") == 5
+
+
+@pytest.mark.asyncio
+async def test_story_generation_keeps_epic_order(db, project, fake_llm):
+    """Test stories come back grouped in epic order even when calls finish out of order"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    epics, stories, tasks = await service._generate_plan_items(
+        db, project.id, "spec", None, story_concurrency=3, task_concurrency=3, timer=StageTimer(),
+        checkpoints=CheckpointStore(db, project.id, spec_hash("spec"))
+    )
+    
+    assert [story["title"] for story in stories] == [
+        f"Epic {i} / Story {j}" for i in range(3) for j in range(2)
+    ]
+    assert [task["story_id"] for task in tasks] == [story["id"] for story in stories for _ in range(2)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_stages(db, project, fake_llm):
+    """Test task generation starts before the last epic's stories are back"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec")
+    
+    timings = plan["stage_timings"]
+    assert timings["tasks"]["started"] < timings["stories"]["finished"]
+    assert timings["stories"]["items"] == 3
+    # One batched task call per epic
+    assert timings["tasks"]["items"] == 3
+
+
+@pytest.mark.asyncio
+async def test_batched_tasks_fall_back_for_missing_stories(db, project, fake_llm, monkeypatch):
+    """Test only stories missing from a batched answer get single-story calls"""
+    monkeypatch.setattr(settings, "TASK_BATCH_MAX_STORIES", 3)
+    fake_llm.epic_count = 1
+    fake_llm.stories_per_epic = 5
+    fake_llm.drop_from_batch = {1}
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec")
+    
+    assert plan["tasks"] == 10
+    # Batches of 3 and 2 stories, each missing its second story
+    assert fake_llm.calls.count("generate_tasks_batch") == 2
+    assert fake_llm.calls.count("generate_tasks") == 2
+
+
+@pytest.mark.asyncio
+async def test_rerun_resumes_from_checkpoints(db, project, fake_llm):
+    """Test a re-run after a provider failure only generates the missing tasks"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    generate_tasks_batch = fake_llm.generate_tasks_batch
+    
+    async def flaky_batch(stories, provider=None):
+        if fake_llm.calls.count("generate_tasks_batch") == 2:
+            raise ConnectionError("Could not connect to Ollama")
+        return await generate_tasks_batch(stories, provider)
+    
+    fake_llm.generate_tasks_batch = flaky_batch
+    with pytest.raises(ConnectionError):
+        await service.process_spec_to_sprint_plan(db, project.id, "spec", task_concurrency=1)
+    
+    fake_llm.generate_tasks_batch = generate_tasks_batch
+    fake_llm.calls.clear()
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec", task_concurrency=1)
+    
+    assert (plan["epics"], plan["stories"], plan["tasks"]) == (3, 6, 12)
+    # Two of the three task batches succeeded before the failure
+    assert plan["resumed"] == {"epics": 3, "stories": 6, "tasks": 8}
+    assert "extract_epics" not in fake_llm.calls
+    assert "generate_stories" not in fake_llm.calls
+    assert fake_llm.calls.count("generate_tasks_batch") == 1
+    # Nothing was duplicated
+    assert db.query(Epic).count() == 3
+    assert db.query(Story).count() == 6
+    assert db.query(Task).count() == 12
+
+
+@pytest.mark.asyncio
+async def test_rerun_without_resume_starts_over(db, project, fake_llm):
+    """Test resume=False ignores checkpoints from a completed run"""
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    await service.process_spec_to_sprint_plan(db, project.id, "spec")
+    
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec", resume=False)
+    assert plan["resumed"] == {"epics": 0, "stories": 0, "tasks": 0}
+    assert db.query(Epic).count() == 6
+
+
+def test_plan_task_batches_respects_context_window(fake_llm, monkeypatch):
+    """Test batches shrink when stories would overflow the context window"""
+    monkeypatch.setattr(settings, "TASK_BATCH_MAX_STORIES", 10)
+    small = [{"description": "As a user I want to log in", "acceptance_criteria": "1. Works"}] * 8
+    large = [{"description": "word " * 1200, "acceptance_criteria": ""}] * 3
+    
+    assert all(len(batch) <= 4 for batch in fake_llm.plan_task_batches(small))
+    assert fake_llm.plan_task_batches(large) == [[0], [1], [2]]
+
+
+class SectionedFakeLLMService(FakeLLMService):
+    """Extracts one epic per '## Feature n' heading of the spec it is given"""
+    
+    async def extract_epics(self, spec_content, provider=None):
+        await self._track("extract_epics", self.delay)
+        self.extracted_specs = getattr(self, "extracted_specs", []) + [spec_content]
+        blocks = [block for block in spec_content.split("## ") if block.strip()]
+        return [
+            {"title": block.splitlines()[0].strip(), "description": " ".join(block.splitlines()[1:]), "priority": "high", "estimated_effort": 8}
+            for block in blocks
+        ]
+
+
+SECTIONED_SPEC = """## Feature 0
+Shopping cart with quantities and saved carts.
+
+## Feature 1
+Checkout with card payments and invoices.
+
+## Feature 2
+Order history, tracking and refunds.
+"""
+
+
+@pytest.mark.asyncio
+async def test_incremental_regeneration_only_redoes_changed_sections(db, project):
+    """Test editing one spec section regenerates only the epic built from it"""
+    fake_llm = SectionedFakeLLMService()
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    first = await service.process_spec_to_sprint_plan(db, project.id, SECTIONED_SPEC)
+    assert first["epics"] == 3
+    kept_titles = {"Feature 0", "Feature 2"}
+    kept_ids = {epic.id for epic in db.query(Epic) if epic.title in kept_titles}
+    
+    fake_llm.calls.clear()
+    revised = SECTIONED_SPEC.replace("card payments", "card and wallet payments")
+    plan = await service.process_spec_to_sprint_plan(db, project.id, revised, incremental=True)
+    
+    assert plan["spec_changes"]["sections_changed"] == 1
+    assert plan["spec_changes"]["epics_kept"] == 2
+    assert (plan["epics"], plan["stories"], plan["tasks"]) == (3, 6, 12)
+    assert fake_llm.extracted_specs[-1].startswith("## Feature 1")
+    assert "Feature 0" not in fake_llm.extracted_specs[-1]
+    assert fake_llm.calls.count("generate_stories") == 1
+    assert {epic.id for epic in db.query(Epic) if epic.title in kept_titles} == kept_ids
+    assert db.query(Epic).count() == 3
+    assert db.query(Story).count() == 6
+
+
+@pytest.mark.asyncio
+async def test_incremental_regeneration_drops_removed_sections(db, project):
+    """Test removing a section deletes its epic without calling the LLM"""
+    fake_llm = SectionedFakeLLMService()
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    await service.process_spec_to_sprint_plan(db, project.id, SECTIONED_SPEC)
+    
+    fake_llm.calls.clear()
+    revised = SECTIONED_SPEC.split("## Feature 2")[0]
+    plan = await service.process_spec_to_sprint_plan(db, project.id, revised, incremental=True)
+    
+    assert plan["spec_changes"]["epics_removed"] == 1
+    assert plan["epics"] == 2
+    assert fake_llm.calls == ["estimate_timeline"]
+
+
+@pytest.mark.asyncio
+async def test_incremental_regeneration_keeps_stale_epics_until_replaced(db, project):
+    """Test a failed incremental run leaves the old plan in place and a retry swaps it out"""
+    fake_llm = SectionedFakeLLMService()
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    await service.process_spec_to_sprint_plan(db, project.id, SECTIONED_SPEC)
+    stale_id = next(epic.id for epic in db.query(Epic) if epic.title == "Feature 1")
+    
+    generate_stories = fake_llm.generate_stories
+    
+    async def failing_stories(*args, **kwargs):
+        raise ConnectionError("LLM unavailable")
+    
+    fake_llm.generate_stories = failing_stories
+    revised = SECTIONED_SPEC.replace("card payments", "card and wallet payments")
+    with pytest.raises(ConnectionError):
+        await service.process_spec_to_sprint_plan(db, project.id, revised, incremental=True)
+    assert db.get(Epic, stale_id) is not None
+    assert db.query(Story).filter(Story.epic_id == stale_id).count() == 2
+    
+    fake_llm.generate_stories = generate_stories
+    plan = await service.process_spec_to_sprint_plan(db, project.id, revised, incremental=True)
+    assert plan["spec_changes"]["epics_removed"] == 1
+    assert plan["resumed"]["epics"] == 1
+    assert db.get(Epic, stale_id) is None
+    assert db.query(Epic).count() == 3
+    assert db.query(Story).count() == 6
+
+
+@pytest.mark.asyncio
+async def test_incremental_regeneration_redoes_sections_sharing_a_stale_epic(db, project):
+    """Test editing one of two sections an epic came from regenerates both and keeps the rest"""
+    fake_llm = SectionedFakeLLMService()
+    service = SprintService(llm_service=fake_llm, with_vector_store=False)
+    spec = SECTIONED_SPEC.replace("Order history, tracking and refunds.", "Refunds of card payments and invoices.")
+    await service.process_spec_to_sprint_plan(db, project.id, spec)
+    kept_id = next(epic.id for epic in db.query(Epic) if epic.title == "Feature 0")
+    
+    fake_llm.calls.clear()
+    revised = spec.replace("Refunds of card", "Partial refunds of card")
+    plan = await service.process_spec_to_sprint_plan(db, project.id, revised, incremental=True)
+    
+    assert plan["spec_changes"]["sections_changed"] == 1
+    assert plan["spec_changes"]["sections_regenerated"] == 2
+    assert plan["spec_changes"]["epics_kept"] == 1
+    assert fake_llm.extracted_specs[-1].startswith("## Feature 1")
+    assert "Partial refunds" in fake_llm.extracted_specs[-1]
+    assert sorted(epic.title for epic in db.query(Epic)) == ["Feature 0", "Feature 1", "Feature 2"]
+    assert db.get(Epic, kept_id) is not None
+    assert (plan["epics"], plan["stories"], plan["tasks"]) == (3, 6, 12)
@@ -0,0 +1,95 @@
+"""
+Tests for structured LLM output: JSON mode, validation and targeted repair
+"""
+import json
+import httpx
+import pytest
+from app.schemas.generation import StoryDraft, validate_item
+from app.services.llm_provider import LLMProvider, OllamaProvider, OpenAIProvider
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers with the next scripted text and records every call"""
+    
+    provider_name = "ollama"
+    model = "test"
+    
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+    
+    async def generate_text(self, messages, options=None):
+        self.calls.append((messages, options or {}))
+        return {"text": self.answers.pop(0), "usage": {}}
+
+
+def test_validate_item_normalizes_fields():
+    """Test priorities are normalized and list criteria become text"""
+    story, error = validate_item(
+        {"title": " Login ", "priority": "Urgent", "acceptance_criteria": ["Works", "Is fast"], "estimated_effort": "5"},
+        StoryDraft
+    )
+    
+    assert error is None
+    assert story["title"] == "Login" and story["priority"] == "critical"
+    assert story["acceptance_criteria"] == "1. Works\n2. Is fast"
+    assert story["estimated_effort"] == 5.0
+    
+    story, error = validate_item({"title": "Login", "priority": "someday"}, StoryDraft)
+    assert story is None and "priority" in error
+
+
+@pytest.mark.asyncio
+async def test_only_invalid_items_are_repaired(llm_service_for):
+    """Test one repair call is made for the invalid story and the valid ones are kept as is"""
+    answer = json.dumps({"stories": [
+        {"title": "A", "priority": "high", "estimated_effort": 3},
+        {"title": "B", "priority": "whenever", "estimated_effort": 2},
+        {"title": "C", "priority": "low", "estimated_effort": 1},
+    ]})
+    repaired = json.dumps({"title": "B", "priority": "medium", "estimated_effort": 2})
+    provider = ScriptedProvider([answer, repaired])
+    
+    stories = await llm_service_for(provider).generate_stories("Epic 0: Accounts")
+    
+    assert [(s["title"], s["priority"]) for s in stories] == [("A", "high"), ("B", "medium"), ("C", "low")]
+    assert len(provider.calls) == 2
+    repair_prompt = provider.calls[1][0][-1]["content"]
+    assert "whenever" in repair_prompt and '"A"' not in repair_prompt
+    assert all(options["json_mode"] for _, options in provider.calls)
+
+
+@pytest.mark.asyncio
+async def test_malformed_item_is_dropped_after_failed_repair(llm_service_for):
+    """Test an element that is not valid JSON is re-asked once, then dropped"""
+    answer = '[{"title": "A", "estimated_hours": 2}, {"title": "B", "estimated_hours": }]'
+    provider = ScriptedProvider([answer, "still not json"])
+    
+    tasks = await llm_service_for(provider).generate_tasks("As a user...", "1. Works")
+    
+    assert [t["title"] for t in tasks] == ["A"]
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_providers_request_native_json_mode():
+    """Test json_mode sets Ollama's format and OpenAI's response_format"""
+    payloads = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        if request.url.path.endswith("/api/chat"):
+            return httpx.Response(200, json={"message": {"content": "{}"}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}], "usage": {}})
+    
+    client = httpx.AsyncClient(base_url="https://api.openai.com/v1", transport=httpx.MockTransport(handler))
+    messages = [{"role": "user", "content": "epics"}]
+    await OllamaProvider(base_url="http://ollama:11434", model="llama3", client=client).generate_text(messages, {"json_mode": True})
+    openai = OpenAIProvider(api_key="test", client=client)
+    await openai.generate_text(messages, {"json_mode": True})
+    await openai.generate_text(messages)
+    
+    assert payloads[0]["format"] == "json"
+    assert payloads[1]["response_format"] == {"type": "json_object"}
+    assert "response_format" not in payloads[2]
+    await client.aclose()
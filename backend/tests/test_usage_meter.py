@@ -0,0 +1,70 @@
+"""
+Tests for LLM usage metering
+"""
+import json
+import pytest
+from app.models.llm_usage import LLMUsageRollup
+from app.services.llm_provider import LLMProvider
+from app.services.sprint_service import SprintService
+from app.services.usage_meter import metered, usage_rollups
+
+ANSWERS = {
+    "extract_epics": {"epics": [{"title": "Accounts", "description": "Sign up", "priority": "high", "estimated_effort": 8}]},
+    "generate_stories": {"stories": [
+        {"title": "Sign up", "description": "As a user...", "acceptance_criteria": "1. Works", "priority": "medium", "estimated_effort": 3}
+    ]},
+    "generate_tasks": {"tasks": [{"title": "Form", "description": "Build it", "estimated_hours": 2, "priority": "low"}]},
+    "estimate_timeline": {"estimated_sprints": 1, "sprint_duration_weeks": 2},
+}
+
+
+class StageProvider(LLMProvider):
+    """Answers each stage with valid JSON and reports fixed token usage"""
+    
+    provider_name = "groq"
+    model = "llama-test"
+    
+    async def generate_text(self, messages, options=None):
+        stage = (options or {}).get("stage")
+        return {
+            "text": json.dumps(ANSWERS[stage]),
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+            "retries": 1 if stage == "estimate_timeline" else 0
+        }
+
+
+@pytest.mark.asyncio
+async def test_meter_records_calls_and_cache_hits(llm_service_for):
+    """Test tokens are summed per stage and cached answers spend none"""
+    service = llm_service_for(StageProvider())
+    with metered() as meter:
+        await service.generate_tasks("As a user...", "1. Works")
+        await service.generate_tasks("As a user...", "1. Works")
+    
+    summary = meter.summary()
+    assert (summary["calls"], summary["cached_calls"], summary["total_tokens"]) == (2, 1, 120)
+    assert summary["by_stage"]["generate_tasks"]["prompt_tokens"] == 100
+    # The stage profile picks the model
+    assert list(summary["by_provider"]) == ["groq:llama-3.1-8b-instant"]
+
+
+@pytest.mark.asyncio
+async def test_sprint_plan_reports_and_persists_usage(db, project, llm_service_for):
+    """Test the plan carries a usage summary and rollups accumulate per job, project and user"""
+    service = SprintService(llm_service=llm_service_for(StageProvider()), with_vector_store=False)
+    
+    plan = await service.process_spec_to_sprint_plan(db, project.id, "spec", job_id="job-1", use_cache=False)
+    
+    usage = plan["usage"]
+    assert set(usage["by_stage"]) == {"extract_epics", "generate_stories", "generate_tasks", "estimate_timeline"}
+    assert usage["calls"] == 4 and usage["total_tokens"] == 480 and usage["retries"] == 1
+    for scope, scope_id in (("job", "job-1"), ("project", project.id), ("user", project.owner_id)):
+        rollups = usage_rollups(db, scope, scope_id)
+        assert sum(row["total_tokens"] for row in rollups) == 480
+    
+    await service.process_spec_to_sprint_plan(db, project.id, "spec", job_id="job-2", use_cache=False, resume=False)
+    
+    project_rows = usage_rollups(db, "project", project.id)
+    assert sum(row["calls"] for row in project_rows) == 8
+    assert {row["stage"] for row in project_rows} == set(usage["by_stage"])
+    assert db.query(LLMUsageRollup).filter(LLMUsageRollup.scope == "job").count() == 8
@@ -0,0 +1,130 @@
+"""
+Tests for the in-process vector index and the local vector store
+"""
+import numpy as np
+import pytest
+from app.models import SprintHistory
+from app.services.embedder import Embedder
+from app.services.local_vector_service import LocalVectorService
+from app.services.vector_index import VectorIndex
+
+
+class FakeEmbeddings(Embedder):
+    """Embeds text as letter counts, so similar texts get similar vectors"""
+    
+    name = "letters"
+    dimension = 26
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def embed(self, texts):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 26
+            for char in text.lower():
+                if "a" <= char <= "z":
+                    vector[ord(char) - ord("a")] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+def brute_force(vectors, query, top_k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:top_k])
+
+
+def test_query_matches_brute_force_and_filters_by_project():
+    """Test top-k is exact, best first, and limited to the project when asked"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    index = VectorIndex(32)
+    index.add_many([(i, i % 5, vectors[i], float(i), {"n": i}) for i in range(500)])
+    query = rng.normal(size=32).astype(np.float32)
+    
+    matches = index.query(query, top_k=10)
+    assert [m["id"] for m in matches] == brute_force(vectors, query, 10)
+    assert matches[0]["score"] >= matches[-1]["score"]
+    assert matches[0]["metadata"] == {"n": matches[0]["id"]}
+    
+    in_project = index.query(query, top_k=10, project_id=3)
+    rows = [i for i in range(500) if i % 5 == 3]
+    assert [m["id"] for m in in_project] == [rows[i] for i in brute_force(vectors[rows], query, 10)]
+    assert index.query(query, top_k=3, project_id=99) == []
+
+
+def test_add_replaces_rows_with_the_same_id():
+    """Test re-adding an id updates its vector and data instead of duplicating it"""
+    index = VectorIndex(3)
+    index.add(1, 1, [1, 0, 0], velocity=10)
+    index.add(2, 1, [0, 1, 0], velocity=20)
+    index.add(1, 2, [0, 0, 1], velocity=30)
+    
+    assert len(index) == 2
+    best = index.query([0, 0, 1], top_k=1)[0]
+    assert (best["id"], best["project_id"], best["velocity"]) == (1, 2, 30)
+    assert index.query([1, 0, 0], top_k=5, project_id=1)[0]["id"] == 2
+    with pytest.raises(ValueError):
+        index.add(3, 1, [1, 0])
+
+
+def test_save_and_load_memory_maps_the_matrix(tmp_path):
+    """Test a saved index loads memory-mapped, answers the same and copies on write"""
+    rng = np.random.default_rng(1)
+    index = VectorIndex(16)
+    index.add_many([(i, 1, rng.normal(size=16), 5.0, {}) for i in range(100)])
+    index.info["source"] = [100, 100]
+    path = str(tmp_path / "index.npy")
+    index.save(path)
+    assert not index.dirty
+    
+    loaded = VectorIndex.load(path)
+    query = rng.normal(size=16)
+    assert isinstance(loaded._vectors, np.memmap)
+    assert loaded.info == {"source": [100, 100]}
+    assert loaded.query(query, top_k=5) == index.query(query, top_k=5)
+    
+    loaded.add(1000, 1, query)
+    assert not isinstance(loaded._vectors, np.memmap)
+    assert loaded.query(query, top_k=1)[0]["id"] == 1000
+    assert len(VectorIndex.load(path)) == 100
+
+
+@pytest.mark.asyncio
+async def test_local_store_persists_history_and_predicts_velocity(session_factory, tmp_path):
+    """Test stored sprints land in SprintHistory and the saved index, and drive predictions"""
+    path = str(tmp_path / "sprints.npy")
+    store = LocalVectorService(embeddings=FakeEmbeddings(), path=path, session_factory=session_factory)
+    assert await store.find_similar_sprints("anything") == []
+    
+    await store.store_sprint_embedding(1, 7, {"name": "Auth sprint", "velocity": 30, "tasks": [{"title": "Login form"}]})
+    await store.store_sprint_embedding(2, 7, {"name": "Billing sprint", "velocity": 10})
+    await store.store_sprint_embedding(3, 8, {"name": "Auth sprint", "velocity": 50})
+    await store.store_sprint_embedding(1, 7, {"name": "Auth sprint", "velocity": 40, "tasks": [{"title": "Login form"}]})
+    
+    db = session_factory()
+    assert db.query(SprintHistory).count() == 3
+    db.close()
+    similar = await store.find_similar_sprints("Sprint: Auth sprint", project_id=7, top_k=5)
+    assert [s["sprint_id"] for s in similar] == [1, 2]
+    assert similar[0]["velocity"] == 40
+    
+    prediction = await store.predict_velocity("Auth sprint", project_id=7)
+    assert prediction["based_on_sprints"] == 2
+    assert 10 < prediction["predicted_velocity"] < 40
+    
+    store.close()
+    reopened = LocalVectorService(embeddings=FakeEmbeddings(), path=path, session_factory=session_factory)
+    assert isinstance(reopened.get_index()._vectors, np.memmap)
+    assert len(reopened.get_index()) == 3
+    
+    # History added elsewhere makes the saved index stale; it is rebuilt from the database
+    db = session_factory()
+    db.add(SprintHistory(project_id=8, sprint_name="Imported", velocity=12, embedding="[" + ", ".join(["1.0"] * 26) + "]"))
+    db.commit()
+    db.close()
+    reopened.revalidate()
+    assert len(reopened.get_index()) == 4
+    assert not isinstance(reopened.get_index()._vectors, np.memmap)
@@ -34,6 +34,23 @@ api.interceptors.response.use(
 
 export default api
 
+const JOB_POLL_INTERVAL_MS = 2000
+
+// Poll a background generation job until it finishes; resolves like an axios response
+const waitForJob = async (jobId: string) => {
+  while (true) {
+    const { data: job } = await api.get(`/jobs/${jobId}`)
+    if (job.status === 'completed') {
+      return { data: job.result }
+    }
+    if (job.status === 'failed') {
+      // Same shape as an axios error so callers can read response.data.detail
+      throw { response: { data: { detail: job.error || 'Failed to generate sprint plan' } } }
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+}
+
 // Auth API
 export const authAPI = {
   register: (data: { email: string; password: string; full_name?: string }) =>
@@ -58,8 +75,44 @@ export const projectsAPI = {
       headers: { 'Content-Type': 'multipart/form-data' },
     })
   },
-  generateSprintPlan: (id: number, llm_provider: string = 'ollama') =>
-    api.post(`/projects/${id}/generate-sprint-plan?llm_provider=${llm_provider}`),
+  generateSprintPlan: async (id: number, llm_provider: string = 'ollama') => {
+    const { data } = await api.post(`/projects/${id}/generate-sprint-plan?llm_provider=${llm_provider}`)
+    return waitForJob(data.job_id)
+  },
+  getJob: (job_id: string) => api.get(`/jobs/${job_id}`),
+  // Stream generation progress (server-sent events); EventSource cannot send the auth header
+  streamSprintPlan: async (
+    id: number,
+    onEvent: (event: string, data: any) => void,
+    llm_provider: string = 'ollama'
+  ) => {
+    const response = await fetch(
+      `${API_URL}/api/v1/projects/${id}/generate-sprint-plan/stream?llm_provider=${llm_provider}`,
+      { headers: { Authorization: `Bearer ${localStorage.getItem('token') || ''}` } }
+    )
+    if (!response.ok || !response.body) {
+      throw { response: { status: response.status, data: { detail: 'Failed to start sprint plan generation' } } }
+    }
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const blocks = buffer.split('\n\n')
+      buffer = blocks.pop() || ''
+      for (const block of blocks) {
+        let event = 'message'
+        let data = ''
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+        if (data) onEvent(event, JSON.parse(data))
+      }
+    }
+  },
   getEpics: (id: number) => api.get(`/projects/${id}/epics`),
   getStories: (id: number, epic_id?: number) =>
     api.get(`/projects/${id}/stories${epic_id ? `?epic_id=${epic_id}` : ''}`),
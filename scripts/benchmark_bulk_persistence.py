@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark DB time for persisting a generated plan: per-row ORM flushes
+(the old pipeline) against the bulk INSERT ... RETURNING layer.
+
+Usage:
+    python scripts/benchmark_bulk_persistence.py
+    python scripts/benchmark_bulk_persistence.py --latency-ms 20
+    python scripts/benchmark_bulk_persistence.py --database-url postgresql://...
+
+--latency-ms adds a sleep before every statement to mimic the round trip
+to a remote database (e.g. Supabase/Render) when running against SQLite.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+# The app's engine is never used here but is created on import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smartplanner-unused.db')}")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import User, Project, Epic, Story, Task
+from app.services.plan_persistence import insert_epics, insert_stories, insert_tasks
+
+STORIES_PER_EPIC = 3
+TASKS_PER_STORY = 4
+TASK_BATCH_STORIES = 6
+
+
+def make_plan(task_count: int):
+    """Epic/story/task payloads shaped like LLM output, with exactly `task_count` tasks"""
+    stories = max(1, -(-task_count // TASKS_PER_STORY))
+    epics = max(1, -(-stories // STORIES_PER_EPIC))
+    plan = []
+    remaining_stories, remaining_tasks = stories, task_count
+    for e in range(epics):
+        epic_stories = []
+        for s in range(min(STORIES_PER_EPIC, remaining_stories)):
+            count = min(TASKS_PER_STORY, remaining_tasks)
+            remaining_tasks -= count
+            epic_stories.append((
+                {"title": f"Story {e}.{s}", "description": "As a user...", "acceptance_criteria": "1. Works", "priority": "medium", "estimated_effort": 3},
+                [{"title": f"Task {e}.{s}.{t}", "description": "Do it", "estimated_hours": 2, "priority": "low"} for t in range(count)]
+            ))
+        remaining_stories -= len(epic_stories)
+        plan.append(({"title": f"Epic {e}", "description": "Epic", "priority": "high", "estimated_effort": 13}, epic_stories))
+    return plan
+
+
+def persist_per_row(db, project_id, plan):
+    """The previous pipeline: add + flush for every object, commit at the end"""
+    for epic_data, stories in plan:
+        epic = Epic(project_id=project_id, **epic_data)
+        db.add(epic)
+        db.flush()
+        for story_data, tasks in stories:
+            story = Story(epic_id=epic.id, **story_data)
+            db.add(story)
+            db.flush()
+            for task_data in tasks:
+                task = Task(story_id=story.id, **task_data)
+                db.add(task)
+                db.flush()
+    db.commit()
+
+
+def persist_bulk(db, project_id, plan):
+    """The bulk layer as the pipeline uses it: one INSERT per epic, story set and task batch"""
+    for epic_data, stories in plan:
+        epic = insert_epics(db, project_id, [epic_data])[0]
+        db.commit()
+        story_records = insert_stories(db, epic["id"], [story_data for story_data, _ in stories])
+        db.commit()
+        for start in range(0, len(stories), TASK_BATCH_STORIES):
+            batch = list(zip(story_records, stories))[start:start + TASK_BATCH_STORIES]
+            insert_tasks(db, [(record["id"], tasks) for record, (_, tasks) in batch])
+            db.commit()
+
+
+def run(database_url: str, latency_ms: float, sizes):
+    engine = create_engine(database_url)
+    statements = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements["count"] += 1
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    db = Session()
+    user = User(email=f"bench-{time.time()}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    project = Project(name="Benchmark", owner_id=user.id)
+    db.add(project)
+    db.commit()
+    project_id = project.id
+    db.close()
+
+    print(f"{'tasks':>6} {'mode':>8} {'statements':>11} {'db time (s)':>12}")
+    for size in sizes:
+        plan = make_plan(size)
+        results = {}
+        for mode, persist in (("per-row", persist_per_row), ("bulk", persist_bulk)):
+            db = Session()
+            statements["count"] = 0
+            started = time.perf_counter()
+            persist(db, project_id, plan)
+            elapsed = time.perf_counter() - started
+            db.close()
+            results[mode] = elapsed
+            print(f"{size:>6} {mode:>8} {statements['count']:>11} {elapsed:>12.4f}")
+        print(f"{'':>6} {'speedup':>8} {'':>11} {results['per-row'] / results['bulk']:>11.1f}x")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated round-trip latency per statement")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Plan sizes in tasks")
+    args = parser.parse_args()
+
+    if args.database_url:
+        run(args.database_url, args.latency_ms, args.sizes)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        run(f"sqlite:///{os.path.join(directory, 'benchmark.db')}", args.latency_ms, args.sizes)
+
+
+if __name__ == "__main__":
+    main()
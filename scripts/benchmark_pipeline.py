@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark the whole planning pipeline (SprintService.process_spec_to_sprint_plan)
+offline, on SQLite, with a replay provider standing in for the LLM.
+
+Runs examples/example_spec.txt and synthetic specs of increasing size (one
+"## Feature" section per epic) and reports wall time, LLM calls, simulated
+429 retries and the time spent in database statements.
+
+Answers come from a JSONL fixture file recorded from a real provider
+(--fixtures); requests the fixtures do not cover, and every request when
+no fixtures are given, are answered by a synthetic responder that derives
+epics from the spec's headings. Latency and 429s are simulated per call.
+
+Usage:
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --latency lognormal:0.8,0.5 --rate-limit-rate 0.05
+    python scripts/benchmark_pipeline.py --fixtures fixtures/example.jsonl --latency recorded
+
+Record fixtures from the configured provider (LLM_PROVIDER etc.) first with:
+    python scripts/benchmark_pipeline.py --record fixtures/example.jsonl
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+# The app's engine is never used here but is created on import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smartplanner-unused.db')}")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models import User, Project
+from app.services.llm_service import LLMService
+from app.services.replay_provider import ReplayProvider, load_fixtures, synthetic_responder
+from app.services.sprint_service import SprintService
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_spec.txt')
+
+
+def synthetic_spec(epics: int) -> str:
+    """A specification with one feature section per epic"""
+    sections = [f"Product Specification: Synthetic Platform ({epics} features)\n"]
+    for i in range(1, epics + 1):
+        sections.append(
+            f"## Feature {i}: Capability {i}\n"
+            f"Users can manage the records of capability {i} from the web app.\n"
+            f"- Create, edit and archive capability {i} records\n"
+            f"- Search and filter them, with pagination\n"
+            f"- Audit log of every change\n"
+            f"- Email notifications when a record changes\n"
+        )
+    return "\n".join(sections)
+
+
+def make_service(provider) -> SprintService:
+    return SprintService(llm_service=LLMService(backend=provider), with_vector_store=False)
+
+
+def timed_engine(database_url: str):
+    """Engine that sums the time spent executing statements"""
+    engine = create_engine(database_url)
+    db_time = {"seconds": 0.0, "statements": 0}
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_time["seconds"] += time.perf_counter() - conn.info["query_started"].pop()
+        db_time["statements"] += 1
+    
+    return engine, db_time
+
+
+async def plan_once(Session, service: SprintService, name: str, spec: str):
+    db = Session()
+    try:
+        user = User(email=f"bench-{name}-{time.time()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        project = Project(name=f"Benchmark {name}", owner_id=user.id)
+        db.add(project)
+        db.commit()
+        return await service.process_spec_to_sprint_plan(db, project.id, spec, use_cache=False, resume=False)
+    finally:
+        db.close()
+
+
+def run(database_url: str, specs, args):
+    records = load_fixtures(args.fixtures) if args.fixtures else []
+    engine, db_time = timed_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    
+    print(f"{'spec':<16} {'epics':>5} {'stories':>7} {'tasks':>6} {'llm calls':>9} {'429s':>5} "
+          f"{'wall (s)':>9} {'db (s)':>8} {'statements':>10}")
+    for name, spec in specs:
+        provider = ReplayProvider(
+            records, latency=args.latency, rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after, seed=args.seed, responder=synthetic_responder(args.stories, args.tasks)
+        )
+        service = make_service(provider)
+        db_time.update(seconds=0.0, statements=0)
+        started = time.perf_counter()
+        plan = asyncio.run(plan_once(Session, service, name, spec))
+        wall = time.perf_counter() - started
+        print(f"{name:<16} {plan['epics']:>5} {plan['stories']:>7} {plan['tasks']:>6} {plan['usage']['calls']:>9} {provider.rate_limited:>5} "
+              f"{wall:>9.3f} {db_time['seconds']:>8.3f} {db_time['statements']:>10}")
+    engine.dispose()
+
+
+def record(path: str, spec: str):
+    """Run the example spec once against the configured provider, recording its answers"""
+    settings.LLM_RECORD_PATH = path
+    service = SprintService(llm_service=LLMService(), with_vector_store=False)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'record.db')}")
+        Base.metadata.create_all(bind=engine)
+        asyncio.run(plan_once(sessionmaker(bind=engine, autoflush=False), service, "record", spec))
+        engine.dispose()
+    print(f"Recorded {len(load_fixtures(path))} responses to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec", default=DEFAULT_SPEC, help="Real specification to plan first")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 10, 25, 50], help="Synthetic spec sizes in epics")
+    parser.add_argument("--fixtures", help="JSONL fixtures recorded from a real provider")
+    parser.add_argument("--record", metavar="PATH", help="Record fixtures from the configured provider and exit")
+    parser.add_argument("--latency", default="fixed:0", help="recorded[:scale], fixed:s, uniform:low,high or lognormal:median,sigma")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with a simulated 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Seconds a simulated 429 asks the caller to wait")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stories", type=int, default=3, help="Stories per epic (synthetic answers)")
+    parser.add_argument("--tasks", type=int, default=4, help="Tasks per story (synthetic answers)")
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    args = parser.parse_args()
+    
+    with open(args.spec, encoding="utf-8") as f:
+        example = f.read()
+    if args.record:
+        record(args.record, example)
+        return
+    
+    specs = [(os.path.basename(args.spec), example)] + [(f"synthetic-{n}", synthetic_spec(n)) for n in args.sizes]
+    if args.database_url:
+        run(args.database_url, specs, args)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        run(f"sqlite:///{os.path.join(directory, 'benchmark.db')}", specs, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark prompt token volume for one planning run, with the prompt
+builder's compaction off (templates and JSON sent as written, the old
+behaviour) and on.
+
+A recording provider stands in for the LLM, so no model is called; every
+stage of LLMService runs over a spec and the prompts it sends are counted.
+Also reports how much of each stage's prompt is a prefix shared by all of
+its calls (what Ollama's KV cache and provider prompt caching can reuse).
+
+Usage:
+    python scripts/benchmark_prompt_tokens.py
+    python scripts/benchmark_prompt_tokens.py --spec examples/example_spec.txt --epics 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smartplanner-unused.db')}")
+
+from app.core.config import settings
+from app.services.llm_cache import bypass_llm_cache
+from app.services.llm_provider import LLMProvider, count_tokens, estimate_prompt_tokens
+from app.services.llm_service import LLMService
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_spec.txt')
+
+
+class RecordingProvider(LLMProvider):
+    """Records every prompt and answers with canned, valid JSON for its stage"""
+    
+    provider_name = "ollama"
+    
+    def __init__(self, epics: int, stories: int, tasks: int):
+        self.model = settings.OLLAMA_MODEL
+        self.epics, self.stories, self.tasks = epics, stories, tasks
+        self.prompts = []
+    
+    async def generate_text(self, messages, options=None):
+        stage = (options or {}).get("stage", "")
+        self.prompts.append((stage, messages))
+        task = {"title": "Write the handler", "description": "Implement and test it", "estimated_hours": 3, "priority": "medium"}
+        answers = {
+            "extract_epics": {"epics": [
+                {"title": f"Epic {i}", "description": f"Everything needed for capability {i} of the platform", "priority": "high", "estimated_effort": 21}
+                for i in range(self.epics)
+            ]},
+            "generate_stories": {"stories": [
+                {"title": f"Story {i}", "description": "As a shopper, I want this so that I can buy faster",
+                 "acceptance_criteria": "1. It works\n2. It is fast\n3. It is logged", "priority": "medium", "estimated_effort": 5}
+                for i in range(self.stories)
+            ]},
+            "generate_tasks": {"tasks": [task] * self.tasks},
+            "estimate_timeline": {"estimated_sprints": 4, "sprint_duration_weeks": 2, "confidence_level": "medium", "risk_factors": []},
+            "groom_backlog": {"prioritized_items": [], "dependencies": [], "recommendations": "Ship the cart first"},
+        }
+        return {"text": json.dumps(answers.get(stage, {})), "usage": {}}
+
+
+async def run_pipeline(spec: str, provider: RecordingProvider):
+    """Every LLMService stage, in the order the planning pipeline calls them"""
+    service = LLMService(backend=provider)
+    epics = await service.extract_epics(spec)
+    stories = []
+    for epic in epics:
+        stories.extend(await service.generate_stories(f"{epic['title']}: {epic['description']}"))
+    fields = [{"description": story["description"], "acceptance_criteria": story["acceptance_criteria"]} for story in stories]
+    for batch in service.plan_task_batches(fields):
+        await service.generate_tasks_batch([fields[i] for i in batch])
+    await service.generate_tasks(fields[0]["description"], fields[0]["acceptance_criteria"])
+    await service.estimate_timeline(
+        f"Total effort: {sum(s['estimated_effort'] for s in stories)} story points. Predicted velocity: 20.0",
+        historical_context=json.dumps({"predicted_velocity": 20.0, "confidence": "low", "reason": "Pinecone not configured"})
+    )
+    backlog = [{"id": i, **story} for i, story in enumerate(stories)]
+    await service.groom_backlog(backlog)
+
+
+def shared_prefix_tokens(prompts) -> int:
+    """
+    Tokens of the longest prefix (system + user text) shared by the calls
+    of a stage that use the same system prompt (largest such group)
+    """
+    groups = {}
+    for messages in prompts:
+        groups.setdefault(messages[0]["content"], []).append("\n".join(m["content"] for m in messages))
+    texts = max(groups.values(), key=len)
+    prefix = os.path.commonprefix(texts) if len(texts) > 1 else ""
+    return count_tokens(prefix) if prefix else 0
+
+
+def measure(spec: str, compact: bool, epics: int, stories: int, tasks: int):
+    settings.LLM_PROMPT_COMPACT = compact
+    provider = RecordingProvider(epics, stories, tasks)
+    with bypass_llm_cache():
+        asyncio.run(run_pipeline(spec, provider))
+    by_stage = {}
+    for stage, messages in provider.prompts:
+        by_stage.setdefault(stage, []).append(messages)
+    return {
+        stage: (len(prompts), sum(map(estimate_prompt_tokens, prompts)), shared_prefix_tokens(prompts) if len(prompts) > 1 else None)
+        for stage, prompts in by_stage.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec", default=DEFAULT_SPEC, help="Specification file to plan")
+    parser.add_argument("--epics", type=int, default=6, help="Epics the fake model extracts")
+    parser.add_argument("--stories", type=int, default=4, help="Stories per epic")
+    parser.add_argument("--tasks", type=int, default=4, help="Tasks per story")
+    args = parser.parse_args()
+    
+    with open(args.spec, encoding="utf-8") as f:
+        spec = f.read()
+    before = measure(spec, False, args.epics, args.stories, args.tasks)
+    after = measure(spec, True, args.epics, args.stories, args.tasks)
+    
+    print(f"{'stage':<18} {'calls':>5} {'before':>8} {'after':>8} {'saved':>7} {'shared prefix/call':>19}")
+    total_before = total_after = 0
+    for stage, (calls, tokens_before, _) in before.items():
+        _, tokens_after, prefix = after[stage]
+        total_before += tokens_before
+        total_after += tokens_after
+        shared = f"{prefix} tok" if prefix is not None else "-"
+        print(f"{stage:<18} {calls:>5} {tokens_before:>8} {tokens_after:>8} {1 - tokens_after / tokens_before:>6.0%} {shared:>19}")
+    print(f"{'total':<18} {'':>5} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local vector index (app/services/vector_index.py) on random
+sprint embeddings: build time, save/load time, and query latency with and
+without a project filter, loaded in memory and memory-mapped.
+
+Usage:
+    python scripts/benchmark_vector_index.py
+    python scripts/benchmark_vector_index.py --sprints 10000 100000 --dimension 1536 --projects 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# Importing app.services loads the settings, which require these
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smartplanner-unused.db')}")
+
+import numpy as np
+from app.services.vector_index import VectorIndex
+
+
+def time_queries(index: VectorIndex, queries, projects: int, filtered: bool, top_k: int):
+    """Median and p99 query latency in milliseconds"""
+    latencies = []
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        index.query(query, top_k=top_k, project_id=i % projects if filtered else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sprints", type=int, nargs="+", default=[1000, 10000, 100000], help="Index sizes")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--projects", type=int, default=1000, help="Projects the sprints are spread over")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    queries = rng.normal(size=(args.queries, args.dimension)).astype(np.float32)
+    print(f"{'sprints':>8} {'build (s)':>9} {'save (s)':>8} {'load (s)':>8} {'storage':>7} "
+          f"{'all p50 (ms)':>12} {'all p99':>8} {'project p50':>11} {'project p99':>11}")
+    for count in args.sprints:
+        vectors = rng.normal(size=(count, args.dimension)).astype(np.float32)
+        index = VectorIndex(args.dimension)
+        started = time.perf_counter()
+        index.add_many([(i, i % args.projects, vectors[i], 20.0, {}) for i in range(count)])
+        build = time.perf_counter() - started
+        del vectors
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sprints.npy")
+            started = time.perf_counter()
+            index.save(path)
+            save = time.perf_counter() - started
+            started = time.perf_counter()
+            mapped = VectorIndex.load(path)
+            load = time.perf_counter() - started
+            
+            for name, target in (("memory", index), ("mmap", mapped)):
+                time_queries(target, queries[:10], args.projects, False, args.top_k)  # Warm up (page in the mmap)
+                all_p50, all_p99 = time_queries(target, queries, args.projects, False, args.top_k)
+                project_p50, project_p99 = time_queries(target, queries, args.projects, True, args.top_k)
+                print(f"{count:>8} {build:>9.2f} {save:>8.2f} {load:>8.3f} {name:>7} "
+                      f"{all_p50:>12.3f} {all_p99:>8.3f} {project_p50:>11.3f} {project_p99:>11.3f}")
+            del mapped
+
+
+if __name__ == "__main__":
+    main()
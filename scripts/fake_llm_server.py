@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Ollama and OpenAI-compatible (OpenAI, Groq) chat APIs, for
+load and resilience testing the real provider HTTP code without a model.
+
+Serves POST /api/chat (Ollama, JSON or newline-delimited JSON stream) and
+POST /chat/completions and /v1/chat/completions (OpenAI, JSON or server-sent
+events). Answers are valid planning JSON for whichever pipeline stage the
+system prompt belongs to (see replay_provider.synthetic_responder).
+
+Faults and limits are simulated per request, seeded:
+    --latency               time to first token (see replay_provider.LatencyModel)
+    --tokens-per-second     output throughput per request (0 = unlimited)
+    --max-rps               requests per second the server accepts; excess gets 429
+    --rate-limit-rate       share of requests answered 429 with retry-after
+    --error-rate            share of requests answered 500/502/503
+    --reset-rate            share of connections reset, before or mid-response
+
+Usage:
+    python scripts/fake_llm_server.py --port 11434
+    python scripts/fake_llm_server.py --port 8090 --latency lognormal:0.8,0.4 --rate-limit-rate 0.05
+
+Point the backend at it with OLLAMA_BASE_URL=http://127.0.0.1:11434, or
+OPENAI_BASE_URL / GROQ_BASE_URL=http://127.0.0.1:8090/v1 (any API key).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+# The app's engine is never used here but is created on import
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'smartplanner-unused.db')}")
+
+from app.services.llm_provider import count_tokens, estimate_prompt_tokens
+from app.services.llm_service import (
+    EPIC_SYSTEM_PROMPT, STORY_SYSTEM_PROMPT, TASK_SYSTEM_PROMPT, TASK_BATCH_SYSTEM_PROMPT,
+    TIMELINE_SYSTEM_PROMPT, GROOM_SYSTEM_PROMPT, REPAIR_SYSTEM_PROMPT
+)
+from app.services.prompt_builder import minify_prompt
+from app.services.replay_provider import LatencyModel, synthetic_responder
+
+STAGE_PROMPTS = [
+    (TASK_BATCH_SYSTEM_PROMPT, "generate_tasks"),
+    (EPIC_SYSTEM_PROMPT, "extract_epics"),
+    (STORY_SYSTEM_PROMPT, "generate_stories"),
+    (TASK_SYSTEM_PROMPT, "generate_tasks"),
+    (TIMELINE_SYSTEM_PROMPT, "estimate_timeline"),
+    (GROOM_SYSTEM_PROMPT, "groom_backlog"),
+    (REPAIR_SYSTEM_PROMPT, "repair"),
+]
+STREAM_CHUNK_CHARS = 16  # About four tokens per streamed delta
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+           500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+def stage_of(messages) -> str:
+    """Pipeline stage a request belongs to, from its system prompt (compacted or not)"""
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    for prompt, stage in STAGE_PROMPTS:
+        if system.startswith(minify_prompt(prompt)) or system.startswith(prompt):
+            return stage
+    return "other"
+
+
+class FakeLLMServer:
+    """Minimal HTTP/1.1 server (keep-alive, chunked streaming) with injected faults"""
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed:0.05",
+        tokens_per_second: float = 0.0,
+        max_rps: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        error_rate: float = 0.0,
+        reset_rate: float = 0.0,
+        seed: int = 0,
+        stories: int = 3,
+        tasks: int = 4
+    ):
+        self.host, self.port = host, port
+        self.latency = LatencyModel(latency)
+        self.tokens_per_second = tokens_per_second
+        self.max_rps = max_rps
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.rng = random.Random(seed)
+        self.respond = synthetic_responder(stories, tasks)
+        self.stats = dict.fromkeys(("requests", "ok", "streamed", "rate_limited", "errors", "resets"), 0)
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._connections = {}  # Connection task -> writer
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    def start_in_thread(self) -> "FakeLLMServer":
+        """Run the server on its own event loop in a daemon thread; returns once it listens"""
+        started = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+        
+        self._thread = threading.Thread(target=run, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+    
+    def stop(self):
+        """Stop a server started with start_in_thread, closing open connections"""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+    
+    async def _shutdown(self):
+        self._server.close()
+        for writer in list(self._connections.values()):
+            writer.transport.abort()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+    
+    def _over_capacity(self) -> bool:
+        """One-second fixed window of at most max_rps requests"""
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start, self._window_requests = now, 0
+        self._window_requests += 1
+        return self._window_requests > self.max_rps
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_open = await self._handle_request(writer, method, path, body)
+                if not keep_open or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            if not writer.transport.is_closing():
+                writer.close()
+    
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+        return method, path.split("?", 1)[0], headers, body
+    
+    async def _handle_request(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes) -> bool:
+        """Answer one request; False when the connection was reset"""
+        self.stats["requests"] += 1
+        if method != "POST" or path not in ("/api/chat", "/chat/completions", "/v1/chat/completions"):
+            await self._send_json(writer, 404, {"error": f"no route for {method} {path}"})
+            return True
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            await self._send_json(writer, 400, {"error": "invalid JSON body"})
+            return True
+        
+        reset_mid_stream = False
+        if self.reset_rate and self.rng.random() < self.reset_rate:
+            self.stats["resets"] += 1
+            if not payload.get("stream") or self.rng.random() < 0.5:
+                writer.transport.abort()
+                return False
+            reset_mid_stream = True
+        if self._over_capacity() or (self.rate_limit_rate and self.rng.random() < self.rate_limit_rate):
+            self.stats["rate_limited"] += 1
+            await self._send_json(
+                writer, 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                headers={"retry-after": f"{self.retry_after:g}"}
+            )
+            return True
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            await self._send_json(writer, self.rng.choice((500, 502, 503)), {"error": {"message": "Upstream failure"}})
+            return True
+        
+        messages = payload.get("messages", [])
+        text = self.respond(messages, {"stage": stage_of(messages)})
+        usage = {"prompt_tokens": estimate_prompt_tokens(messages), "completion_tokens": count_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = payload.get("model", "fake")
+        ollama = path == "/api/chat"
+        
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if not payload.get("stream"):
+            if self.tokens_per_second:
+                await asyncio.sleep(usage["completion_tokens"] / self.tokens_per_second)
+            self.stats["ok"] += 1
+            if ollama:
+                answer = {"model": model, "message": {"role": "assistant", "content": text}, "done": True,
+                          "prompt_eval_count": usage["prompt_tokens"], "eval_count": usage["completion_tokens"]}
+            else:
+                answer = {"id": "chatcmpl-fake", "object": "chat.completion", "model": model,
+                          "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                          "usage": usage}
+            await self._send_json(writer, 200, answer)
+            return True
+        
+        return await self._stream(writer, text, usage, model, ollama, payload, reset_mid_stream)
+    
+    async def _stream(self, writer, text: str, usage, model: str, ollama: bool, payload, reset_mid_stream: bool) -> bool:
+        content_type = "application/x-ndjson" if ollama else "text/event-stream"
+        writer.write(self._head(200, {"content-type": content_type, "transfer-encoding": "chunked"}))
+        pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        reset_at = self.rng.randrange(len(pieces)) if reset_mid_stream and pieces else None
+        delay = (STREAM_CHUNK_CHARS / 4) / self.tokens_per_second if self.tokens_per_second else 0
+        for index, piece in enumerate(pieces):
+            if index == reset_at:
+                writer.transport.abort()
+                return False
+            if ollama:
+                event = json.dumps({"model": model, "message": {"role": "assistant", "content": piece}, "done": False}) + "\n"
+            else:
+                event = "data: " + json.dumps({"object": "chat.completion.chunk", "model": model,
+                                               "choices": [{"index": 0, "delta": {"content": piece}}]}) + "\n\n"
+            writer.write(self._chunk(event))
+            await writer.drain()
+            if delay:
+                await asyncio.sleep(delay)
+        if ollama:
+            tail = json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                               "prompt_eval_count": usage["prompt_tokens"], "eval_count": usage["completion_tokens"]}) + "\n"
+        else:
+            tail = ""
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                tail += "data: " + json.dumps({"object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage}) + "\n\n"
+            tail += "data: [DONE]\n\n"
+        writer.write(self._chunk(tail) + b"0\r\n\r\n")
+        await writer.drain()
+        self.stats["ok"] += 1
+        self.stats["streamed"] += 1
+        return True
+    
+    @staticmethod
+    def _head(status: int, headers) -> bytes:
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Status')}"] + [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    
+    @staticmethod
+    def _chunk(data: str) -> bytes:
+        encoded = data.encode("utf-8")
+        return f"{len(encoded):x}\r\n".encode("latin-1") + encoded + b"\r\n"
+    
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, body, headers=None):
+        encoded = json.dumps(body).encode("utf-8")
+        writer.write(self._head(status, {"content-type": "application/json", "content-length": len(encoded), **(headers or {})}) + encoded)
+        await writer.drain()
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    """Server tuning flags, shared with the load test"""
+    parser.add_argument("--latency", default="fixed:0.05", help="recorded[:scale], fixed:s, uniform:low,high or lognormal:median,sigma")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Output throughput per request (0 = unlimited)")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Requests per second accepted before answering 429 (0 = unlimited)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with a 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500/502/503")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="Share of connections reset")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def server_from_args(args, host: str = "127.0.0.1", port: int = 0) -> FakeLLMServer:
+    return FakeLLMServer(
+        host=host, port=port, latency=args.latency, tokens_per_second=args.tokens_per_second,
+        max_rps=args.max_rps, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        error_rate=args.error_rate, reset_rate=args.reset_rate, seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    
+    server = server_from_args(args, args.host, args.port)
+    print(f"Fake LLM server listening on {server.url} (Ollama: /api/chat, OpenAI: /v1/chat/completions)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
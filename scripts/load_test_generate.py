@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load test the sprint plan generate endpoint at rising concurrency against the
+fake LLM server, to find where the app saturates.
+
+Starts scripts/fake_llm_server.py and the FastAPI app (uvicorn, temporary
+SQLite database) in this process, registers a user, and for each
+concurrency level sends POST /api/v1/projects/{id}/generate-sprint-plan
+?wait=true for fresh projects, so every request runs the whole pipeline.
+Reports p50/p95/p99 latency, throughput and error rate per level, plus the
+LLM requests, 429s, 5xx and connection resets the fake server produced.
+
+Usage:
+    python scripts/load_test_generate.py
+    python scripts/load_test_generate.py --concurrency 1 4 16 64 --latency lognormal:0.5,0.4
+    python scripts/load_test_generate.py --provider groq --rate-limit-rate 0.05 --reset-rate 0.01
+    python scripts/load_test_generate.py --app-url http://localhost:8000
+
+With --app-url the app is not started here; run it (and the fake server)
+yourself, pointed at each other through OLLAMA_BASE_URL etc. The rate
+limits of the chosen provider (e.g. GROQ_REQUESTS_PER_MINUTE) apply as
+configured; set them to 0 to measure the app alone.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='smartplanner-load-'), 'load.db')}")
+
+import httpx
+from fake_llm_server import add_fault_arguments, server_from_args
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_spec.txt')
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def start_app(provider: str, llm_url: str, port: int):
+    """Run the FastAPI app with uvicorn in a daemon thread, pointed at the fake LLM server"""
+    import uvicorn
+    from app.core.config import settings
+    from app.main import app
+    
+    # Keep the report readable; failed calls and requests are counted in it
+    logging.getLogger().setLevel(logging.CRITICAL)
+    settings.LLM_PROVIDER = provider
+    settings.OLLAMA_BASE_URL = llm_url
+    settings.OPENAI_BASE_URL = settings.GROQ_BASE_URL = f"{llm_url}/v1"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "fake-key"
+    settings.GROQ_API_KEY = settings.GROQ_API_KEY or "fake-key"
+    
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The app failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    email, password = f"load-{uuid.uuid4().hex[:8]}@example.com", "load-test-password"
+    response = await client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    response.raise_for_status()
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def create_projects(client: httpx.AsyncClient, count: int, spec: str):
+    ids = []
+    for i in range(count):
+        response = await client.post("/api/v1/projects", json={"name": f"Load {i}", "description": spec})
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def run_level(client: httpx.AsyncClient, project_ids, concurrency: int, provider: str):
+    """Send one generate request per project, at most `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], {}
+    
+    async def generate(project_id):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"/api/v1/projects/{project_id}/generate-sprint-plan",
+                    params={"wait": "true", "use_cache": "false", "resume": "false", "llm_provider": provider}
+                )
+                outcome = response.status_code if response.status_code != 200 else None
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            if outcome is None:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[outcome] = errors.get(outcome, 0) + 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(generate(project_id) for project_id in project_ids))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def load_test(app_url: str, args, fake_server):
+    with open(args.spec, encoding="utf-8") as f:
+        spec = f.read()
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 4)
+    async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, limits=limits) as client:
+        client.headers["Authorization"] = f"Bearer {await login(client)}"
+        print(f"{'conc':>4} {'reqs':>5} {'ok':>4} {'err %':>6} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'req/s':>6} "
+              f"{'llm reqs':>8} {'429':>5} {'5xx':>5} {'resets':>6}  errors")
+        for concurrency in args.concurrency:
+            count = args.requests or max(8, 2 * concurrency)
+            project_ids = await create_projects(client, count, spec)
+            before = dict(fake_server.stats) if fake_server else {}
+            latencies, errors, elapsed = await run_level(client, project_ids, concurrency, args.provider)
+            llm = {key: fake_server.stats[key] - before[key] for key in before} if fake_server else {}
+            failed = sum(errors.values())
+            print(f"{concurrency:>4} {count:>5} {len(latencies):>4} {failed / count:>6.1%} "
+                  f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                  f"{len(latencies) / elapsed:>6.2f} {llm.get('requests', '-'):>8} {llm.get('rate_limited', '-'):>5} "
+                  f"{llm.get('errors', '-'):>5} {llm.get('resets', '-'):>6}  {errors or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", help="Already running app to test (default: start one here)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the app started here")
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "openai", "groq"], help="llm_provider of each request")
+    parser.add_argument("--spec", default=DEFAULT_SPEC, help="Specification each project is planned from")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrent requests per level")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level (default: twice the concurrency, at least 8)")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds before a generate request is abandoned")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.app_url:
+        asyncio.run(load_test(args.app_url, args, None))
+        return
+    fake_server = server_from_args(args).start_in_thread()
+    app_server, app_thread = start_app(args.provider, fake_server.url, args.port)
+    try:
+        asyncio.run(load_test(f"http://127.0.0.1:{args.port}", args, fake_server))
+    finally:
+        app_server.should_exit = True
+        app_thread.join(timeout=10)
+        fake_server.stop()
+
+
+if __name__ == "__main__":
+    main()